@@ -10,8 +10,9 @@ import click
 from typing_extensions import Unpack
 
 from gitingest.config import MAX_FILE_SIZE, OUTPUT_FILE_NAME
-from gitingest.entrypoint import ingest_async
+from gitingest.entrypoint import ingest_async, watch_async
 from gitingest.utils.comment_removal import CommentType
+from gitingest.utils.git_utils import close_http_client
 
 
 class _CLIArgs(TypedDict):
@@ -26,6 +27,15 @@ class _CLIArgs(TypedDict):
     output: str | None
     remove_comments: bool
     comment_types: tuple[str, ...]
+    watch: bool
+    since: str | None
+    diff: str | None
+    structure_only: bool
+    plan: bool
+    fold_duplicates: bool
+    include_generated: bool
+    truncate_large_files: bool
+    copy_files: bool
 
 
 @click.command()
@@ -86,6 +96,61 @@ class _CLIArgs(TypedDict):
     type=click.Choice(["single_line", "multi_line", "documentation", "all"]),
     help="Types of comments to remove (can be specified multiple times).",
 )
+@click.option(
+    "--fold-duplicates",
+    is_flag=True,
+    default=False,
+    help="Output the content of identical files once, the other copies referring to the first one.",
+)
+@click.option(
+    "--include-generated",
+    is_flag=True,
+    default=False,
+    help="Output the contents of generated, minified and vendored files instead of a placeholder.",
+)
+@click.option(
+    "--truncate-large-files",
+    is_flag=True,
+    default=False,
+    help="Output the start and end of the files above --max-size instead of skipping them.",
+)
+@click.option(
+    "--copy-files",
+    is_flag=True,
+    default=False,
+    help="Copy the bytes of plain text files into the output file instead of decoding them (tokens estimated).",
+)
+@click.option(
+    "--since",
+    default=None,
+    metavar="REF",
+    help="Only ingest the files changed since REF (including uncommitted changes of a local directory).",
+)
+@click.option(
+    "--diff",
+    default=None,
+    metavar="BASE..TARGET",
+    help="Only ingest the files changed between two revisions.",
+)
+@click.option(
+    "--structure-only",
+    is_flag=True,
+    default=False,
+    help="Only output the directory structure, without reading any file.",
+)
+@click.option(
+    "--plan",
+    is_flag=True,
+    default=False,
+    help="Report the size and estimated tokens of each file instead of its content, without downloading any file.",
+)
+@click.option(
+    "--watch",
+    "-w",
+    is_flag=True,
+    default=False,
+    help="Keep the output up to date as files change, until interrupted (local directories only).",
+)
 def main(**cli_kwargs: Unpack[_CLIArgs]) -> None:
     """Run the CLI entry point to analyze a repo / directory and dump its contents.
 
@@ -125,6 +190,24 @@ def main(**cli_kwargs: Unpack[_CLIArgs]) -> None:
         $ gitingest --remove-comments --comment-types single_line multi_line
         $ gitingest --remove-comments --comment-types documentation
 
+    Output identical files once:
+        $ gitingest --fold-duplicates
+
+    Copy large text files into the output without decoding them:
+        $ gitingest /path/to/repo --copy-files -o digest.txt
+
+    Only the files changed between two revisions:
+        $ gitingest --since main
+        $ gitingest https://github.com/user/repo --diff v1.0..v1.1
+
+    Preview a repository before ingesting it:
+        $ gitingest https://github.com/user/repo --structure-only
+        $ gitingest https://github.com/user/repo --plan -o -
+
+    Regenerate the digest on every change:
+        $ gitingest --watch
+        $ WATCHFILES_FORCE_POLLING=1 gitingest /mnt/share/repo --watch
+
     """
     asyncio.run(_async_main(**cli_kwargs))
 
@@ -142,6 +225,15 @@ async def _async_main(
     output: str | None = None,
     remove_comments: bool = False,
     comment_types: tuple[str, ...] = ("all",),
+    watch: bool = False,
+    since: str | None = None,
+    diff: str | None = None,
+    structure_only: bool = False,
+    plan: bool = False,
+    fold_duplicates: bool = False,
+    include_generated: bool = False,
+    truncate_large_files: bool = False,
+    copy_files: bool = False,
 ) -> None:
     """Analyze a directory or repository and create a text dump of its contents.
 
@@ -175,13 +267,48 @@ async def _async_main(
         Whether to remove comments from processed files to reduce token count (default: ``False``).
     comment_types : tuple[str, ...]
         Types of comments to remove (default: ``("all",)``).
+    watch : bool
+        If ``True``, keep the output up to date as the files of ``source`` change, until interrupted
+        (default: ``False``).
+    since : str | None
+        Only ingest the files changed since this revision. Shorthand for ``diff=since``.
+    diff : str | None
+        Only ingest the files changed between two revisions, given as ``<base>..<target>``.
+    structure_only : bool
+        If ``True``, only output the directory structure, without reading the files (default: ``False``).
+    plan : bool
+        If ``True``, output the size and estimated token count of each file instead of its content
+        (default: ``False``).
+    fold_duplicates : bool
+        If ``True``, output the content of identical files once, the other copies referring to the first one
+        (default: ``False``).
+    include_generated : bool
+        If ``True``, output the contents of generated, minified and vendored files instead of a placeholder
+        (default: ``False``).
+    truncate_large_files : bool
+        If ``True``, output the start and end of the files above ``max_file_size`` instead of skipping them
+        (default: ``False``).
+    copy_files : bool
+        If ``True``, copy the bytes of the plain text files into the output file instead of decoding them
+        (default: ``False``).
 
     Raises
     ------
     click.Abort
         Raised if an error occurs during execution and the command must be aborted.
+    click.UsageError
+        Raised if options that cannot be combined are given together.
 
     """
+    _check_modes(
+        watch=watch,
+        since=since,
+        diff=diff,
+        preview=structure_only or plan,
+        copy_files=copy_files,
+        output=output,
+    )
+
     try:
         # Normalise pattern containers (the ingest layer expects sets)
         exclude_patterns = set(exclude_pattern) if exclude_pattern else set()
@@ -206,6 +333,23 @@ async def _async_main(
             elif comment_type == "documentation":
                 comment_type_enums.add(CommentType.DOCUMENTATION)
 
+        if watch:
+            await watch_async(
+                source,
+                max_file_size=max_size,
+                include_patterns=include_patterns,
+                exclude_patterns=exclude_patterns,
+                include_gitignored=include_gitignored,
+                output=output_target,
+                remove_comments=remove_comments,
+                comment_types=comment_type_enums,
+                fold_duplicates=fold_duplicates,
+                include_generated=include_generated,
+                truncate_large_files=truncate_large_files,
+                on_update=lambda summary: _echo_summary(summary, output_target=output_target, watching=True),
+            )
+            return
+
         summary, _, _ = await ingest_async(
             source,
             max_file_size=max_size,
@@ -218,12 +362,84 @@ async def _async_main(
             output=output_target,
             remove_comments=remove_comments,
             comment_types=comment_type_enums,
+            diff=diff or since,
+            structure_only=structure_only,
+            plan=plan,
+            fold_duplicates=fold_duplicates,
+            include_generated=include_generated,
+            truncate_large_files=truncate_large_files,
+            copy_files=copy_files,
         )
     except Exception as exc:
         # Convert any exception into Click.Abort so that exit status is non-zero
         click.echo(f"Error: {exc}", err=True)
         raise click.Abort from exc
+    finally:
+        await close_http_client()
+
+    _echo_summary(summary, output_target=output_target)
+
+
+def _check_modes(
+    *,
+    watch: bool,
+    since: str | None,
+    diff: str | None,
+    preview: bool,
+    copy_files: bool = False,
+    output: str | None = None,
+) -> None:
+    """Reject the combinations of the ``--watch``, ``--since``, ``--diff`` and preview options that have no meaning.
 
+    Parameters
+    ----------
+    watch : bool
+        Whether ``--watch`` was given.
+    since : str | None
+        The value of ``--since``.
+    diff : str | None
+        The value of ``--diff``.
+    preview : bool
+        Whether ``--structure-only`` or ``--plan`` was given.
+    copy_files : bool
+        Whether ``--copy-files`` was given (default: ``False``).
+    output : str | None
+        The value of ``--output`` (default: ``None``).
+
+    Raises
+    ------
+    click.UsageError
+        If ``--since`` and ``--diff`` are both given, or ``--watch`` with any of them or with a preview option, or
+        ``--copy-files`` with ``--watch`` or ``--output -``.
+
+    """
+    if since and diff:
+        msg = "--since and --diff cannot be used together"
+        raise click.UsageError(msg)
+    if watch and (since or diff):
+        msg = "--watch cannot be used with --since or --diff"
+        raise click.UsageError(msg)
+    if watch and preview:
+        msg = "--watch cannot be used with --structure-only or --plan"
+        raise click.UsageError(msg)
+    if copy_files and (watch or output == "-"):
+        msg = "--copy-files cannot be used with --watch or --output -"
+        raise click.UsageError(msg)
+
+
+def _echo_summary(summary: str, *, output_target: str, watching: bool = False) -> None:
+    """Report a finished analysis, on ``stderr`` when the digest itself goes to ``stdout``.
+
+    Parameters
+    ----------
+    summary : str
+        The summary of the digest.
+    output_target : str
+        The path the digest was written to, or ``"-"`` for ``stdout``.
+    watching : bool
+        If ``True``, the analysis is one of a watch session, which goes on after it (default: ``False``).
+
+    """
     if output_target == "-":  # stdout
         click.echo("\n--- Summary ---", err=True)
         click.echo(summary, err=True)
@@ -234,6 +450,9 @@ async def _async_main(
         click.echo("\nSummary:")
         click.echo(summary)
 
+    if watching:
+        click.echo("Watching for changes, press Ctrl+C to stop...", err=True)
+
 
 if __name__ == "__main__":
     main()
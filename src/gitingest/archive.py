@@ -0,0 +1,603 @@
+"""Ingestion sources reading archives instead of directories: tarballs of remote revisions and local archives."""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import re
+import stat
+import tarfile
+import zipfile
+from dataclasses import dataclass, replace
+from functools import partial
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Final, Iterable, Iterator
+from urllib.parse import urlparse
+
+import httpx
+from starlette.status import HTTP_200_OK
+
+from gitingest.config import MAX_DIRECTORY_DEPTH, MAX_FILES, MAX_TOTAL_SIZE_BYTES
+from gitingest.schemas import FileSystemNode, FileSystemNodeType, FileSystemStats
+from gitingest.utils.compat_func import removesuffix
+from gitingest.utils.git_utils import check_repo_exists, get_http_client, resolve_commit
+from gitingest.utils.ingestion_utils import _should_exclude, _should_include
+
+if TYPE_CHECKING:
+    from gitingest.schemas import IngestionQuery
+
+# Tarball endpoints of the hosts that serve archives of any commit, formatted with the repository URL, its path on
+# the host, its name and the commit
+_ARCHIVE_URL_TEMPLATES: Final[dict[str, str]] = {
+    "github.com": "https://codeload.github.com{path}/tar.gz/{commit}",
+    "gitlab.com": "{url}/-/archive/{commit}/{name}-{commit}.tar.gz",
+    "gitea.com": "{url}/archive/{commit}.tar.gz",
+    "codeberg.org": "{url}/archive/{commit}.tar.gz",
+    "bitbucket.org": "{url}/get/{commit}.tar.gz",
+}
+_GITHUB_API_TARBALL_URL: Final[str] = "https://api.github.com/repos{path}/tarball/{commit}"
+
+# Attributes making ``git archive`` omit or rewrite files, found in a ``.gitattributes`` file
+_EXPORT_ATTRIBUTE_PATTERN: Final[re.Pattern[bytes]] = re.compile(rb"\bexport-(?:ignore|subst)\b")
+
+# Local archives ingested as directories
+_ARCHIVE_SUFFIXES: Final[tuple[str, ...]] = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+
+async def fetch_archive(query: IngestionQuery, *, token: str | None = None) -> FileSystemNode | None:
+    """Stream the archive of the requested revision and build the tree of the files to ingest from it.
+
+    The archive is decompressed and read member by member as it is downloaded. The subpath, include/exclude
+    patterns, size limit and traversal limits are applied to each member, and the content of the selected files is
+    kept in memory: nothing is written to disk and no ``git`` process is spawned.
+
+    Parameters
+    ----------
+    query : IngestionQuery
+        The parsed query of a remote repository.
+    token : str | None
+        GitHub personal access token (PAT) for accessing private repositories.
+
+    Returns
+    -------
+    FileSystemNode | None
+        The root directory node, ready for ``format_node``, or ``None`` if the revision cannot be ingested from an
+        archive (see ``_archive_request``; download or archive error, missing subpath, export attributes), in which
+        case the repository should be cloned instead.
+
+    """
+    request = await _archive_request(query, token=token)
+    if request is None:
+        return None
+    url, headers = request
+
+    loop = asyncio.get_running_loop()
+    try:
+        async with get_http_client().stream("GET", url, headers=headers) as response:
+            if response.status_code != HTTP_200_OK:
+                return None
+            stream = _StreamReader(response.aiter_bytes(), loop)
+            # Decompression, parsing and filtering are blocking: run them in a thread pulling from the download
+            return await loop.run_in_executor(None, _read_archive_stream, stream, query)
+    except (httpx.HTTPError, tarfile.TarError, OSError, EOFError, ValueError):
+        return None
+
+
+async def download_archive(query: IngestionQuery, path: Path, *, token: str | None = None) -> bool:
+    """Download the archive of the requested revision to ``path``, for ``read_archive_file`` to build its tree.
+
+    Unlike ``fetch_archive``, the tree can then be built in another process without transferring the content of the
+    files. Archives larger than ``MAX_TOTAL_SIZE_BYTES`` are not downloaded in full.
+
+    Parameters
+    ----------
+    query : IngestionQuery
+        The parsed query of a remote repository.
+    path : Path
+        The path of the file to write the gzipped tarball to.
+    token : str | None
+        GitHub personal access token (PAT) for accessing private repositories.
+
+    Returns
+    -------
+    bool
+        ``True`` if the archive was downloaded, ``False`` if the revision cannot be ingested from an archive (see
+        ``_archive_request``; download error, archive too large), in which case the repository should be cloned
+        instead and nothing is left at ``path``.
+
+    """
+    request = await _archive_request(query, token=token)
+    if request is None:
+        return False
+    url, headers = request
+
+    loop = asyncio.get_running_loop()
+    downloaded = False
+    file = await loop.run_in_executor(None, path.open, "wb")
+    try:
+        async with get_http_client().stream("GET", url, headers=headers) as response:
+            if response.status_code != HTTP_200_OK:
+                return False
+            size = 0
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if size > MAX_TOTAL_SIZE_BYTES:
+                    return False
+                await loop.run_in_executor(None, file.write, chunk)
+        downloaded = True
+    except (httpx.HTTPError, OSError):
+        return False
+    finally:
+        await loop.run_in_executor(None, file.close)
+        if not downloaded:
+            await loop.run_in_executor(None, partial(path.unlink, missing_ok=True))
+    return True
+
+
+async def _archive_request(query: IngestionQuery, *, token: str | None) -> tuple[str, dict[str, str]] | None:
+    """Return the URL and headers to download the archive of the requested revision with.
+
+    Returns ``None`` if the revision cannot be ingested from an archive: unsupported host, submodules, a single file,
+    a diff, only the structure or truncated files requested, unreachable repository or unresolvable revision.
+    """
+    if (
+        not query.url
+        or query.type == "blob"
+        or query.include_submodules
+        or query.diff_base
+        or query.structure_only
+        or query.truncate_large_files
+    ):
+        return None
+
+    try:
+        # Archives of public repositories are served without checking the token: check it as a clone would
+        if not await check_repo_exists(query.url, token=token):
+            return None
+        commit = await resolve_commit(
+            query.url,
+            branch=query.branch,
+            tag=query.tag,
+            commit=query.resolved_commit or query.commit,
+            token=token,
+        )
+    except (RuntimeError, ValueError):
+        return None
+
+    return archive_url(query.url, commit, token=token)
+
+
+def archive_url(repo_url: str, commit: str, *, token: str | None = None) -> tuple[str, dict[str, str]] | None:
+    """Return the URL of the tarball of ``commit`` and the headers to download it with.
+
+    Parameters
+    ----------
+    repo_url : str
+        The URL of the repository.
+    commit : str
+        The SHA of the commit to archive.
+    token : str | None
+        GitHub personal access token (PAT) for accessing private repositories.
+
+    Returns
+    -------
+    tuple[str, dict[str, str]] | None
+        The archive URL and request headers, or ``None`` if the host serves no archives (or none the token grants
+        access to).
+
+    """
+    parsed = urlparse(repo_url)
+    host = (parsed.hostname or "").lower()
+    path = removesuffix(parsed.path.rstrip("/"), ".git")
+
+    if token:
+        # Private archives are only reachable through the GitHub API
+        if host != "github.com":
+            return None
+        return _GITHUB_API_TARBALL_URL.format(path=path, commit=commit), {"Authorization": f"Bearer {token}"}
+
+    template = _ARCHIVE_URL_TEMPLATES.get(host)
+    if template is None:
+        return None
+    url = f"{parsed.scheme}://{parsed.netloc}{path}"
+    return template.format(url=url, path=path, name=PurePosixPath(path).name, commit=commit), {}
+
+
+class _StreamReader(io.RawIOBase):
+    """Blocking, file-like view of an asynchronous byte stream, read from a worker thread."""
+
+    def __init__(self, chunks: AsyncIterator[bytes], loop: asyncio.AbstractEventLoop) -> None:
+        super().__init__()
+        self._chunks = chunks
+        self._loop = loop
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        """Return ``True``: the stream can be read."""
+        return True
+
+    def readinto(self, buffer: memoryview) -> int:  # type: ignore[override]
+        """Read the next bytes of the stream into ``buffer``, waiting for the download if needed."""
+        while not self._buffer:
+            try:
+                self._buffer = asyncio.run_coroutine_threadsafe(self._next_chunk(), self._loop).result()
+            except StopAsyncIteration:
+                return 0
+
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    async def _next_chunk(self) -> bytes:
+        return await self._chunks.__anext__()
+
+
+def _read_archive_stream(stream: io.RawIOBase, query: IngestionQuery) -> FileSystemNode:
+    """Read the gzipped tarball ``stream`` of a host, whose tree is under a single top-level directory."""
+    with tarfile.open(fileobj=stream, mode="r|gz") as tar:
+        return _build_tree(_without_export_attributes(_tar_entries(tar, strip_top_level=True)), query)
+
+
+def read_archive_file(path: Path, query: IngestionQuery) -> FileSystemNode:
+    """Build the tree of the files to ingest from the archive downloaded to ``path`` by ``download_archive``.
+
+    Parameters
+    ----------
+    path : Path
+        The path of the gzipped tarball of the requested revision.
+    query : IngestionQuery
+        The parsed query of the remote repository.
+
+    Returns
+    -------
+    FileSystemNode
+        The root directory node, with the content of its files in memory.
+
+    Raises
+    ------
+    ValueError
+        If the archive cannot be read or does not match the repository (see ``_without_export_attributes``), in
+        which case the repository should be cloned instead.
+
+    """
+    try:
+        with tarfile.open(path, mode="r|gz") as tar:
+            return _build_tree(_without_export_attributes(_tar_entries(tar, strip_top_level=True)), query)
+    except (tarfile.TarError, OSError, EOFError) as exc:
+        msg = f"Cannot read archive {path}: {exc}"
+        raise ValueError(msg) from exc
+
+
+def _without_export_attributes(entries: Iterable[_ArchiveEntry]) -> Iterator[_ArchiveEntry]:
+    """Yield ``entries``, checking that no ``.gitattributes`` among them alters the archive.
+
+    Hosts build tarballs with ``git archive``, which omits the files marked ``export-ignore`` and expands the
+    placeholders of those marked ``export-subst``: such archives differ from the repository.
+
+    Raises
+    ------
+    ValueError
+        If a ``.gitattributes`` file declares export attributes.
+
+    """
+    for entry in entries:
+        if entry.type == FileSystemNodeType.FILE and PurePosixPath(entry.name).name == ".gitattributes":
+            data = entry.read()
+            if _EXPORT_ATTRIBUTE_PATTERN.search(data):
+                msg = f"{entry.name} declares export attributes"
+                raise ValueError(msg)
+            entry = replace(entry, read=partial(bytes, data))  # noqa: PLW2901 - tar members can only be read once
+        yield entry
+
+
+def read_archive(query: IngestionQuery) -> FileSystemNode:
+    """Build the tree of the files to ingest from the local archive ``query.local_path``, without extracting it.
+
+    Zip archives are enumerated from their central directory and only the selected members are read. Tar archives
+    (optionally gzip-, bzip2- or xz-compressed) are read sequentially, in a single pass.
+
+    Parameters
+    ----------
+    query : IngestionQuery
+        The parsed query of a local archive (see ``is_archive``).
+
+    Returns
+    -------
+    FileSystemNode
+        The root directory node, with the content of its files in memory.
+
+    Raises
+    ------
+    ValueError
+        If the archive cannot be read.
+
+    """
+    try:
+        if query.local_path.name.lower().endswith(".zip"):
+            with zipfile.ZipFile(query.local_path) as archive:
+                return _build_tree(_zip_entries(archive), query)
+        with tarfile.open(query.local_path, mode="r|*") as tar:
+            return _build_tree(_tar_entries(tar), query)
+    except (tarfile.TarError, zipfile.BadZipFile, OSError, EOFError) as exc:
+        msg = f"Cannot read archive {query.local_path}: {exc}"
+        raise ValueError(msg) from exc
+
+
+def is_archive(path: Path) -> bool:
+    """Return ``True`` if ``path`` is a zip or tar archive file that can be ingested as a directory.
+
+    Parameters
+    ----------
+    path : Path
+        The local path to check.
+
+    Returns
+    -------
+    bool
+        ``True`` if ``path`` is a file with an archive extension, ``False`` otherwise.
+
+    """
+    return path.name.lower().endswith(_ARCHIVE_SUFFIXES) and path.is_file()
+
+
+@dataclass(frozen=True)
+class _ArchiveEntry:
+    """Member of an archive, whose content is only read if it is selected."""
+
+    name: str
+    type: FileSystemNodeType | None  # ``None`` for anything but files, directories and symlinks
+    size: int
+    read: Callable[[], bytes]
+    link_target: str | None = None
+
+
+def _tar_entries(tar: tarfile.TarFile, *, strip_top_level: bool = False) -> Iterator[_ArchiveEntry]:
+    """Yield the members of ``tar``, which must be read before moving on to the next one."""
+    for member in tar:
+        name = member.name.partition("/")[2] if strip_top_level else member.name
+        if member.isfile():
+            kind: FileSystemNodeType | None = FileSystemNodeType.FILE
+        elif member.isdir():
+            kind = FileSystemNodeType.DIRECTORY
+        elif member.issym():
+            kind = FileSystemNodeType.SYMLINK
+        else:
+            kind = None
+        yield _ArchiveEntry(
+            name=name,
+            type=kind,
+            size=member.size,
+            read=partial(_read_tar_member, tar, member),
+            link_target=member.linkname if member.issym() else None,
+        )
+
+
+def _read_tar_member(tar: tarfile.TarFile, member: tarfile.TarInfo) -> bytes:
+    file = tar.extractfile(member)
+    return file.read() if file else b""
+
+
+def _zip_entries(archive: zipfile.ZipFile) -> Iterator[_ArchiveEntry]:
+    """Yield the members listed in the central directory of ``archive``."""
+    for info in archive.infolist():
+        if info.is_dir():
+            yield _ArchiveEntry(name=info.filename, type=FileSystemNodeType.DIRECTORY, size=0, read=bytes)
+        elif stat.S_ISLNK(info.external_attr >> 16):  # Symlinks store their target as content
+            target = archive.read(info).decode("utf-8", errors="replace")
+            yield _ArchiveEntry(
+                name=info.filename,
+                type=FileSystemNodeType.SYMLINK,
+                size=0,
+                read=bytes,
+                link_target=target,
+            )
+        else:
+            yield _ArchiveEntry(
+                name=info.filename,
+                type=FileSystemNodeType.FILE,
+                size=info.file_size,
+                read=partial(archive.read, info),
+            )
+
+
+def _member_name(name: str) -> str | None:
+    """Return the normalised relative path of an archive member, or ``None`` if it would escape the archive root."""
+    parts = [part for part in PurePosixPath(name).parts if part != "."]
+    if not parts or parts[0] == "/" or ".." in parts:
+        return None
+    return "/".join(parts)
+
+
+def _build_tree(entries: Iterable[_ArchiveEntry], query: IngestionQuery) -> FileSystemNode:
+    """Return the tree of the files to ingest among the members of an archive.
+
+    Parameters
+    ----------
+    entries : Iterable[_ArchiveEntry]
+        The members of the archive.
+    query : IngestionQuery
+        The parsed query, whose subpath, patterns and size limit select the files.
+
+    Returns
+    -------
+    FileSystemNode
+        The root directory node, with the content of its files in memory.
+
+    Raises
+    ------
+    ValueError
+        If the subpath does not exist in the archive.
+
+    """
+    subpath = Path(query.subpath.strip("/")).as_posix()
+    root_path = query.local_path / subpath
+    root = FileSystemNode(
+        name=root_path.name,
+        type=FileSystemNodeType.DIRECTORY,
+        path_str=str(root_path.relative_to(query.local_path)),
+        path=root_path,
+    )
+    directories = {subpath: root}
+    excluded_directories: dict[str, bool] = {}
+    stats = FileSystemStats()
+    found = subpath == "."
+
+    for entry in entries:
+        name = _member_name(entry.name)
+        if name is None:
+            continue
+        if name == subpath and entry.type == FileSystemNodeType.DIRECTORY:
+            found = True
+        if not (subpath == "." or name.startswith(f"{subpath}/")):
+            continue
+        found = True
+        if entry.type not in (FileSystemNodeType.FILE, FileSystemNodeType.SYMLINK):
+            continue
+
+        parent = PurePosixPath(name).parent.as_posix()
+        if _is_selected(name, parent, subpath, query, excluded_directories):
+            _add_entry(entry, name=name, parent=_directory(parent, directories, query), query=query, stats=stats)
+
+    if not found:
+        msg = f"{query.slug} cannot be found"
+        raise ValueError(msg)
+
+    _finalize_directory(root)
+    return root
+
+
+def _is_selected(
+    name: str,
+    parent: str,
+    subpath: str,
+    query: IngestionQuery,
+    excluded_directories: dict[str, bool],
+) -> bool:
+    """Return ``True`` if the file ``name`` in directory ``parent`` passes the patterns and the depth limit."""
+    path = query.local_path / name
+    if _is_excluded(parent, subpath, query, excluded_directories):
+        return False
+    if query.ignore_patterns and _should_exclude(path, query.local_path, query.ignore_patterns):
+        return False
+    if query.include_patterns and not _should_include(path, query.local_path, query.include_patterns):
+        return False
+    return _depth(parent, subpath) <= MAX_DIRECTORY_DEPTH
+
+
+def _add_entry(
+    entry: _ArchiveEntry,
+    *,
+    name: str,
+    parent: FileSystemNode,
+    query: IngestionQuery,
+    stats: FileSystemStats,
+) -> None:
+    """Read the file or symlink ``entry`` into a node of ``parent``, unless it exceeds the size or count limits.
+
+    With ``query.structure_only``, the node is added without reading the file.
+    """
+    if entry.type == FileSystemNodeType.SYMLINK:
+        if stats.total_files >= MAX_FILES:
+            return
+        stats.total_files += 1
+        parent.children.append(_file_node(name, parent, query, link_target=entry.link_target))
+        parent.file_count += 1
+        return
+
+    path = query.local_path / name
+    if entry.size > query.max_file_size:
+        print(f"Skipping file {path}: would exceed max file size limit")
+        return
+    if stats.total_files + 1 > MAX_FILES:
+        return
+    if stats.total_size + entry.size > MAX_TOTAL_SIZE_BYTES:
+        print(f"Skipping file {path}: would exceed total size limit")
+        return
+
+    data = None if query.structure_only else entry.read()
+    stats.total_files += 1
+    stats.total_size += entry.size
+
+    parent.children.append(_file_node(name, parent, query, data=data, size=entry.size))
+    parent.size += entry.size
+    parent.file_count += 1
+
+
+def _is_excluded(
+    directory: str,
+    subpath: str,
+    query: IngestionQuery,
+    excluded_directories: dict[str, bool],
+) -> bool:
+    """Return ``True`` if ``directory``, or one of its parents below ``subpath``, matches the ignore patterns."""
+    if directory in (subpath, ".") or not query.ignore_patterns:
+        return False
+    if directory not in excluded_directories:
+        parent = PurePosixPath(directory).parent.as_posix()
+        excluded_directories[directory] = _is_excluded(
+            parent,
+            subpath,
+            query,
+            excluded_directories,
+        ) or _should_exclude(query.local_path / directory, query.local_path, query.ignore_patterns)
+    return excluded_directories[directory]
+
+
+def _depth(directory: str, subpath: str) -> int:
+    """Return the depth of ``directory`` below the root directory ``subpath``."""
+    if directory == subpath:
+        return 0
+    root_depth = 0 if subpath == "." else len(PurePosixPath(subpath).parts)
+    return len(PurePosixPath(directory).parts) - root_depth
+
+
+def _directory(name: str, directories: dict[str, FileSystemNode], query: IngestionQuery) -> FileSystemNode:
+    """Return the node of directory ``name``, creating it and its missing parents."""
+    node = directories.get(name)
+    if node is None:
+        parent = _directory(PurePosixPath(name).parent.as_posix(), directories, query)
+        node = FileSystemNode(
+            name=PurePosixPath(name).name,
+            type=FileSystemNodeType.DIRECTORY,
+            path_str=str(Path(name)),
+            path=query.local_path / name,
+            depth=parent.depth + 1,
+        )
+        parent.children.append(node)
+        directories[name] = node
+    return node
+
+
+def _file_node(
+    name: str,
+    parent: FileSystemNode,
+    query: IngestionQuery,
+    *,
+    data: bytes | None = None,
+    size: int = 0,
+    link_target: str | None = None,
+) -> FileSystemNode:
+    """Return the node of file (or symlink) ``name``, whose content is held in memory unless it was not read."""
+    return FileSystemNode(
+        name=PurePosixPath(name).name,
+        type=FileSystemNodeType.FILE if link_target is None else FileSystemNodeType.SYMLINK,
+        size=len(data) if data is not None else size,
+        file_count=1 if link_target is None else 0,
+        path_str=str(Path(name)),
+        path=query.local_path / name,
+        depth=parent.depth + 1,
+        data=data,
+        link_target=link_target,
+    )
+
+
+def _finalize_directory(node: FileSystemNode) -> None:
+    """Add up the sizes and counts of the subdirectories of ``node``, then sort its children."""
+    for child in node.children:
+        if child.type == FileSystemNodeType.DIRECTORY:
+            _finalize_directory(child)
+            node.size += child.size
+            node.file_count += child.file_count
+            node.dir_count += 1 + child.dir_count
+    node.sort_children()
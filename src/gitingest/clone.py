@@ -2,16 +2,24 @@
 
 from __future__ import annotations
 
+import asyncio
+import shutil
+from dataclasses import replace
 from pathlib import Path
 from typing import TYPE_CHECKING
+from urllib.parse import urljoin
 
-from gitingest.config import DEFAULT_TIMEOUT
+from gitingest.config import DEFAULT_TIMEOUT, SUBMODULE_JOBS
+from gitingest.utils.clone_cache import _has_commit, clone_cache
 from gitingest.utils.git_utils import (
+    _escape_sparse_path,
     check_repo_exists,
     create_git_auth_header,
     create_git_command,
+    create_sparse_checkout_rules,
     ensure_git_installed,
     is_github_host,
+    rebase_submodule_patterns,
     run_command,
 )
 from gitingest.utils.os_utils import ensure_directory
@@ -29,6 +37,20 @@ async def clone_repo(config: CloneConfig, *, token: str | None = None) -> None:
     It can clone a specific branch, tag, or commit if provided, and it raises exceptions if
     any errors occur during the cloning process.
 
+    When the configuration carries a size limit or include/exclude patterns, the clone is planned from them:
+    blobs above ``max_file_size`` are never transferred, and only the files matching the patterns are checked out.
+    With ``use_cache``, the objects come from a persistent bare mirror that is only updated with a shallow fetch.
+    Mirrors hold every blob of the revisions they serve, so clones with a size limit do not use them: the bandwidth
+    saved by leaving out large blobs outweighs reusing the mirror. Neither do clones whose cache directory cannot be
+    kept private, which fetch their objects directly.
+
+    With ``diff_base``, the commits and trees of that revision are fetched as well, so that the checkout can be
+    compared with it. With ``no_checkout``, only the commit and its trees are fetched, enough to list the files of
+    the revision, and nothing is checked out.
+
+    If the clone fails, times out or is cancelled, its git processes are terminated and the partially cloned
+    directory is removed.
+
     Parameters
     ----------
     config : CloneConfig
@@ -42,58 +64,158 @@ async def clone_repo(config: CloneConfig, *, token: str | None = None) -> None:
         If the repository is not found, if the provided URL is invalid, or if the token format is invalid.
 
     """
+    local_path = Path(config.local_path)
+
+    # Create parent directory if it doesn't exist
+    await ensure_directory(local_path.parent)
+
+    existed = local_path.exists()
+    try:
+        await _clone_repo(config, token)
+        if config.diff_base:
+            await _fetch_diff_base(config, config.diff_base, token)
+    except BaseException:
+        if not existed:
+            shutil.rmtree(local_path, ignore_errors=True)
+        raise
+
+
+async def _clone_repo(config: CloneConfig, token: str | None) -> None:
+    """Run the clone described by ``config`` for ``clone_repo``, whose parameters it takes."""
     # Extract and validate query parameters
     url: str = config.url
     local_path: str = config.local_path
     commit: str | None = config.commit
-    branch: str | None = config.branch
-    tag: str | None = config.tag
     partial_clone: bool = config.subpath != "/"
-
-    # Create parent directory if it doesn't exist
-    await ensure_directory(Path(local_path).parent)
+    filtered_clone: bool = _is_filtered_clone(config)
 
     # Check if the repository exists
     if not await check_repo_exists(url, token=token):
         msg = "Repository not found. Make sure it is public or that you have provided a valid token."
         raise ValueError(msg)
 
+    await ensure_git_installed()
+
+    # The mirrors of the clone cache hold every blob, which tree-only and size-limited clones avoid downloading.
+    # Clones are fetched directly when the cache directory cannot be kept private.
+    loop = asyncio.get_running_loop()
+    uses_cache = config.use_cache and not config.no_checkout and not _is_size_limited(config)
+    if uses_cache and await loop.run_in_executor(None, clone_cache.is_available):
+        await _clone_from_cache(config, token)
+        return
+
+    if commit:
+        await _fetch_single_commit(config, commit, token)
+        return
+
     clone_cmd = ["git"]
     if token and is_github_host(url):
         clone_cmd += ["-c", create_git_auth_header(token, url=url)]
 
     clone_cmd += ["clone", "--single-branch"]
 
-    if config.include_submodules:
-        clone_cmd += ["--recurse-submodules"]
-
-    if partial_clone:
-        clone_cmd += ["--filter=blob:none", "--sparse"]
-
-    # Shallow clone unless a specific commit is requested
-    if not commit:
-        clone_cmd += ["--depth=1"]
+    if config.include_submodules and not config.no_checkout:
+        clone_cmd += ["--recurse-submodules", "--shallow-submodules", f"--jobs={SUBMODULE_JOBS}"]
 
-        # Prefer tag over branch when both are provided
-        if tag:
-            clone_cmd += ["--branch", tag]
-        elif branch and branch.lower() not in ("main", "master"):
-            clone_cmd += ["--branch", branch]
+    clone_cmd += _clone_filter_args(config)
 
+    clone_cmd += _clone_ref_args(config)
     clone_cmd += [url, local_path]
 
     # Clone the repository
-    await ensure_git_installed()
     await run_command(*clone_cmd)
 
+    if config.no_checkout:
+        return
+
+    # Restrict the checkout to the files that will be ingested, then check them out
+    if filtered_clone:
+        await _checkout_filtered_clone(config, token)
+        return
+
     # Checkout the subpath if it is a partial clone
     if partial_clone:
         await _checkout_partial_clone(config, token)
 
-    # Checkout the commit if it is provided
-    if commit:
-        checkout_cmd = create_git_command(["git"], local_path, url, token)
-        await run_command(*checkout_cmd, "checkout", commit)
+
+async def _fetch_single_commit(config: CloneConfig, commit: str, token: str | None) -> None:
+    """Fetch only the requested commit into a new repository and check it out.
+
+    The commit is fetched with ``--depth=1`` (and the blob filter of the clone, if any), so a single snapshot is
+    transferred instead of the whole history. Hosts that refuse to serve unadvertised commits get a fetch of the
+    history of all branches instead. With ``no_checkout``, ``HEAD`` is only detached at the commit.
+
+    Parameters
+    ----------
+    config : CloneConfig
+        The configuration for cloning the repository.
+    commit : str
+        The SHA of the commit to check out.
+    token : str | None
+        GitHub personal access token (PAT) for accessing private repositories.
+
+    """
+    git = create_git_command(["git"], config.local_path, config.url, token)
+
+    await run_command("git", "init", "--quiet", config.local_path)
+    await run_command(*git, "remote", "add", "origin", config.url)
+
+    if config.no_checkout:
+        filter_args = ["--filter=blob:none"]
+    elif _is_filtered_clone(config):
+        filter_args = [f"--filter={_blob_filter(config)}"]
+    elif config.subpath != "/":
+        filter_args = ["--filter=blob:none"]
+    else:
+        filter_args = []
+
+    try:
+        await run_command(*git, "fetch", "--quiet", "--depth=1", *filter_args, "origin", commit)
+    except RuntimeError:
+        await run_command(*git, "fetch", "--quiet", *filter_args, "origin", "+refs/heads/*:refs/remotes/origin/*")
+
+    if config.no_checkout:
+        await run_command(*git, "update-ref", "--no-deref", "HEAD", commit)
+        return
+
+    if _is_filtered_clone(config):
+        await _checkout_filtered_clone(config, token)
+        return
+
+    if config.subpath != "/":
+        await _checkout_partial_clone(config, token)
+    await run_command(*git, "checkout", "--quiet", commit)
+
+    if config.include_submodules:
+        await run_command(*git, *_submodule_update_args(config))
+
+
+async def _fetch_diff_base(config: CloneConfig, commit: str, token: str | None) -> None:
+    """Fetch the commit a checkout is compared with, unless the clone already has it.
+
+    Only the commit and its trees are fetched (``--depth=1 --filter=blob:none``): they are enough to list the files
+    that changed, and the blobs of renamed files are fetched lazily if rename detection needs them. Hosts that refuse
+    to serve unadvertised commits get a fetch of the history of all branches instead.
+
+    Parameters
+    ----------
+    config : CloneConfig
+        The configuration the repository was cloned with.
+    commit : str
+        The SHA of the commit to fetch.
+    token : str | None
+        GitHub personal access token (PAT) for accessing private repositories.
+
+    """
+    git = create_git_command(["git"], config.local_path, config.url, token)
+    if await _has_commit(git, commit):
+        return
+
+    fetch = [*git, "fetch", "--quiet", "--filter=blob:none", "origin"]
+    try:
+        await run_command(*fetch, "--depth=1", commit)
+    except RuntimeError:
+        await run_command(*fetch, "+refs/heads/*:refs/remotes/origin/*")
 
 
 async def _checkout_partial_clone(config: CloneConfig, token: str | None) -> None:
@@ -113,3 +235,398 @@ async def _checkout_partial_clone(config: CloneConfig, token: str | None) -> Non
         subpath = str(Path(subpath).parent.as_posix())
     checkout_cmd = create_git_command(["git"], config.local_path, config.url, token)
     await run_command(*checkout_cmd, "sparse-checkout", "set", subpath)
+
+
+def _clone_ref_args(config: CloneConfig) -> list[str]:
+    """Return the ``git clone`` arguments selecting the ref and history depth to clone.
+
+    Parameters
+    ----------
+    config : CloneConfig
+        The configuration for cloning the repository.
+
+    Returns
+    -------
+    list[str]
+        The depth and branch arguments.
+
+    """
+    # Commits are fetched on their own by ``_fetch_single_commit``, so the clone is always shallow
+    # Prefer tag over branch when both are provided
+    if config.tag:
+        return ["--depth=1", "--branch", config.tag]
+    if config.branch and config.branch.lower() not in ("main", "master"):
+        return ["--depth=1", "--branch", config.branch]
+    return ["--depth=1"]
+
+
+def _is_filtered_clone(config: CloneConfig) -> bool:
+    """Return ``True`` if the clone must be planned from the size limit and patterns of ``config``."""
+    return bool(config.max_file_size or config.include_patterns or config.ignore_patterns)
+
+
+def _clone_filter_args(config: CloneConfig) -> list[str]:
+    """Return the ``git clone`` arguments limiting which blobs are transferred and checked out.
+
+    Parameters
+    ----------
+    config : CloneConfig
+        The configuration for cloning the repository.
+
+    Returns
+    -------
+    list[str]
+        The filter arguments, empty for a full clone.
+
+    """
+    if config.no_checkout:
+        return ["--no-checkout", "--filter=blob:none"]
+    if _is_filtered_clone(config):
+        # The sparse-checkout rules are only known once the tree has been fetched
+        return ["--no-checkout", f"--filter={_blob_filter(config)}"]
+    if config.subpath != "/":
+        return ["--filter=blob:none", "--sparse"]
+    return []
+
+
+def _is_size_limited(config: CloneConfig) -> bool:
+    """Return ``True`` if the clone leaves out the blobs above the size limit of ``config`` (see ``_blob_filter``)."""
+    return bool(config.max_file_size) and not config.blob
+
+
+def _blob_filter(config: CloneConfig) -> str:
+    """Return the ``--filter`` spec matching the clone configuration.
+
+    Parameters
+    ----------
+    config : CloneConfig
+        The configuration for cloning the repository.
+
+    Returns
+    -------
+    str
+        ``blob:limit=<n>`` when a size limit applies, ``blob:none`` otherwise.
+
+    """
+    # Single-file ingestion reads the file regardless of its size, so only size-filter directory clones.
+    # ``blob:limit=<n>`` omits blobs of *at least* n bytes, while ingestion only skips files *larger* than the limit.
+    if config.max_file_size and not config.blob:
+        return f"blob:limit={config.max_file_size + 1}"
+    return "blob:none"
+
+
+async def _checkout_filtered_clone(config: CloneConfig, token: str | None) -> None:
+    """Configure non-cone sparse-checkout rules for a filtered clone and check out the working tree.
+
+    Parameters
+    ----------
+    config : CloneConfig
+        The configuration for cloning the repository, including the size limit and patterns.
+    token : str | None
+        GitHub personal access token (PAT) for accessing private repositories.
+
+    """
+    git = create_git_command(["git"], config.local_path, config.url, token)
+    rules = await _sparse_checkout_rules(config, git, config.commit or "HEAD", blobs_local=False)
+
+    await run_command(*git, "sparse-checkout", "set", "--no-cone", "--", *rules)
+    await run_command(*git, "checkout", *([config.commit] if config.commit else []))
+
+    if config.include_submodules:
+        await run_command(*git, *_submodule_update_args(config))
+
+
+async def _clone_from_cache(config: CloneConfig, token: str | None) -> None:
+    """Check out the requested revision from the clone cache.
+
+    The working copy borrows the objects of the bare mirror through ``objects/info/alternates``, so no object is
+    copied: only the checked-out files are written. The mirror of a fork itself borrows the objects it shares with
+    the mirror of its upstream, so only the objects the fork adds are ever fetched.
+
+    The mirror may be evicted once checked out from, so every git command reading its objects runs before then.
+    Working copies compared with another revision, which git keeps reading, copy the objects they need instead.
+
+    Parameters
+    ----------
+    config : CloneConfig
+        The configuration for cloning the repository.
+    token : str | None
+        GitHub personal access token (PAT) for accessing private repositories.
+
+    """
+    async with clone_cache.mirror(
+        config.url,
+        branch=config.branch,
+        tag=config.tag,
+        commit=config.commit,
+        token=token,
+    ) as (mirror, sha):
+        await run_command("git", "init", "--quiet", config.local_path)
+        git_dir = Path(config.local_path) / ".git"
+        (git_dir / "objects" / "info" / "alternates").write_text(f"{(mirror / 'objects').resolve()}\n")
+        if (mirror / "shallow").exists():
+            shutil.copyfile(mirror / "shallow", git_dir / "shallow")
+
+        git = create_git_command(["git"], config.local_path, config.url, token)
+        await run_command(*git, "remote", "add", "origin", config.url)
+
+        if config.blob or config.subpath != "/" or _is_filtered_clone(config):
+            rules = await _sparse_checkout_rules(config, git, sha, blobs_local=True)
+            await run_command(*git, "sparse-checkout", "set", "--no-cone", "--", *rules)
+        await run_command(*git, "checkout", "--quiet", "--detach", sha)
+
+        if config.include_submodules:
+            await _clone_submodules_from_cache(config, git, sha, token)
+
+        if config.diff_base:
+            await run_command(*git, "repack", "-a", "-d", "--quiet")
+            (git_dir / "objects" / "info" / "alternates").unlink()
+
+
+async def _clone_submodules_from_cache(config: CloneConfig, git: list[str], sha: str, token: str | None) -> None:
+    """Check out the submodules of a repository checked out from the clone cache.
+
+    Every submodule is checked out from its own mirror at the commit its parent pins, in parallel and recursively.
+    Submodules pinned at the same commit by different parent repositories therefore share one mirror and only the
+    first one fetches it. The size limit applies inside submodules, and so do the include and ignore patterns, once
+    rebased onto the path of each submodule. Submodules that no include pattern selects are not checked out.
+
+    If a submodule cannot be checked out, the others are cancelled before the error is raised.
+
+    Parameters
+    ----------
+    config : CloneConfig
+        The configuration the parent repository was cloned with.
+    git : list[str]
+        The base git command, bound to the parent repository.
+    sha : str
+        The commit of the parent repository that was checked out.
+    token : str | None
+        GitHub personal access token (PAT) for accessing private repositories.
+
+    """
+    submodules = await _list_submodules(git, sha, config.url)
+    configs = []
+    for path, url, commit in submodules:
+        # Submodules outside of the sparse checkout have no directory in the working tree
+        if not (Path(config.local_path) / path).is_dir():
+            continue
+        include_patterns = rebase_submodule_patterns(config.include_patterns, path)
+        if include_patterns is not None and not include_patterns:
+            continue
+        configs.append(
+            replace(
+                config,
+                url=url,
+                local_path=str(Path(config.local_path) / path),
+                commit=commit,
+                branch=None,
+                tag=None,
+                subpath="/",
+                blob=False,
+                include_patterns=include_patterns,
+                ignore_patterns=rebase_submodule_patterns(config.ignore_patterns, path),
+                diff_base=None,
+            ),
+        )
+
+    tasks = [asyncio.create_task(_clone_from_cache(submodule_config, token)) for submodule_config in configs]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # A failed or cancelled checkout leaves no submodule running once the mirror of the parent is released
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _list_submodules(git: list[str], rev: str, parent_url: str) -> list[tuple[str, str, str]]:
+    """List the submodules of ``rev`` with their URL and the commit they are pinned at.
+
+    Parameters
+    ----------
+    git : list[str]
+        The base git command, bound to the local repository.
+    rev : str
+        The revision whose submodules are listed.
+    parent_url : str
+        The URL of the repository, against which relative submodule URLs are resolved.
+
+    Returns
+    -------
+    list[tuple[str, str, str]]
+        The path, URL and pinned commit of each submodule.
+
+    """
+    gitlinks = await _list_gitlinks(git, rev)
+    if not gitlinks:
+        return []
+
+    stdout, _ = await run_command(
+        *git,
+        "config",
+        "-z",
+        "--blob",
+        f"{rev}:.gitmodules",
+        "--get-regexp",
+        r"^submodule\..*\.(path|url)$",
+    )
+    settings: dict[str, dict[str, str]] = {}
+    for entry in stdout.decode().split("\0"):
+        if entry:
+            key, value = entry.split("\n", 1)
+            name, _, setting = key[len("submodule.") :].rpartition(".")
+            settings.setdefault(name, {})[setting] = value
+
+    submodules = []
+    for setting in settings.values():
+        path, url = setting.get("path"), setting.get("url")
+        if path in gitlinks and url:
+            if url.startswith(("./", "../")):
+                url = urljoin(parent_url.rstrip("/") + "/", url)
+            submodules.append((path, url, gitlinks[path]))
+    return submodules
+
+
+async def _list_gitlinks(git: list[str], rev: str) -> dict[str, str]:
+    """Return the commit each submodule of ``rev`` is pinned at, keyed by its path."""
+    stdout, _ = await run_command(*git, "ls-tree", "-r", "-z", rev)
+    gitlinks = {}
+    for entry in stdout.decode().split("\0"):
+        if entry.startswith("160000 "):
+            meta, path = entry.split("\t", 1)
+            gitlinks[path] = meta.split()[2]
+    return gitlinks
+
+
+def _submodule_update_args(config: CloneConfig) -> list[str]:
+    """Return the ``git submodule update`` arguments fetching shallow, filtered submodules in parallel.
+
+    Parameters
+    ----------
+    config : CloneConfig
+        The configuration for cloning the repository.
+
+    Returns
+    -------
+    list[str]
+        The ``submodule update`` command and its arguments.
+
+    """
+    args = ["submodule", "update", "--init", "--recursive", "--depth=1", f"--jobs={SUBMODULE_JOBS}"]
+    if _is_filtered_clone(config):
+        args.append(f"--filter={_blob_filter(config)}")
+    return args
+
+
+async def _sparse_checkout_rules(config: CloneConfig, git: list[str], rev: str, *, blobs_local: bool) -> list[str]:
+    """Return the sparse-checkout rules selecting the files of ``rev`` that will be ingested.
+
+    Parameters
+    ----------
+    config : CloneConfig
+        The configuration for cloning the repository, including the size limit and patterns.
+    git : list[str]
+        The base git command, bound to the local repository.
+    rev : str
+        The revision to check out.
+    blobs_local : bool
+        Whether all blobs are available locally, in which case oversized files are found by size rather than by
+        the blobs the clone filter omitted.
+
+    Returns
+    -------
+    list[str]
+        The non-cone sparse-checkout rules.
+
+    """
+    if config.blob:
+        # Only the requested file is needed, whatever the patterns say
+        return create_sparse_checkout_rules(subpath=config.subpath)
+
+    excluded_paths: list[str] = []
+    if config.max_file_size:
+        if blobs_local:
+            excluded_paths = await _list_oversized_paths(git, rev, config.max_file_size)
+        else:
+            excluded_paths = await _list_missing_blob_paths(git, rev)
+
+    include_patterns = config.include_patterns
+    if include_patterns and config.include_submodules:
+        # The directory of a submodule must be checked out for the include patterns to reach into the submodule
+        include_patterns = include_patterns | {
+            f"/{_escape_sparse_path(path)}"
+            for path in await _list_gitlinks(git, rev)
+            if rebase_submodule_patterns(include_patterns, path)
+        }
+
+    return create_sparse_checkout_rules(
+        subpath=config.subpath,
+        include_patterns=include_patterns,
+        ignore_patterns=config.ignore_patterns,
+        excluded_paths=excluded_paths,
+    )
+
+
+async def _list_oversized_paths(git: list[str], rev: str, max_file_size: int) -> list[str]:
+    """List the paths of ``rev`` whose blobs are larger than ``max_file_size``.
+
+    Parameters
+    ----------
+    git : list[str]
+        The base git command, bound to the local repository.
+    rev : str
+        The revision whose tree is inspected.
+    max_file_size : int
+        The maximum file size in bytes.
+
+    Returns
+    -------
+    list[str]
+        The repository paths of the oversized blobs.
+
+    """
+    stdout, _ = await run_command(*git, "ls-tree", "-r", "-l", "-z", rev)
+    paths: list[str] = []
+    for entry in stdout.decode().split("\0"):
+        if not entry:
+            continue
+        meta, path = entry.split("\t", 1)
+        size = meta.split()[3]
+        if size != "-" and int(size) > max_file_size:
+            paths.append(path)
+    return paths
+
+
+async def _list_missing_blob_paths(git: list[str], rev: str) -> list[str]:
+    """List the paths of ``rev`` whose blobs were omitted by the clone filter.
+
+    Neither command below triggers a lazy fetch of the missing blobs (unlike ``ls-tree -l``).
+
+    Parameters
+    ----------
+    git : list[str]
+        The base git command, bound to the local repository.
+    rev : str
+        The revision whose tree is inspected.
+
+    Returns
+    -------
+    list[str]
+        The repository paths of the missing blobs.
+
+    """
+    stdout, _ = await run_command(*git, "rev-list", "--objects", "--no-walk", "--missing=print", rev)
+    missing = {line[1:] for line in stdout.decode().splitlines() if line.startswith("?")}
+    if not missing:
+        return []
+
+    stdout, _ = await run_command(*git, "ls-tree", "-r", "-z", rev)
+    paths: list[str] = []
+    for entry in stdout.decode().split("\0"):
+        if not entry:
+            continue
+        meta, path = entry.split("\t", 1)
+        if meta.split()[2] in missing:
+            paths.append(path)
+    return paths
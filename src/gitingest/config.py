@@ -1,14 +1,51 @@
 """Configuration file for the project."""
 
+import os
+import sys
 import tempfile
 from pathlib import Path
 
 MAX_FILE_SIZE = 10 * 1024 * 1024  # Maximum size of a single file to process (10 MB)
+TRUNCATED_HEAD_SIZE = 64 * 1024  # Bytes kept from the start of a file above the maximum size, when truncating
+TRUNCATED_TAIL_SIZE = 16 * 1024  # Bytes kept from the end of a file above the maximum size, when truncating
 MAX_DIRECTORY_DEPTH = 20  # Maximum depth of directory traversal
 MAX_FILES = 10_000  # Maximum number of files to process
 MAX_TOTAL_SIZE_BYTES = 500 * 1024 * 1024  # Maximum size of output file (500 MB)
 DEFAULT_TIMEOUT = 60  # seconds
+MAX_GIT_PROCESSES = 2 * (os.cpu_count() or 1)  # Git subprocesses allowed to run at once
+SUBMODULE_JOBS = 4  # Submodules fetched in parallel by ``git submodule update``
+REPO_EXISTS_CACHE_TTL = 10 * 60  # How long a repository found to exist is remembered (seconds)
+REPO_MISSING_CACHE_TTL = 60  # How long a missing or private repository is remembered (seconds)
+REMOTE_REFS_CACHE_TTL = 60  # How long the branches and tags advertised by a remote are remembered (seconds)
+ESTIMATED_BYTES_PER_TOKEN = 4  # Average length of a token of source code, for estimates made from file sizes
+CONTENT_BATCH_MAX_SIZE = 64 * 1024 * 1024  # Bytes of files held in memory at once while processing them (64 MB)
 
 OUTPUT_FILE_NAME = "digest.txt"
 
 TMP_BASE_PATH = Path(tempfile.gettempdir()) / "gitingest"
+
+
+def _user_cache_dir() -> Path:
+    """Return the directory of the current user where the platform keeps application caches."""
+    if sys.platform == "win32":
+        return Path(os.getenv("LOCALAPPDATA") or Path.home() / "AppData" / "Local") / "gitingest" / "Cache"
+    if sys.platform == "darwin":
+        return Path.home() / "Library" / "Caches" / "gitingest"
+    return Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache") / "gitingest"
+
+
+# Private to the current user: other users must not be able to plant entries that would be served as hits
+CACHE_PATH = Path(os.getenv("GITINGEST_CACHE_DIR") or _user_cache_dir())
+CLONE_CACHE_PATH = CACHE_PATH / "mirrors"
+CLONE_CACHE_MAX_SIZE = 5 * 1024 * 1024 * 1024  # Disk budget of the bare-mirror clone cache (5 GB)
+# Forks whose mirrors borrow the objects of an upstream mirror, as comma-separated ``<url pattern>=<upstream url>``
+# pairs, e.g. ``https://github.com/*/linux=https://github.com/torvalds/linux``
+CLONE_CACHE_UPSTREAMS = dict(
+    entry.split("=", 1) for entry in os.getenv("GITINGEST_CLONE_CACHE_UPSTREAMS", "").split(",") if "=" in entry
+)
+DIGEST_CACHE_PATH = CACHE_PATH / "digests"
+DIGEST_CACHE_MAX_SIZE = 1024 * 1024 * 1024  # Disk budget of the digest result cache (1 GB)
+FILE_INDEX_PATH = CACHE_PATH / "files.sqlite3"
+FILE_INDEX_TTL = 30 * 24 * 60 * 60  # How long the index keeps the files of a directory no longer ingested (seconds)
+CONTENT_CACHE_PATH = CACHE_PATH / "contents.sqlite3"
+CONTENT_CACHE_MAX_SIZE = 512 * 1024 * 1024  # Disk budget of the processed file content cache (512 MB)
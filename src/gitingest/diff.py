@@ -0,0 +1,216 @@
+"""Ingestion of the files changed between two revisions of a Git repository."""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import stat
+import tarfile
+from dataclasses import dataclass
+from itertools import chain
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+from gitingest.archive import _ArchiveEntry, _build_tree, _tar_entries
+from gitingest.schemas import FileSystemNodeType
+from gitingest.utils.compat_func import readlink
+from gitingest.utils.git_utils import run_command
+
+if TYPE_CHECKING:
+    from gitingest.schemas import FileSystemNode, IngestionQuery
+
+# Statuses of ``git diff --name-status`` followed by two paths, the source and the destination
+_TWO_PATH_STATUSES = ("R", "C")
+# Total size of the paths passed to a single ``git archive``, well below the argument limits of the platforms
+_ARCHIVE_PATHS_MAX_BYTES = 64 * 1024
+
+
+@dataclass(frozen=True)
+class ChangedFile:
+    """File reported by ``git diff --name-status``.
+
+    Attributes
+    ----------
+    status : str
+        The change status: ``"A"`` (added), ``"M"`` (modified), ``"D"`` (deleted), ``"T"`` (type changed), or
+        ``"R"`` / ``"C"`` (renamed / copied, followed by a similarity score).
+    path : str
+        The path of the file, relative to the ingested directory.
+    old_path : str | None
+        The path the file was renamed or copied from.
+
+    """
+
+    status: str
+    path: str
+    old_path: str | None = None
+
+
+async def list_changed_files(repo: Path, base: str, target: str | None = None) -> list[ChangedFile]:
+    """List the files of a Git working copy that changed between two revisions.
+
+    Parameters
+    ----------
+    repo : Path
+        The directory of the working copy. Changes outside of it are left out.
+    base : str
+        The revision to compare with.
+    target : str | None
+        The revision compared with ``base``, or ``None`` to compare it with the files on disk.
+
+    Returns
+    -------
+    list[ChangedFile]
+        The changed files, with paths relative to ``repo``.
+
+    """
+    stdout, _ = await run_command(
+        "git",
+        "-C",
+        str(repo),
+        "diff",
+        "--name-status",
+        "-z",
+        "--relative",
+        base,
+        *([target] if target else []),
+        "--",
+    )
+
+    fields = stdout.decode("utf-8", errors="surrogateescape").split("\0")
+    changes: list[ChangedFile] = []
+    i = 0
+    while i + 1 < len(fields):
+        status = fields[i]
+        if status.startswith(_TWO_PATH_STATUSES):
+            changes.append(ChangedFile(status=status, path=fields[i + 2], old_path=fields[i + 1]))
+            i += 3
+        else:
+            changes.append(ChangedFile(status=status, path=fields[i + 1]))
+            i += 2
+    return changes
+
+
+async def list_untracked_files(repo: Path) -> list[str]:
+    """List the files of a Git working copy that are neither tracked nor ignored.
+
+    Parameters
+    ----------
+    repo : Path
+        The directory of the working copy. Files outside of it are left out.
+
+    Returns
+    -------
+    list[str]
+        The paths of the untracked files, relative to ``repo``.
+
+    """
+    stdout, _ = await run_command("git", "-C", str(repo), "ls-files", "--others", "--exclude-standard", "-z")
+    return [name for name in stdout.decode("utf-8", errors="surrogateescape").split("\0") if name]
+
+
+async def read_diff(query: IngestionQuery) -> FileSystemNode:
+    """Build the tree of the files changed since ``query.diff_base``, without enumerating the others.
+
+    The files are read from ``query.diff_target`` if it is set, with ``git archive`` of the changed paths (in batches
+    for long lists), and from disk otherwise, so that uncommitted changes and untracked files are included. The
+    subpath, patterns and limits of the query apply to the changed files as to a full ingest. Deleted files are left
+    out.
+
+    Parameters
+    ----------
+    query : IngestionQuery
+        The parsed query of a Git working copy, with ``diff_base`` set.
+
+    Returns
+    -------
+    FileSystemNode
+        The root directory node, with the content of the changed files in memory.
+
+    Raises
+    ------
+    ValueError
+        If ``query.diff_base`` is not set.
+
+    """
+    if not query.diff_base:
+        msg = "The 'diff_base' parameter is required."
+        raise ValueError(msg)
+
+    changes = await list_changed_files(query.local_path, query.diff_base, query.diff_target)
+    names = [change.path for change in changes if change.status != "D"]
+
+    archives: list[bytes] | None = None
+    if query.diff_target:
+        archives = []
+        for batch in _pathspec_batches(names):
+            archive, _ = await run_command(
+                "git",
+                "-C",
+                str(query.local_path),
+                "archive",
+                "--format=tar",
+                query.diff_target,
+                "--",
+                *batch,
+            )
+            archives.append(archive)
+    else:
+        names += await list_untracked_files(query.local_path)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _build_diff_tree, query, names, archives)
+
+
+def _pathspec_batches(names: Iterable[str]) -> Iterator[list[str]]:
+    """Yield the literal pathspecs of ``names``, in batches short enough to be passed as arguments."""
+    batch: list[str] = []
+    size = 0
+    for name in names:
+        pathspec = f":(literal){name}"
+        length = len(pathspec.encode("utf-8", errors="surrogateescape")) + 1  # Arguments are NUL-terminated
+        if batch and size + length > _ARCHIVE_PATHS_MAX_BYTES:
+            yield batch
+            batch, size = [], 0
+        batch.append(pathspec)
+        size += length
+    if batch:
+        yield batch
+
+
+def _build_diff_tree(query: IngestionQuery, names: list[str], archives: list[bytes] | None) -> FileSystemNode:
+    """Return the tree of the changed files ``names``, read from ``archives`` or from disk."""
+    subpath = Path(query.subpath.strip("/")).as_posix()
+    # The subpath exists even if none of its files changed
+    root_entry = _ArchiveEntry(name=subpath, type=FileSystemNodeType.DIRECTORY, size=0, read=bytes)
+
+    if archives is None:
+        return _build_tree(chain([root_entry], _working_tree_entries(query.local_path, names)), query)
+    return _build_tree(chain([root_entry], _archives_entries(archives)), query)
+
+
+def _archives_entries(archives: Iterable[bytes]) -> Iterator[_ArchiveEntry]:
+    """Yield the members of the tar ``archives``, one after the other."""
+    for archive in archives:
+        with tarfile.open(fileobj=io.BytesIO(archive), mode="r|") as tar:
+            yield from _tar_entries(tar)
+
+
+def _working_tree_entries(root: Path, names: Iterable[str]) -> Iterator[_ArchiveEntry]:
+    """Yield the files and symlinks ``names`` of the directory ``root``, skipping the missing ones."""
+    for name in names:
+        path = root / name
+        try:
+            st = path.lstat()
+        except FileNotFoundError:  # Outside of a sparse checkout
+            continue
+        if stat.S_ISLNK(st.st_mode):
+            yield _ArchiveEntry(
+                name=name,
+                type=FileSystemNodeType.SYMLINK,
+                size=0,
+                read=bytes,
+                link_target=str(readlink(path)),
+            )
+        elif stat.S_ISREG(st.st_mode):
+            yield _ArchiveEntry(name=name, type=FileSystemNodeType.FILE, size=st.st_size, read=path.read_bytes)
@@ -7,15 +7,37 @@ import shutil
 import sys
 import warnings
 from contextlib import asynccontextmanager
+from functools import partial
 from pathlib import Path
-from typing import AsyncGenerator
+from typing import TYPE_CHECKING, AsyncGenerator, Callable, Final, TypeVar
 
+from watchfiles import Change, awatch
+
+from gitingest.archive import fetch_archive
 from gitingest.clone import clone_repo
 from gitingest.config import MAX_FILE_SIZE
-from gitingest.ingestion import ingest_query
+from gitingest.diff import read_diff
+from gitingest.ingestion import build_node
+from gitingest.listing import read_listing
+from gitingest.output_formatter import format_node, write_node
 from gitingest.query_parser import IngestionQuery, parse_query
+from gitingest.schemas import FileSystemNodeType
 from gitingest.utils.auth import resolve_token
+from gitingest.utils.digest_cache import digest_cache, digest_cache_key
+from gitingest.utils.file_utils import write_digest
+from gitingest.utils.git_utils import close_http_client, resolve_commit
 from gitingest.utils.ignore_patterns import load_ignore_patterns
+from gitingest.utils.ingestion_utils import _should_exclude
+from gitingest.utils.query_parser_utils import _is_valid_git_commit_hash
+
+if TYPE_CHECKING:
+    from typing import Awaitable
+
+    from gitingest.schemas import FileSystemNode
+
+T = TypeVar("T")
+
+_IGNORE_FILENAMES: Final[tuple[str, ...]] = (".gitignore", ".gitingestignore")
 
 
 async def ingest_async(
@@ -32,12 +54,24 @@ async def ingest_async(
     output: str | None = None,
     remove_comments: bool = False,
     comment_types: set | None = None,
+    diff: str | None = None,
+    structure_only: bool = False,
+    plan: bool = False,
+    fold_duplicates: bool = False,
+    include_generated: bool = False,
+    truncate_large_files: bool = False,
+    copy_files: bool = False,
 ) -> tuple[str, str, str]:
     """Ingest a source and process its contents.
 
     This function analyzes a source (URL or local path), clones the corresponding repository (if applicable),
     and processes its files according to the specified query parameters. It returns a summary, a tree-like
     structure of the files, and the content of the files. The results can optionally be written to an output file.
+    Remote repositories are resolved to a commit first, and digests already computed for that commit and the same
+    options are returned from the digest cache without cloning. Otherwise, the repository is read from an archive
+    streamed from the host when it serves one, and cloned if not.
+    With ``diff``, only the files changed between two revisions are listed, read and formatted. With
+    ``structure_only`` or ``plan``, no file is read, and remote repositories are cloned without any of their files.
 
     Parameters
     ----------
@@ -68,6 +102,28 @@ async def ingest_async(
         Whether to remove comments from processed files to reduce token count (default: ``False``).
     comment_types : set | None
         Set of comment types to remove (default: ``None``).
+    diff : str | None
+        Only ingest the files changed between two revisions, given as ``<base>..<target>``, or since ``<base>``:
+        compared with the files on disk for a local directory, with the ingested revision for a remote repository.
+        The target of a remote repository replaces the branch or commit of its URL (default: ``None``).
+    structure_only : bool
+        If ``True``, only generate the directory structure, without reading the files (default: ``False``).
+    plan : bool
+        If ``True``, report the size and estimated token count of each file instead of its content, without reading
+        nor downloading the files (default: ``False``).
+    fold_duplicates : bool
+        If ``True``, output the content of identical files once, the other copies referring to the first one
+        (default: ``False``).
+    include_generated : bool
+        If ``True``, output the contents of generated, minified and vendored files instead of a placeholder
+        (default: ``False``).
+    truncate_large_files : bool
+        If ``True``, output the start and end of the files above ``max_file_size`` instead of skipping them
+        (default: ``False``).
+    copy_files : bool
+        If ``True``, copy the bytes of the plain text files read from disk into the ``output`` file instead of
+        decoding them, and return an empty content (see ``write_node``). Requires ``output`` to be a file path
+        (default: ``False``).
 
     Returns
     -------
@@ -75,7 +131,12 @@ async def ingest_async(
         A tuple containing:
         - A summary string of the analyzed repository or directory.
         - A tree-like string representation of the file structure.
-        - The content of the files in the repository or directory.
+        - The content of the files in the repository or directory, or ``""`` with ``copy_files``.
+
+    Raises
+    ------
+    ValueError
+        If ``copy_files`` is set without an ``output`` file.
 
     """
     token = resolve_token(token)
@@ -99,12 +160,47 @@ async def ingest_async(
     query.remove_comments = remove_comments
     if comment_types is not None:
         query.comment_types = comment_types
+    query.structure_only = structure_only or plan
+    query.plan = plan
+    query.fold_duplicates = fold_duplicates
+    query.include_generated = include_generated
+    query.truncate_large_files = truncate_large_files
+
+    if diff:
+        await _apply_diff_range(query, diff, token=token)
+
+    copy_path = _copy_path(output, copy_files=copy_files)
 
-    async with _clone_repo_if_remote(query, token=token):
-        summary, tree, content = ingest_query(query)
+    # Identical requests for an already-ingested commit are served from the digest cache
+    loop = asyncio.get_running_loop()
+    cache_key = await digest_cache_key(query, token=token)
+    cached = await loop.run_in_executor(None, digest_cache.get, cache_key) if cache_key else None
+    if cached:
+        summary, tree, content = cached
         await _write_output(tree, content=content, target=output)
         return summary, tree, content
 
+    # Formatting and ingestion walk and read the whole tree, keep them off the event loop
+    format_root = partial(_format_node, query=query, copy_path=copy_path)
+    root = await fetch_archive(query, token=token) if query.url else None
+    if root is not None:
+        summary, tree, content = await loop.run_in_executor(None, format_root, root)
+    else:
+        async with _clone_repo_if_remote(query, token=token):
+            if query.diff_base:
+                root = await read_diff(query)
+            elif query.url and query.structure_only and query.type != "blob":
+                root = await read_listing(query, token=token)
+            else:
+                root = await loop.run_in_executor(None, build_node, query)
+            summary, tree, content = await loop.run_in_executor(None, format_root, root)
+
+    # With ``copy_files``, the content was only written to the output
+    if cache_key and copy_path is None:
+        await loop.run_in_executor(None, digest_cache.put, cache_key, (summary, tree, content))
+    await _write_output(tree, content=content, target=output if copy_path is None else None)
+    return summary, tree, content
+
 
 def ingest(
     source: str,
@@ -120,6 +216,13 @@ def ingest(
     output: str | None = None,
     remove_comments: bool = False,
     comment_types: set | None = None,
+    diff: str | None = None,
+    structure_only: bool = False,
+    plan: bool = False,
+    fold_duplicates: bool = False,
+    include_generated: bool = False,
+    truncate_large_files: bool = False,
+    copy_files: bool = False,
 ) -> tuple[str, str, str]:
     """Provide a synchronous wrapper around ``ingest_async``.
 
@@ -152,6 +255,26 @@ def ingest(
         File path where the summary and content should be written.
         If ``"-"`` (dash), the results are written to ``stdout``.
         If ``None``, the results are not written to a file.
+    diff : str | None
+        Only ingest the files changed between two revisions, given as ``<base>..<target>``, or since ``<base>``
+        (default: ``None``).
+    structure_only : bool
+        If ``True``, only generate the directory structure, without reading the files (default: ``False``).
+    plan : bool
+        If ``True``, report the size and estimated token count of each file instead of its content
+        (default: ``False``).
+    fold_duplicates : bool
+        If ``True``, output the content of identical files once, the other copies referring to the first one
+        (default: ``False``).
+    include_generated : bool
+        If ``True``, output the contents of generated, minified and vendored files instead of a placeholder
+        (default: ``False``).
+    truncate_large_files : bool
+        If ``True``, output the start and end of the files above ``max_file_size`` instead of skipping them
+        (default: ``False``).
+    copy_files : bool
+        If ``True``, copy the bytes of the plain text files read from disk into the ``output`` file instead of
+        decoding them, and return an empty content (default: ``False``).
 
     Returns
     -------
@@ -159,7 +282,7 @@ def ingest(
         A tuple containing:
         - A summary string of the analyzed repository or directory.
         - A tree-like string representation of the file structure.
-        - The content of the files in the repository or directory.
+        - The content of the files in the repository or directory, or ``""`` with ``copy_files``.
 
     See Also
     --------
@@ -167,23 +290,168 @@ def ingest(
 
     """
     return asyncio.run(
-        ingest_async(
-            source=source,
-            max_file_size=max_file_size,
-            include_patterns=include_patterns,
-            exclude_patterns=exclude_patterns,
-            branch=branch,
-            tag=tag,
-            include_gitignored=include_gitignored,
-            include_submodules=include_submodules,
-            token=token,
-            output=output,
-            remove_comments=remove_comments,
-            comment_types=comment_types,
+        _closing_http_client(
+            ingest_async(
+                source=source,
+                max_file_size=max_file_size,
+                include_patterns=include_patterns,
+                exclude_patterns=exclude_patterns,
+                branch=branch,
+                tag=tag,
+                include_gitignored=include_gitignored,
+                include_submodules=include_submodules,
+                token=token,
+                output=output,
+                remove_comments=remove_comments,
+                comment_types=comment_types,
+                diff=diff,
+                structure_only=structure_only,
+                plan=plan,
+                fold_duplicates=fold_duplicates,
+                include_generated=include_generated,
+                truncate_large_files=truncate_large_files,
+                copy_files=copy_files,
+            ),
         ),
     )
 
 
+async def watch_async(
+    source: str,
+    *,
+    max_file_size: int = MAX_FILE_SIZE,
+    include_patterns: str | set[str] | None = None,
+    exclude_patterns: str | set[str] | None = None,
+    include_gitignored: bool = False,
+    output: str | None = None,
+    remove_comments: bool = False,
+    comment_types: set | None = None,
+    fold_duplicates: bool = False,
+    include_generated: bool = False,
+    truncate_large_files: bool = False,
+    on_update: Callable[[str], None] | None = None,
+    stop_event: asyncio.Event | None = None,
+) -> None:
+    """Ingest a local directory, then keep its digest up to date as its files change.
+
+    Changes are picked up with inotify (or the native API of the platform), falling back to polling where it is not
+    available; set ``WATCHFILES_FORCE_POLLING`` to force polling, e.g. on network file systems. Bursts of changes are
+    applied together. When they only modify files already in the digest, the tree is kept as is and only the sections
+    of these files are processed again, the others being reused from the file index. Otherwise, the directory is
+    walked again, with the patterns of the ``.gitignore`` and ``.gitingestignore`` files loaded again if one of them
+    changed. Updates that fail, e.g. while the directory is being moved, are reported as warnings and the directory
+    is still watched.
+
+    Parameters
+    ----------
+    source : str
+        The local directory or file to watch.
+    max_file_size : int
+        Maximum allowed file size for file ingestion. Files larger than this size are ignored (default: 10 MB).
+    include_patterns : str | set[str] | None
+        Pattern or set of patterns specifying which files to include. If ``None``, all files are included.
+    exclude_patterns : str | set[str] | None
+        Pattern or set of patterns specifying which files to exclude. If ``None``, no files are excluded.
+    include_gitignored : bool
+        If ``True``, include files ignored by ``.gitignore`` and ``.gitingestignore`` (default: ``False``).
+    output : str | None
+        File path where the digest is written after every update.
+        If ``"-"`` (dash), the results are written to ``stdout``.
+        If ``None``, the results are not written to a file.
+    remove_comments : bool
+        Whether to remove comments from processed files to reduce token count (default: ``False``).
+    comment_types : set | None
+        Set of comment types to remove (default: ``None``).
+    fold_duplicates : bool
+        If ``True``, output the content of identical files once, the other copies referring to the first one
+        (default: ``False``).
+    include_generated : bool
+        If ``True``, output the contents of generated, minified and vendored files instead of a placeholder
+        (default: ``False``).
+    truncate_large_files : bool
+        If ``True``, output the start and end of the files above ``max_file_size`` instead of skipping them
+        (default: ``False``).
+    on_update : Callable[[str], None] | None
+        Called with the summary of the digest after the initial ingest and every update.
+    stop_event : asyncio.Event | None
+        Stops watching once set. If ``None``, watching goes on until the task is cancelled.
+
+    Raises
+    ------
+    ValueError
+        If ``source`` is a remote repository or an archive, which cannot change under the watcher.
+
+    """
+    query = await parse_query(
+        source=source,
+        max_file_size=max_file_size,
+        from_web=False,
+        include_patterns=include_patterns,
+        ignore_patterns=exclude_patterns,
+    )
+    if query.url or query.type == "archive":
+        msg = "Watch mode only supports local directories and files"
+        raise ValueError(msg)
+
+    ignore_patterns = set(query.ignore_patterns)  # Before the ignore files, which are loaded again when they change
+    if not include_gitignored:
+        _apply_gitignores(query)
+
+    query.remove_comments = remove_comments
+    if comment_types is not None:
+        query.comment_types = comment_types
+    query.fold_duplicates = fold_duplicates
+    query.include_generated = include_generated
+    query.truncate_large_files = truncate_large_files
+
+    loop = asyncio.get_running_loop()
+
+    async def _publish(root: FileSystemNode) -> None:
+        summary, tree, content = await loop.run_in_executor(None, format_node, root, query)
+        await _write_output(tree, content=content, target=output)
+        if on_update is not None:
+            on_update(summary)
+
+    root = await loop.run_in_executor(None, build_node, query)
+    await _publish(root)
+    watch_filter = _watch_filter(query, output, ignore_files=not include_gitignored)
+    async for changes in awatch(query.local_path, watch_filter=watch_filter, stop_event=stop_event):
+        update = partial(_apply_changes, root, query, changes)
+        if not include_gitignored and any(Path(path).name in _IGNORE_FILENAMES for _, path in changes):
+            update = partial(_reload_ignore_files, query, ignore_patterns)
+        try:
+            root = await loop.run_in_executor(None, update)
+        except (OSError, ValueError) as exc:  # e.g. the directory is being moved: keep watching for it to come back
+            warnings.warn(f"Failed to update the digest of {source}: {exc}", RuntimeWarning, stacklevel=2)
+            continue
+        await _publish(root)
+
+
+def _format_node(root: FileSystemNode, *, query: IngestionQuery, copy_path: Path | None) -> tuple[str, str, str]:
+    """Format ``root`` with ``format_node``, or write it to ``copy_path`` with ``write_node`` if it is set."""
+    if copy_path is None:
+        return format_node(root, query)
+    summary, tree = write_node(root, query, copy_path, copy_files=True)
+    return summary, tree, ""
+
+
+def _copy_path(output: str | None, *, copy_files: bool) -> Path | None:
+    """Return the path of the output file the files are copied into with ``copy_files``, or ``None`` without it.
+
+    Raises
+    ------
+    ValueError
+        If ``output`` is not a file path.
+
+    """
+    if not copy_files:
+        return None
+    if output is None or output == "-":
+        msg = "copy_files requires an output file"
+        raise ValueError(msg)
+    return Path(output)
+
+
 def _override_branch_and_tag(query: IngestionQuery, branch: str | None, tag: str | None) -> None:
     """Compare the caller-supplied ``branch`` and ``tag`` with the ones already in ``query``.
 
@@ -221,6 +489,57 @@ def _override_branch_and_tag(query: IngestionQuery, branch: str | None, tag: str
         query.branch = None
 
 
+async def _apply_diff_range(query: IngestionQuery, diff: str, *, token: str | None) -> None:
+    """Restrict ``query`` to the files changed in the revision range ``diff``.
+
+    The revisions of a remote repository are resolved to commits, and the target one is checked out instead of the
+    revision of the URL. Those of a local working copy are left for ``git`` to resolve.
+
+    Parameters
+    ----------
+    query : IngestionQuery
+        The query to update.
+    diff : str
+        The revision range, ``<base>..<target>`` or ``<base>``. ``<base>..`` compares with ``HEAD``.
+    token : str | None
+        GitHub personal access token (PAT) for accessing private repositories.
+
+    Raises
+    ------
+    ValueError
+        If the range is malformed, for instance a symmetric ``<base>...<target>`` range.
+
+    """
+    base, separator, target = diff.partition("..")
+    if not base or target.startswith("."):
+        msg = f"Invalid diff range {diff!r}: expected <base>..<target> or <base>"
+        raise ValueError(msg)
+    if separator and not target:
+        target = "HEAD"
+
+    if not query.url:
+        query.diff_base = base
+        query.diff_target = target or None
+        return
+
+    query.diff_base = await _resolve_remote_revision(query.url, base, token=token)
+    if target:
+        query.commit = await _resolve_remote_revision(query.url, target, token=token)
+        query.branch = query.tag = None
+
+
+async def _resolve_remote_revision(url: str, revision: str, *, token: str | None) -> str:
+    """Resolve a commit SHA, branch or tag of a remote repository to a commit SHA."""
+    if _is_valid_git_commit_hash(revision):
+        return revision
+    if revision == "HEAD":
+        return await resolve_commit(url, token=token)
+    try:
+        return await resolve_commit(url, branch=revision, token=token)
+    except ValueError:
+        return await resolve_commit(url, tag=revision, token=token)
+
+
 def _apply_gitignores(query: IngestionQuery) -> None:
     """Update ``query.ignore_patterns`` in-place.
 
@@ -230,15 +549,120 @@ def _apply_gitignores(query: IngestionQuery) -> None:
         The query to update.
 
     """
-    for fname in (".gitignore", ".gitingestignore"):
+    for fname in _IGNORE_FILENAMES:
         query.ignore_patterns.update(load_ignore_patterns(query.local_path, filename=fname))
 
 
+def _watch_filter(
+    query: IngestionQuery,
+    output: str | None,
+    *,
+    ignore_files: bool = False,
+) -> Callable[[Change, str], bool]:
+    """Return a watch filter ignoring the changes to excluded paths and to the output file.
+
+    Parameters
+    ----------
+    query : IngestionQuery
+        The query of the watched directory.
+    output : str | None
+        The path of the output file, if any.
+    ignore_files : bool
+        If ``True``, let the changes to ``.gitignore`` and ``.gitingestignore`` files through even if they are
+        excluded, since they change the patterns (default: ``False``).
+
+    Returns
+    -------
+    Callable[[Change, str], bool]
+        A filter returning whether a change may affect the digest.
+
+    """
+    # The digest is written into the watched directory by default, its own updates must not trigger new ones
+    output_path = Path(output).resolve() if output not in (None, "-") else None
+
+    def _filter(_: Change, path: str) -> bool:
+        changed = Path(path)
+        if ignore_files and changed.name in _IGNORE_FILENAMES:
+            return True
+        return changed != output_path and not _should_exclude(changed, query.local_path, query.ignore_patterns)
+
+    return _filter
+
+
+def _reload_ignore_files(query: IngestionQuery, ignore_patterns: set[str]) -> FileSystemNode:
+    """Load the ``.gitignore`` and ``.gitingestignore`` files again on top of ``ignore_patterns``, then walk the tree.
+
+    Parameters
+    ----------
+    query : IngestionQuery
+        The query to update.
+    ignore_patterns : set[str]
+        The patterns of the query before the ignore files were applied.
+
+    Returns
+    -------
+    FileSystemNode
+        The tree of ``query`` with the new patterns.
+
+    """
+    query.ignore_patterns = set(ignore_patterns)
+    _apply_gitignores(query)
+    return build_node(query)
+
+
+def _apply_changes(
+    root: FileSystemNode,
+    query: IngestionQuery,
+    changes: set[tuple[Change, str]],
+) -> FileSystemNode:
+    """Return the tree of ``query`` after ``changes``, walking the directory again only if its structure changed.
+
+    Parameters
+    ----------
+    root : FileSystemNode
+        The tree before the changes.
+    query : IngestionQuery
+        The query the tree was built for.
+    changes : set[tuple[Change, str]]
+        The changes reported by the watcher, with the absolute paths they apply to.
+
+    Returns
+    -------
+    FileSystemNode
+        ``root`` with the sizes of the modified files updated, or a new tree.
+
+    """
+    files: dict[Path, FileSystemNode] = {}
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.type == FileSystemNodeType.FILE:
+            files[node.path] = node
+        stack.extend(node.children)
+
+    sizes: dict[Path, int] = {}
+    for change, path in changes:
+        changed = Path(path)
+        if change != Change.modified or changed not in files:
+            return build_node(query)
+        try:
+            sizes[changed] = changed.stat().st_size
+        except OSError:  # Removed right after being modified
+            return build_node(query)
+        if sizes[changed] > query.max_file_size:
+            return build_node(query)
+
+    for changed, size in sizes.items():
+        files[changed].size = size
+    return root
+
+
 @asynccontextmanager
 async def _clone_repo_if_remote(query: IngestionQuery, *, token: str | None) -> AsyncGenerator[None]:
     """Async context-manager that clones ``query.url`` if present.
 
-    If ``query.url`` is set, the repo is cloned, control is yielded, and the temp directory is removed on exit.
+    If ``query.url`` is set, the repo is checked out from the clone cache, control is yielded, and the temp directory
+    is removed on exit.
     If no URL is given, the function simply yields immediately.
 
     Parameters
@@ -251,6 +675,7 @@ async def _clone_repo_if_remote(query: IngestionQuery, *, token: str | None) ->
     """
     if query.url:
         clone_config = query.extract_clone_config()
+        clone_config.use_cache = True
         await clone_repo(clone_config, token=token)
         try:
             yield
@@ -260,6 +685,14 @@ async def _clone_repo_if_remote(query: IngestionQuery, *, token: str | None) ->
         yield
 
 
+async def _closing_http_client(coroutine: Awaitable[T]) -> T:
+    """Await ``coroutine``, then close the HTTP client of the event loop, which is about to be closed."""
+    try:
+        return await coroutine
+    finally:
+        await close_http_client()
+
+
 async def _write_output(tree: str, content: str, target: str | None) -> None:
     """Write combined output to ``target`` (``"-"`` ⇒ stdout).
 
@@ -273,10 +706,15 @@ async def _write_output(tree: str, content: str, target: str | None) -> None:
         The path to the output file. If ``None``, the results are not written to a file.
 
     """
-    data = f"{tree}\n{content}"
     loop = asyncio.get_running_loop()
     if target == "-":
-        await loop.run_in_executor(None, sys.stdout.write, data)
+        await loop.run_in_executor(None, write_digest, sys.stdout, tree, content)
         await loop.run_in_executor(None, sys.stdout.flush)
     elif target is not None:
-        await loop.run_in_executor(None, Path(target).write_text, data, "utf-8")
+        await loop.run_in_executor(None, _write_file, Path(target), tree, content)
+
+
+def _write_file(path: Path, tree: str, content: str) -> None:
+    """Write the tree and contents of a digest to the file at ``path``."""
+    with path.open("w", encoding="utf-8") as f:
+        write_digest(f, tree, content)
@@ -5,6 +5,7 @@ from __future__ import annotations
 from pathlib import Path
 from typing import TYPE_CHECKING
 
+from gitingest.archive import read_archive
 from gitingest.config import MAX_DIRECTORY_DEPTH, MAX_FILES, MAX_TOTAL_SIZE_BYTES
 from gitingest.output_formatter import format_node
 from gitingest.schemas import FileSystemNode, FileSystemNodeType, FileSystemStats
@@ -19,7 +20,7 @@ def ingest_query(query: IngestionQuery) -> tuple[str, str, str]:
 
     This is the main entry point for analyzing a codebase directory or single file. It processes the query
     parameters, reads the file or directory content, and generates a summary, directory structure, and file content,
-    along with token estimations.
+    along with token estimations. Local zip and tar archives are read in place, without being extracted.
 
     Parameters
     ----------
@@ -31,12 +32,33 @@ def ingest_query(query: IngestionQuery) -> tuple[str, str, str]:
     tuple[str, str, str]
         A tuple containing the summary, directory structure, and file contents.
 
+    """
+    return format_node(build_node(query), query=query)
+
+
+def build_node(query: IngestionQuery) -> FileSystemNode:
+    """Build the file system tree of a parsed query, applying its patterns and limits.
+
+    Parameters
+    ----------
+    query : IngestionQuery
+        The parsed query object containing information about the repository and query parameters.
+
+    Returns
+    -------
+    FileSystemNode
+        The root directory node, or the file node when the query targets a single file. Files are only read from
+        archives, unless ``query.structure_only`` is set.
+
     Raises
     ------
     ValueError
-        If the path cannot be found, is not a file, or the file has no content.
+        If the path cannot be found, is not a file, the file has no content, or the archive cannot be read.
 
     """
+    if query.type == "archive":
+        return read_archive(query)
+
     subpath = Path(query.subpath.strip("/")).as_posix()
     path = query.local_path / subpath
 
@@ -61,11 +83,11 @@ def ingest_query(query: IngestionQuery) -> tuple[str, str, str]:
             path=path,
         )
 
-        if not file_node.content:
+        if not query.structure_only and not file_node.content:
             msg = f"File {file_node.name} has no content"
             raise ValueError(msg)
 
-        return format_node(file_node, query=query)
+        return file_node
 
     root_node = FileSystemNode(
         name=path.name,
@@ -78,7 +100,7 @@ def ingest_query(query: IngestionQuery) -> tuple[str, str, str]:
 
     _process_node(node=root_node, query=query, stats=stats)
 
-    return format_node(root_node, query=query)
+    return root_node
 
 
 def _process_node(node: FileSystemNode, query: IngestionQuery, stats: FileSystemStats) -> None:
@@ -110,10 +132,10 @@ def _process_node(node: FileSystemNode, query: IngestionQuery, stats: FileSystem
         if sub_path.is_symlink():
             _process_symlink(path=sub_path, parent_node=node, stats=stats, local_path=query.local_path)
         elif sub_path.is_file():
-            if sub_path.stat().st_size > query.max_file_size:
+            if sub_path.stat().st_size > query.max_file_size and not query.truncate_large_files:
                 print(f"Skipping file {sub_path}: would exceed max file size limit")
                 continue
-            _process_file(path=sub_path, parent_node=node, stats=stats, local_path=query.local_path)
+            _process_file(path=sub_path, parent_node=node, stats=stats, query=query)
         elif sub_path.is_dir():
             child_directory_node = FileSystemNode(
                 name=sub_path.name,
@@ -167,11 +189,12 @@ def _process_symlink(path: Path, parent_node: FileSystemNode, stats: FileSystemS
     parent_node.file_count += 1
 
 
-def _process_file(path: Path, parent_node: FileSystemNode, stats: FileSystemStats, local_path: Path) -> None:
+def _process_file(path: Path, parent_node: FileSystemNode, stats: FileSystemStats, query: IngestionQuery) -> None:
     """Process a file in the file system.
 
     This function checks the file's size, increments the statistics, and reads its content.
-    If the file size exceeds the maximum allowed, it raises an error.
+    If the file size exceeds the maximum allowed, it raises an error. Files above ``query.max_file_size``, which are
+    only processed when they are truncated, count towards the total size for the part of them that is read.
 
     Parameters
     ----------
@@ -181,8 +204,8 @@ def _process_file(path: Path, parent_node: FileSystemNode, stats: FileSystemStat
         The dictionary to accumulate the results.
     stats : FileSystemStats
         Statistics tracking object for the total file count and size.
-    local_path : Path
-        The base path of the repository or directory being processed.
+    query : IngestionQuery
+        The parsed query object containing information about the repository and query parameters.
 
     """
     if stats.total_files + 1 > MAX_FILES:
@@ -190,19 +213,20 @@ def _process_file(path: Path, parent_node: FileSystemNode, stats: FileSystemStat
         return
 
     file_size = path.stat().st_size
-    if stats.total_size + file_size > MAX_TOTAL_SIZE_BYTES:
+    read_size = min(file_size, query.max_file_size)
+    if stats.total_size + read_size > MAX_TOTAL_SIZE_BYTES:
         print(f"Skipping file {path}: would exceed total size limit")
         return
 
     stats.total_files += 1
-    stats.total_size += file_size
+    stats.total_size += read_size
 
     child = FileSystemNode(
         name=path.name,
         type=FileSystemNodeType.FILE,
         size=file_size,
         file_count=1,
-        path_str=str(path.relative_to(local_path)),
+        path_str=str(path.relative_to(query.local_path)),
         path=path,
         depth=parent_node.depth + 1,
     )
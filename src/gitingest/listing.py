@@ -0,0 +1,146 @@
+"""Ingestion of the structure of a remote revision from its trees, without downloading the files."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import suppress
+from typing import TYPE_CHECKING, Final
+from urllib.parse import urlparse
+
+import httpx
+from starlette.status import HTTP_200_OK
+
+from gitingest.archive import _ArchiveEntry, _build_tree
+from gitingest.schemas import FileSystemNodeType
+from gitingest.utils.git_http import fetch_object_sizes
+from gitingest.utils.git_utils import (
+    _basic_auth_credentials,
+    _parse_github_url,
+    create_git_command,
+    get_http_client,
+    is_github_host,
+    run_command,
+)
+
+if TYPE_CHECKING:
+    from gitingest.schemas import FileSystemNode, IngestionQuery
+
+# Modes of the tree entries listed as files; gitlinks (submodules) are left out
+_ENTRY_TYPES: Final[dict[str, FileSystemNodeType]] = {
+    "100644": FileSystemNodeType.FILE,
+    "100755": FileSystemNodeType.FILE,
+    "120000": FileSystemNodeType.SYMLINK,
+}
+
+
+async def read_listing(query: IngestionQuery, *, token: str | None = None) -> FileSystemNode:
+    """Build the tree of the files of a tree-only clone from the trees of its ``HEAD``.
+
+    The clone holds the commit and its trees but no blob (see ``CloneConfig.no_checkout``), and no file is read: the
+    nodes only carry the names of the files and, with ``query.plan``, their sizes, which the host is asked for
+    without sending the blobs. Only the blobs of symlinks, which hold their targets, are downloaded. The subpath,
+    patterns and limits of the query apply as to a full ingest, the size limits only when the sizes are known.
+
+    Parameters
+    ----------
+    query : IngestionQuery
+        The parsed query of a remote repository, cloned without checkout to ``query.local_path``.
+    token : str | None
+        GitHub personal access token (PAT) for accessing private repositories.
+
+    Returns
+    -------
+    FileSystemNode
+        The root directory node, without file contents.
+
+    Raises
+    ------
+    ValueError
+        If the query has no URL, or the subpath does not exist in the revision.
+
+    """
+    query.ensure_url()
+    url = str(query.url)
+    git = create_git_command(["git"], str(query.local_path), url, token)
+
+    stdout, _ = await run_command(*git, "ls-tree", "-r", "-z", "HEAD")
+    entries: list[tuple[FileSystemNodeType, str, str]] = []
+    for record in stdout.decode("utf-8", errors="surrogateescape").split("\0"):
+        if not record:
+            continue
+        meta, path = record.split("\t", 1)
+        mode, _, oid = meta.split(" ")
+        kind = _ENTRY_TYPES.get(mode)
+        if kind is not None:
+            entries.append((kind, oid, path))
+
+    blobs = [oid for kind, oid, _ in entries if kind == FileSystemNodeType.FILE]
+    sizes = await _blob_sizes(url, git, blobs, token=token) if query.plan and blobs else {}
+    links = [oid for kind, oid, _ in entries if kind == FileSystemNodeType.SYMLINK]
+    # A missing symlink blob is fetched on its own by ``cat-file``, symlinks being few
+    targets = await asyncio.gather(*(run_command(*git, "cat-file", "blob", oid) for oid in links))
+    link_targets = {oid: target.decode("utf-8", errors="replace") for oid, (target, _) in zip(links, targets)}
+
+    tree_entries = [
+        _ArchiveEntry(name=path, type=kind, size=sizes.get(oid, 0), read=bytes, link_target=link_targets.get(oid))
+        for kind, oid, path in entries
+    ]
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _build_tree, tree_entries, query)
+
+
+async def _blob_sizes(url: str, git: list[str], oids: list[str], *, token: str | None) -> dict[str, int]:
+    """Return the sizes of the blobs ``oids`` of the clone ``HEAD``, downloading them only if the host cannot tell.
+
+    Hosts serving the protocol v2 ``object-info`` command are asked for the sizes directly, and GitHub hosts for the
+    recursive tree of the revision through their REST API. Other hosts get a checkout of the revision, which fetches
+    the blobs in a single request, as a regular clone would.
+    """
+    if urlparse(url).scheme in {"http", "https"}:
+        headers = {"Authorization": f"Basic {_basic_auth_credentials(token)}"} if token and is_github_host(url) else {}
+        with suppress(httpx.HTTPError, ValueError):
+            return await fetch_object_sizes(get_http_client(), url, oids, headers=headers)
+
+    if is_github_host(url):
+        stdout, _ = await run_command(*git, "rev-parse", "HEAD")
+        sizes = await _github_blob_sizes(url, stdout.decode().strip(), token=token)
+        if sizes is not None:
+            return sizes
+
+    await run_command(*git, "checkout", "--quiet", "--force", "HEAD")
+    stdout, _ = await run_command(*git, "ls-tree", "-r", "-l", "-z", "HEAD")
+    sizes = {}
+    for record in stdout.decode("utf-8", errors="surrogateescape").split("\0"):
+        if record:
+            _, _, oid, size = record.split("\t", 1)[0].split()
+            if size != "-":
+                sizes[oid] = int(size)
+    return sizes
+
+
+async def _github_blob_sizes(url: str, commit: str, *, token: str | None) -> dict[str, int] | None:
+    """Return the sizes of the blobs of ``commit`` listed by the GitHub REST API, or ``None`` if it cannot."""
+    try:
+        host, owner, repo = _parse_github_url(url)
+    except ValueError:
+        return None
+    # Public GitHub vs. GitHub Enterprise
+    base_api = "https://api.github.com" if host == "github.com" else f"https://{host}/api/v3"
+    headers = {"Accept": "application/vnd.github+json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+
+    try:
+        response = await get_http_client().get(
+            f"{base_api}/repos/{owner}/{repo}/git/trees/{commit}",
+            params={"recursive": "1"},
+            headers=headers,
+        )
+        tree = response.json() if response.status_code == HTTP_200_OK else None
+    except (httpx.HTTPError, ValueError):
+        return None
+
+    # Trees too large for a single response are truncated
+    if not isinstance(tree, dict) or tree.get("truncated", True):
+        return None
+    return {entry["sha"]: entry["size"] for entry in tree.get("tree", ()) if entry.get("type") == "blob"}
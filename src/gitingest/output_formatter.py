@@ -2,27 +2,69 @@
 
 from __future__ import annotations
 
+import codecs
+import hashlib
+import os
+from dataclasses import replace
+from functools import lru_cache
+from itertools import repeat
+from pathlib import Path
 from typing import TYPE_CHECKING
 
 import tiktoken
 
+from gitingest.config import (
+    CONTENT_BATCH_MAX_SIZE,
+    ESTIMATED_BYTES_PER_TOKEN,
+    TRUNCATED_HEAD_SIZE,
+    TRUNCATED_TAIL_SIZE,
+)
 from gitingest.schemas import FileSystemNode, FileSystemNodeType
-from gitingest.utils.compat_func import readlink
+from gitingest.schemas.filesystem import SEPARATOR, decode_text, is_binary_file
 from gitingest.utils.comment_removal import remove_comments_from_content, should_remove_comments
+from gitingest.utils.content_cache import CachedContent, content_cache, content_key
+from gitingest.utils.file_index import IndexedSection, file_index, index_variant
+from gitingest.utils.file_utils import (
+    _CHUNK_SIZE,
+    _decodes,
+    _get_preferred_encodings,
+    append_file,
+    write_digest,
+)
+from gitingest.utils.generated import GENERATED_SAMPLE_SIZE, detect_generated, load_linguist_rules
 
 if TYPE_CHECKING:
+    from collections.abc import Iterator
+
     from gitingest.query_parser import IngestionQuery
+    from gitingest.utils.generated import GeneratedKind
 
 _TOKEN_THRESHOLDS: list[tuple[int, str]] = [
     (1_000_000, "M"),
     (1_000, "k"),
 ]
 
+_SIZE_THRESHOLDS: list[tuple[int, str]] = [
+    (1024**3, "GB"),
+    (1024**2, "MB"),
+    (1024, "kB"),
+]
+
+_CONTENT_BATCH_SIZE = 256  # Files read and looked up in the content cache at once
+_FOLD_MIN_SIZE = 256  # Contents shorter than this are repeated rather than folded (characters)
+
 
 def format_node(node: FileSystemNode, query: IngestionQuery) -> tuple[str, str, str]:
     """Generate a summary, directory structure, and file contents for a given file system node.
 
-    If the node represents a directory, the function will recursively process its contents.
+    If the node represents a directory, the function will recursively process its contents. With
+    ``query.structure_only``, only the directory structure is generated and no file is read. With ``query.plan``,
+    the contents are replaced by the size and estimated token count of each file (see ``_format_plan``). With
+    ``query.fold_duplicates``, files whose content already appears in the digest refer to its first copy instead of
+    repeating it (see ``_fold_duplicates``). Unless ``query.include_generated`` is set, the contents of generated,
+    minified and vendored files under a directory are replaced by a placeholder (see ``_process_files``). With
+    ``query.truncate_large_files``, only the start and end of the files above ``query.max_file_size`` are output
+    (see ``_read_truncated``).
 
     Parameters
     ----------
@@ -37,24 +79,180 @@ def format_node(node: FileSystemNode, query: IngestionQuery) -> tuple[str, str,
         A tuple containing the summary, directory structure, and file contents.
 
     """
+    if query.plan:
+        return _format_plan(node, query)
+
     is_single_file = node.type == FileSystemNodeType.FILE
     summary = _create_summary_prefix(query, single_file=is_single_file)
 
+    sections, section_tokens, folded = ([], 0, {}) if query.structure_only else _gather_sections(node, query)
+    content = "\n".join(sections)
+
     if node.type == FileSystemNodeType.DIRECTORY:
         summary += f"Files analyzed: {node.file_count}\n"
+        if folded:
+            summary += f"Duplicate files folded: {len(folded)}\n"
     elif node.type == FileSystemNodeType.FILE:
         summary += f"File: {node.name}\n"
-        summary += f"Lines: {len(node.content.splitlines()):,}\n"
+        if not query.structure_only:
+            summary += f"Lines: {len(node.content.splitlines()):,}\n"
+
+    tree = "Directory structure:\n" + _create_tree_structure(query, node=node, folded=folded)
+
+    # Sections are counted one by one, so that the counts of unchanged files can be reused from the file index
+    tree_tokens = _count_tokens([tree]) if section_tokens is not None else None
+    if tree_tokens is not None and section_tokens is not None:
+        summary += f"\nEstimated tokens: {_format_token_count(tree_tokens[0] + section_tokens)}"
+
+    return summary, tree, content
+
+
+def write_node(
+    node: FileSystemNode,
+    query: IngestionQuery,
+    path: Path,
+    *,
+    copy_files: bool = False,
+) -> tuple[str, str]:
+    """Write the digest of a file system node to the file at ``path``, each section as soon as it is produced.
+
+    The sections of a directory are processed in batches (see ``_iter_sections``) and written in turn, so that the
+    file contents are never held in memory at once. With ``copy_files``, the sections of UTF-8 text files that no
+    option transforms (comment removal, notebook conversion, truncation, generated file placeholders) are written as
+    their header followed by the bytes of the file, copied with ``append_file`` instead of being decoded and encoded
+    again. Like the encoding of a file, its eligibility is decided from its first bytes: the bytes of the file are
+    copied as they are, line endings included. The tokens of the copied files are estimated from their sizes, as in
+    a plan. The whole digest of single files, previews and folded digests is written as ``format_node`` renders it.
+
+    Parameters
+    ----------
+    node : FileSystemNode
+        The file system node to be summarized.
+    query : IngestionQuery
+        The parsed query object containing information about the repository and query parameters.
+    path : Path
+        The path of the output file.
+    copy_files : bool
+        Whether to copy the bytes of plain text files into the output file (default: ``False``).
+
+    Returns
+    -------
+    tuple[str, str]
+        The summary and directory structure of the digest, whose file contents are only written to ``path``.
+
+    """
+    if node.type != FileSystemNodeType.DIRECTORY or query.structure_only or query.fold_duplicates:
+        summary, tree, content = format_node(node, query)
+        with path.open("w", encoding="utf-8", newline="") as f:  # Line endings as in the sections written below
+            write_digest(f, tree, content)
+        return summary, tree
+
+    files = list(_iter_files(node))
+    detects = not query.include_generated
+    rules = load_linguist_rules(node, query.local_path) if detects else None
+    declared = [
+        rules.classify(_display_path(file)) if rules and file.type == FileSystemNodeType.FILE else None
+        for file in files
+    ]
+    copies_utf8 = codecs.lookup(_get_preferred_encodings()[0]).name == "utf-8"  # Files are decoded with it first
+    copied = [
+        copy_files and copies_utf8 and kind is None and _is_copyable(file, query)
+        for file, kind in zip(files, declared)
+    ]
+    rendered = [i for i, is_copied in enumerate(copied) if not is_copied]
+    sections = _iter_sections(
+        [files[i] for i in rendered],
+        query,
+        kinds=[declared[i] for i in rendered],
+        detects=detects,
+    )
 
     tree = "Directory structure:\n" + _create_tree_structure(query, node=node)
+    headers = [_section_header(file, query) for file, is_copied in zip(files, copied) if is_copied]
+    section_tokens: int | None = 0
+    with path.open("wb") as f:
+        f.write(tree.encode() + b"\n")
+        remaining_headers = iter(headers)
+        for i, (file, is_copied) in enumerate(zip(files, copied)):
+            if i:
+                f.write(b"\n")
+            if not is_copied:
+                section, count = next(sections)
+                f.write(section.encode())
+                section_tokens = None if section_tokens is None or count is None else section_tokens + count
+                continue
+            f.write(next(remaining_headers).encode())
+            append_file(f, file.path)
+            f.write(b"\n\n")
+
+    summary = _create_summary_prefix(query)
+    summary += f"Files analyzed: {node.file_count}\n"
+    tokens = _count_tokens([tree, *headers])
+    if tokens is not None and section_tokens is not None:
+        copied_tokens = sum(_estimate_tokens(file.size) for file, is_copied in zip(files, copied) if is_copied)
+        summary += f"\nEstimated tokens: {_format_token_count(sum(tokens) + section_tokens + copied_tokens)}"
+    return summary, tree
+
+
+def _is_copyable(node: FileSystemNode, query: IngestionQuery) -> bool:
+    """Return whether the section body of a file node is its bytes as they are, judging from its first bytes."""
+    if (
+        node.type != FileSystemNodeType.FILE
+        or node.data is not None
+        or node.path.suffix == ".ipynb"
+        or _strips_comments(node, query)
+        or _is_truncated(node, query)
+    ):
+        return False
+    try:
+        with node.path.open("rb") as f:
+            sample = f.read(max(_CHUNK_SIZE, GENERATED_SAMPLE_SIZE))
+    except OSError:
+        return False
+    chunk = sample[:_CHUNK_SIZE]
+    if not chunk or b"\r" in sample or is_binary_file(chunk):
+        return False  # Placeholders, and line endings translated by the decoding
+    if not query.include_generated and detect_generated(sample[:GENERATED_SAMPLE_SIZE]):
+        return False
+    # The file is decoded with the first encoding that decodes its first chunk, as ``FileSystemNode.content`` does
+    return _decodes(chunk, encoding=_get_preferred_encodings()[0])
 
-    content = _gather_file_contents(node, query)
 
-    token_estimate = _format_token_count(tree + content)
-    if token_estimate:
-        summary += f"\nEstimated tokens: {token_estimate}"
+def _format_plan(node: FileSystemNode, query: IngestionQuery) -> tuple[str, str, str]:
+    """Generate a summary, directory structure, and per-file estimates for a given file system node, reading no file.
 
-    return summary, tree, content
+    Token counts are estimated from the file sizes with ``ESTIMATED_BYTES_PER_TOKEN``: they give the order of
+    magnitude of a digest before deciding what to ingest, not its exact count.
+
+    Parameters
+    ----------
+    node : FileSystemNode
+        The file system node to be planned.
+    query : IngestionQuery
+        The parsed query object containing information about the repository and query parameters.
+
+    Returns
+    -------
+    tuple[str, str, str]
+        A tuple containing the summary, directory structure, and the size and estimated token count of each file,
+        largest first.
+
+    """
+    files = [file for file in _iter_files(node) if file.type == FileSystemNodeType.FILE]
+    tree = "Directory structure:\n" + _create_tree_structure(query, node=node)
+    total_tokens = _estimate_tokens(len(tree.encode())) + sum(_estimate_tokens(file.size) for file in files)
+
+    summary = _create_summary_prefix(query, single_file=node.type == FileSystemNodeType.FILE)
+    summary += f"Files analyzed: {len(files)}\n"
+    summary += f"Total size: {_format_size(sum(file.size for file in files))}\n"
+    summary += f"\nEstimated tokens: {_format_token_count(total_tokens)}"
+
+    lines = ["Estimated tokens per file:"]
+    for file in sorted(files, key=lambda file: (-file.size, file.path_str)):
+        tokens = _format_token_count(_estimate_tokens(file.size))
+        lines.append(f"{tokens:>8}  {_format_size(file.size):>9}  {_display_path(file)}")
+
+    return summary, tree, "\n".join(lines) + "\n"
 
 
 def _create_summary_prefix(query: IngestionQuery, *, single_file: bool = False) -> str:
@@ -91,50 +289,394 @@ def _create_summary_prefix(query: IngestionQuery, *, single_file: bool = False)
     if query.subpath != "/" and not single_file:
         parts.append(f"Subpath: {query.subpath}")
 
+    if query.diff_target:
+        parts.append(f"Changes: {query.diff_base}..{query.diff_target}")
+    elif query.diff_base:
+        parts.append(f"Changes since: {query.diff_base}")
+
     return "\n".join(parts) + "\n"
 
 
-def _gather_file_contents(node: FileSystemNode, query: IngestionQuery | None = None) -> str:
-    """Recursively gather contents of all files under the given node.
+def _gather_sections(
+    node: FileSystemNode,
+    query: IngestionQuery,
+) -> tuple[list[str], int | None, dict[Path, str]]:
+    """Gather the sections of all files under the given node, in digest order, with their total token count.
 
-    This function recursively processes a directory node and gathers the contents of all files
-    under that node. It returns the concatenated content of all files as a single string.
+    Sections of local files are looked up in the file index first, so that only new or changed files are read,
+    processed and tokenized. The index is then updated with them. The other files go through the content cache
+    (see ``_process_files``). Duplicates are folded last, so that the index keeps the full section of every file.
 
     Parameters
     ----------
     node : FileSystemNode
         The current directory or file node being processed.
+    query : IngestionQuery
+        The parsed query object containing information about the repository and query parameters.
 
     Returns
     -------
-    str
-        The concatenated content of all files under the given node.
+    tuple[list[str], int | None, dict[Path, str]]
+        The section of each file, their estimated number of tokens or ``None`` if it could not be counted, and the
+        path of the first copy of each folded file, keyed by the path of the file.
 
     """
+    files = list(_iter_files(node))
+    # Files the ``.gitattributes`` or their names declare generated or vendored are neither read nor indexed
+    detects = not query.include_generated and node.type == FileSystemNodeType.DIRECTORY
+    rules = load_linguist_rules(node, query.local_path) if detects else None
+    declared = [
+        rules.classify(_display_path(file)) if rules and file.type == FileSystemNodeType.FILE else None
+        for file in files
+    ]
+    # Remote repositories, archives and diffs are read from fresh clones or in memory, which the index cannot validate
+    indexed_query = query.url is None and query.type != "archive" and not query.diff_base
+    variant = index_variant(query) if indexed_query else None
+    indexed = file_index.load(variant) if variant else {}
+
+    sections: list[str] = []
+    tokens: list[int | None] = []
+    stats: list[os.stat_result | None] = []  # Stats of the files whose index entry is to be written
+    pending: list[int] = []  # Files to process, missing from the index or indexed without a token count
+    for i, file in enumerate(files):
+        stat = _stat(file) if variant and declared[i] is None else None
+        entry = indexed.get(str(file.path))
+        if stat is not None and entry is not None and entry.tokens is not None and entry.matches(stat):
+            sections.append(entry.section)
+            tokens.append(entry.tokens)
+            stats.append(None)
+        else:
+            sections.append("")
+            tokens.append(None)
+            stats.append(stat)
+            pending.append(i)
+
+    processed, counts = _process_files(
+        [files[i] for i in pending],
+        query,
+        kinds=[declared[i] for i in pending],
+        detects=detects,
+    )
+    for i, section, count in zip(pending, processed, counts or repeat(None)):
+        sections[i] = section
+        tokens[i] = count
+
+    if variant:
+        updated = {
+            str(files[i].path): IndexedSection.from_stat(stat, sections[i], tokens[i])
+            for i, stat in enumerate(stats)
+            if stat is not None
+        }
+        visited = {str(file.path) for file in files}
+        removed = [path for path in indexed.keys() - visited if not os.path.lexists(path)]
+        file_index.save(variant, updated, removed)
+
+    folded = _fold_duplicates(files, sections, tokens, query) if query.fold_duplicates else {}
+
+    total_tokens = None if None in tokens else sum(count for count in tokens if count is not None)
+    return sections, total_tokens, folded
+
+
+def _fold_duplicates(
+    files: list[FileSystemNode],
+    sections: list[str],
+    tokens: list[int | None],
+    query: IngestionQuery,
+) -> dict[Path, str]:
+    """Replace the sections of files whose content already appears in the digest by a reference to its first copy.
+
+    Files are compared by their processed content, which is hashed as the files are visited. Contents shorter than
+    ``_FOLD_MIN_SIZE`` are kept, a reference costing about as many tokens. ``sections`` and ``tokens`` are updated
+    in place; the tokens of the folded sections are ``None`` if they could not be counted.
+
+    Parameters
+    ----------
+    files : list[FileSystemNode]
+        The file and symlink nodes, in digest order.
+    sections : list[str]
+        The section of each file.
+    tokens : list[int | None]
+        The estimated number of tokens of each section.
+    query : IngestionQuery
+        The parsed query object containing information about the repository and query parameters.
+
+    Returns
+    -------
+    dict[Path, str]
+        The path of the first copy of each folded file, as shown in the digest, keyed by the path of the file.
+
+    """
+    first_copies: dict[bytes, int] = {}  # Index of the first copy of each content, keyed by its SHA-256 digest
+    folded: dict[Path, str] = {}
+    for i, file in enumerate(files):
+        header = _section_header(file, query)
+        if file.type != FileSystemNodeType.FILE or not sections[i].startswith(header):
+            continue
+        if len(sections[i]) - len(header) < _FOLD_MIN_SIZE:
+            continue
+        # Decoded contents may hold lone surrogates, which only ``surrogatepass`` encodes
+        section = memoryview(sections[i].encode(errors="surrogatepass"))
+        first = first_copies.setdefault(hashlib.sha256(section[len(header.encode()) :]).digest(), i)
+        if first == i:
+            continue
+        path = _display_path(file)
+        original = _display_path(files[first])
+        sections[i] = header.replace(f": {path}\n", f": {path} (identical to {original})\n", 1) + "\n"
+        folded[file.path] = original
+
+    refolded = [i for i, file in enumerate(files) if file.path in folded]
+    counts = _count_tokens([sections[i] for i in refolded]) if refolded and None not in tokens else None
+    for i, count in zip(refolded, counts or repeat(None)):
+        tokens[i] = count
+    return folded
+
+
+def _display_path(node: FileSystemNode) -> str:
+    """Return the path of a node as shown in the digest."""
+    return node.path_str.replace(os.sep, "/")
+
+
+def _iter_files(node: FileSystemNode) -> Iterator[FileSystemNode]:
+    """Yield the file and symlink nodes under the given node, depth first."""
     if node.type != FileSystemNodeType.DIRECTORY:
-        content = node.content_string
-        
-        # Apply comment removal if requested
-        if query and query.remove_comments and should_remove_comments(node.path):
-            # Extract the actual content from the formatted content_string
-            separator = "=" * 48
-            parts = content.split(separator)
-            
-            if len(parts) >= 3:
-                header = separator + "\n" + parts[1] + "\n" + separator + "\n"
-                file_content = separator.join(parts[2:]).strip()
-                
-                # Remove comments from the file content
-                processed_content = remove_comments_from_content(
-                    file_content, node.path, query.comment_types
-                )
-                
-                content = header + processed_content + "\n\n"
-        
-        return content
-
-    # Recursively gather contents of all files under the current directory
-    return "\n".join(_gather_file_contents(child, query) for child in node.children)
+        yield node
+        return
+    for child in node.children:
+        yield from _iter_files(child)
+
+
+def _stat(node: FileSystemNode) -> os.stat_result | None:
+    """Return the stat of a file read from disk, or ``None`` if its section cannot be indexed."""
+    if node.type != FileSystemNodeType.FILE or node.data is not None:
+        return None
+    try:
+        return node.path.lstat()
+    except OSError:
+        return None
+
+
+def _process_files(
+    files: list[FileSystemNode],
+    query: IngestionQuery,
+    *,
+    kinds: list[GeneratedKind | None],
+    detects: bool,
+) -> tuple[list[str], list[int] | None]:
+    """Return the sections of ``files`` with their token counts, or ``None`` counts if they could not be counted.
+
+    See ``_iter_sections``, which produces them.
+
+    Parameters
+    ----------
+    files : list[FileSystemNode]
+        The file and symlink nodes to process.
+    query : IngestionQuery
+        The parsed query object containing information about the repository and query parameters.
+    kinds : list[GeneratedKind | None]
+        The kind of each file declared generated or vendored by its path, which is not read.
+    detects : bool
+        Whether to detect generated and minified files from their first bytes.
+
+    Returns
+    -------
+    tuple[list[str], list[int] | None]
+        The section of each file, and its estimated number of tokens.
+
+    """
+    sections: list[str] = []
+    counts: list[int | None] = []
+    for section, count in _iter_sections(files, query, kinds=kinds, detects=detects):
+        sections.append(section)
+        counts.append(count)
+    if None in counts:
+        return sections, None
+    return sections, [count for count in counts if count is not None]
+
+
+def _iter_sections(
+    files: list[FileSystemNode],
+    query: IngestionQuery,
+    *,
+    kinds: list[GeneratedKind | None],
+    detects: bool,
+) -> Iterator[tuple[str, int | None]]:
+    """Yield the section of each file with its token count, or a ``None`` count if it could not be counted.
+
+    The processed content of each file is looked up in the content cache by the hash of its bytes first, so that
+    files already ingested from any repository, commit or directory are neither decoded, processed nor tokenized
+    again: only their headers, which hold their paths, are tokenized. The cache is then updated with the others.
+    The contents of generated, minified and vendored files are replaced by a placeholder, such as
+    ``[Generated file]``, without reading more than their start. Files are processed in batches (see
+    ``_content_batches``), and the sections of a batch are yielded before the next one is read.
+
+    Parameters
+    ----------
+    files : list[FileSystemNode]
+        The file and symlink nodes to process.
+    query : IngestionQuery
+        The parsed query object containing information about the repository and query parameters.
+    kinds : list[GeneratedKind | None]
+        The kind of each file declared generated or vendored by its path, which is not read.
+    detects : bool
+        Whether to detect generated and minified files from their first bytes.
+
+    Yields
+    ------
+    tuple[str, int | None]
+        The section of each file, in order, and its estimated number of tokens.
+
+    """
+    # A single lookup serves a whole batch, without holding every file in memory
+    for start, stop in _content_batches(files):
+        batch = files[start:stop]
+        contents = [
+            (None, kind) if kind else _read_file(file, query, detects=detects)
+            for file, kind in zip(batch, kinds[start:stop])
+        ]
+        keys = [
+            content_key(data, file.name, query, strips_comments=_strips_comments(file, query))
+            if data is not None
+            else None
+            for file, (data, _) in zip(batch, contents)
+        ]
+        cached = content_cache.get_many(key for key in keys if key)
+        headers = [_section_header(file, query) for file in batch]
+        bodies: list[str] = []
+        body_tokens: list[int | None] = []
+        for file, (data, kind), key in zip(batch, contents, keys):
+            entry = cached.get(key) if key else None
+            if kind is not None:
+                bodies.append(f"[{kind.value} file]\n\n")
+            else:
+                bodies.append(entry.text if entry else _section_body(file, query, data))
+            body_tokens.append(entry.tokens if entry else None)
+        del contents, cached  # The bytes of the batch are not kept while its sections are consumed
+
+        uncounted = [i for i, count in enumerate(body_tokens) if count is None]
+        counts = _count_tokens(headers + [bodies[i] for i in uncounted])
+        for i, count in zip(uncounted, counts[len(headers) :] if counts else repeat(None)):
+            body_tokens[i] = count
+        content_cache.put_many({key: CachedContent(bodies[i], body_tokens[i]) for i in uncounted if (key := keys[i])})
+
+        for header, body, header_tokens, tokens in zip(headers, bodies, counts or repeat(None), body_tokens):
+            yield header + body, None if header_tokens is None or tokens is None else header_tokens + tokens
+
+
+def _content_batches(files: list[FileSystemNode]) -> Iterator[tuple[int, int]]:
+    """Yield the bounds of batches of at most ``_CONTENT_BATCH_SIZE`` files and ``CONTENT_BATCH_MAX_SIZE`` bytes.
+
+    A file larger than ``CONTENT_BATCH_MAX_SIZE`` makes a batch of its own.
+    """
+    start = size = 0
+    for i, file in enumerate(files):
+        if i > start and (i - start >= _CONTENT_BATCH_SIZE or size + file.size > CONTENT_BATCH_MAX_SIZE):
+            yield start, i
+            start, size = i, 0
+        size += file.size
+    if start < len(files):
+        yield start, len(files)
+
+
+def _read_file(
+    node: FileSystemNode,
+    query: IngestionQuery,
+    *,
+    detects: bool,
+) -> tuple[bytes | None, GeneratedKind | None]:
+    """Return the content of a file node, or the kind of generated file it is, from its first bytes.
+
+    The content is ``None`` for symlinks, unreadable files and generated files, of which only the start is read, and
+    for truncated files, which ``_section_body`` reads in part.
+    """
+    if node.type != FileSystemNodeType.FILE:
+        return None, None
+    detects = detects and node.path.suffix != ".ipynb"  # Notebooks are converted to code, whatever their layout
+    if node.data is not None:
+        kind = detect_generated(node.data[:GENERATED_SAMPLE_SIZE]) if detects else None
+        return (None, kind) if kind else (node.data, None)
+    try:
+        with node.path.open("rb") as fp:
+            sample = fp.read(GENERATED_SAMPLE_SIZE) if detects else b""
+            kind = detect_generated(sample) if detects else None
+            if kind or _is_truncated(node, query):
+                return None, kind
+            return sample + fp.read(), None
+    except OSError:
+        return None, None
+
+
+def _is_truncated(node: FileSystemNode, query: IngestionQuery) -> bool:
+    """Return whether only the start and end of a node are output, as it is above the maximum file size."""
+    return (
+        query.truncate_large_files
+        and node.type == FileSystemNodeType.FILE
+        and node.data is None
+        and node.size > query.max_file_size
+    )
+
+
+def _read_truncated(node: FileSystemNode, query: IngestionQuery) -> str:
+    """Return the start and end of a file above the maximum size, around a marker giving the size left out.
+
+    At most ``TRUNCATED_HEAD_SIZE`` and ``TRUNCATED_TAIL_SIZE`` bytes are read, and no more than half the maximum
+    file size each: the rest of the file is skipped with a seek. Lines cut by these limits are left out whole. The
+    slices are decoded as plain text: those of a notebook are output as JSON, since they cannot be parsed.
+    """
+    head_size = min(TRUNCATED_HEAD_SIZE, query.max_file_size // 2)
+    tail_size = min(TRUNCATED_TAIL_SIZE, query.max_file_size // 2)
+    try:
+        with node.path.open("rb") as fp:
+            size = os.fstat(fp.fileno()).st_size
+            head = fp.read(head_size)
+            fp.seek(max(size - tail_size, len(head)))
+            tail = fp.read(tail_size)
+    except OSError:
+        return "Error reading file"
+
+    if is_binary_file(head[:_CHUNK_SIZE]):
+        return "[Binary file]"
+    head = head[: head.rfind(b"\n") + 1] or head
+    tail = tail[tail.find(b"\n") + 1 :] or tail
+    omitted = size - len(head) - len(tail)
+    if omitted <= 0:  # The file shrank since it was listed
+        return decode_text(head + tail)
+
+    head_text = decode_text(head)
+    tail_text = decode_text(tail)
+    separator = "" if head_text.endswith("\n") else "\n"
+    return f"{head_text}{separator}[... {_format_size(omitted)} omitted ...]\n{tail_text}"
+
+
+def _section_header(node: FileSystemNode, query: IngestionQuery) -> str:
+    """Return the header of the section of a file or symlink node."""
+    header = node.header_string
+    if _strips_comments(node, query):
+        # Sections stripped of comments keep their layout, with blank lines around the path
+        parts = header.split(SEPARATOR)
+        header = SEPARATOR + "\n" + parts[1] + "\n" + SEPARATOR + "\n"
+    return header
+
+
+def _section_body(node: FileSystemNode, query: IngestionQuery, data: bytes | None) -> str:
+    """Return the content of a file or symlink node in its section, decoded from ``data`` if it was already read."""
+    if _is_truncated(node, query):
+        content = _read_truncated(node, query)
+    else:
+        content = (replace(node, data=data) if data is not None else node).content
+    if _strips_comments(node, query):
+        content = remove_comments_from_content(content.strip(), node.path, query.comment_types)
+    return content + "\n\n"
+
+
+def _strips_comments(node: FileSystemNode, query: IngestionQuery) -> bool:
+    """Return whether the comments of a node are removed from its section."""
+    return query.remove_comments and _has_comment_lexer(node.name)
+
+
+@lru_cache(maxsize=4096)
+def _has_comment_lexer(name: str) -> bool:
+    """Return whether comments can be removed from the files named ``name``, whose lexer only depends on the name."""
+    return should_remove_comments(Path(name))
 
 
 def _create_tree_structure(
@@ -143,6 +685,7 @@ def _create_tree_structure(
     node: FileSystemNode,
     prefix: str = "",
     is_last: bool = True,
+    folded: dict[Path, str] | None = None,
 ) -> str:
     """Generate a tree-like string representation of the file structure.
 
@@ -159,6 +702,8 @@ def _create_tree_structure(
         A string used for indentation and formatting of the tree structure (default: ``""``).
     is_last : bool
         A flag indicating whether the current node is the last in its directory (default: ``True``).
+    folded : dict[Path, str] | None
+        The path of the first copy of each folded file, keyed by the path of the file (default: ``None``).
 
     Returns
     -------
@@ -178,40 +723,85 @@ def _create_tree_structure(
     if node.type == FileSystemNodeType.DIRECTORY:
         display_name += "/"
     elif node.type == FileSystemNodeType.SYMLINK:
-        display_name += " -> " + readlink(node.path).name
+        display_name += " -> " + node.link_target_name
+    elif folded and node.path in folded:
+        display_name += f" (identical to {folded[node.path]})"
 
     tree_str += f"{prefix}{current_prefix}{display_name}\n"
 
     if node.type == FileSystemNodeType.DIRECTORY and node.children:
         prefix += "    " if is_last else "│   "
         for i, child in enumerate(node.children):
-            tree_str += _create_tree_structure(query, node=child, prefix=prefix, is_last=i == len(node.children) - 1)
+            is_last_child = i == len(node.children) - 1
+            tree_str += _create_tree_structure(query, node=child, prefix=prefix, is_last=is_last_child, folded=folded)
     return tree_str
 
 
-def _format_token_count(text: str) -> str | None:
-    """Return a human-readable token-count string (e.g. 1.2k, 1.2 M).
+def _count_tokens(texts: list[str]) -> list[int] | None:
+    """Estimate the number of tokens of each text, encoding them in parallel.
 
     Parameters
     ----------
-    text : str
-        The text string for which the token count is to be estimated.
+    texts : list[str]
+        The texts whose tokens are to be counted.
 
     Returns
     -------
-    str | None
-        The formatted number of tokens as a string (e.g., ``"1.2k"``, ``"1.2M"``), or ``None`` if an error occurs.
+    list[int] | None
+        The number of tokens of each text, or ``None`` if an error occurs.
 
     """
     try:
         encoding = tiktoken.get_encoding("o200k_base")  # gpt-4o, gpt-4o-mini
-        total_tokens = len(encoding.encode(text, disallowed_special=()))
+        # Special tokens are encoded as plain text, like ``encode(text, disallowed_special=())``
+        return [len(tokens) for tokens in encoding.encode_ordinary_batch(texts)]
     except (ValueError, UnicodeEncodeError) as exc:
         print(exc)
         return None
 
+
+def _estimate_tokens(size: int) -> int:
+    """Estimate the number of tokens of a text of ``size`` bytes without reading it."""
+    return -(-size // ESTIMATED_BYTES_PER_TOKEN)
+
+
+def _format_token_count(total_tokens: int) -> str:
+    """Return a human-readable token-count string (e.g. 1.2k, 1.2 M).
+
+    Parameters
+    ----------
+    total_tokens : int
+        The number of tokens.
+
+    Returns
+    -------
+    str
+        The formatted number of tokens as a string (e.g., ``"1.2k"``, ``"1.2M"``).
+
+    """
     for threshold, suffix in _TOKEN_THRESHOLDS:
         if total_tokens >= threshold:
             return f"{total_tokens / threshold:.1f}{suffix}"
 
     return str(total_tokens)
+
+
+def _format_size(size: int) -> str:
+    """Return a human-readable size string (e.g. 512 B, 1.2 kB, 3.4 MB).
+
+    Parameters
+    ----------
+    size : int
+        The size in bytes.
+
+    Returns
+    -------
+    str
+        The formatted size as a string (e.g., ``"1.2 kB"``, ``"3.4 MB"``).
+
+    """
+    for threshold, suffix in _SIZE_THRESHOLDS:
+        if size >= threshold:
+            return f"{size / threshold:.1f} {suffix}"
+
+    return f"{size} B"
@@ -2,12 +2,14 @@
 
 from __future__ import annotations
 
+import asyncio
 import re
 import uuid
 import warnings
 from pathlib import Path
 from urllib.parse import unquote, urlparse
 
+from gitingest.archive import is_archive
 from gitingest.config import TMP_BASE_PATH
 from gitingest.schemas import IngestionQuery
 from gitingest.utils.exceptions import InvalidPatternError
@@ -317,6 +319,8 @@ def _parse_patterns(pattern: set[str] | str) -> set[str]:
 def _parse_local_dir_path(path_str: str) -> IngestionQuery:
     """Parse the given file path into a structured query dictionary.
 
+    Zip and tar archives get the ``"archive"`` type, so that they are ingested like the directory they contain.
+
     Parameters
     ----------
     path_str : str
@@ -330,12 +334,17 @@ def _parse_local_dir_path(path_str: str) -> IngestionQuery:
     """
     path_obj = Path(path_str).resolve()
     slug = path_obj.name if path_str == "." else path_str.strip("/")
-    return IngestionQuery(local_path=path_obj, slug=slug, id=str(uuid.uuid4()))
+    # Archives are read as the directory they would extract to
+    query_type = "archive" if is_archive(path_obj) else None
+    return IngestionQuery(local_path=path_obj, slug=slug, id=str(uuid.uuid4()), type=query_type)
 
 
 async def try_domains_for_user_and_repo(user_name: str, repo_name: str, token: str | None = None) -> str:
     """Attempt to find a valid repository host for the given ``user_name`` and ``repo_name``.
 
+    All known hosts are probed concurrently. The first host of ``KNOWN_GIT_HOSTS`` that confirms the repository wins,
+    so that the answer does not depend on which host replies first.
+
     Parameters
     ----------
     user_name : str
@@ -356,10 +365,25 @@ async def try_domains_for_user_and_repo(user_name: str, repo_name: str, token: s
         If no valid repository host is found for the given ``user_name`` and ``repo_name``.
 
     """
-    for domain in KNOWN_GIT_HOSTS:
+
+    async def _probe(domain: str) -> str | None:
         candidate = f"https://{domain}/{user_name}/{repo_name}"
-        if await check_repo_exists(candidate, token=token if domain.startswith("github.") else None):
-            return domain
+        try:
+            exists = await check_repo_exists(candidate, token=token if domain.startswith("github.") else None)
+        except RuntimeError:  # Unexpected answer from this host, rely on the others
+            return None
+        return domain if exists else None
+
+    probes = [asyncio.create_task(_probe(domain)) for domain in KNOWN_GIT_HOSTS]
+    try:
+        for probe in probes:  # In order of priority
+            domain = await probe
+            if domain:
+                return domain
+    finally:
+        for probe in probes:
+            probe.cancel()
+        await asyncio.gather(*probes, return_exceptions=True)
 
     msg = f"Could not find a valid repository host for '{user_name}/{repo_name}'."
     raise ValueError(msg)
@@ -2,17 +2,20 @@
 
 from __future__ import annotations
 
+import io
 import os
 from dataclasses import dataclass, field
 from enum import Enum, auto
+from pathlib import PurePosixPath
 from typing import TYPE_CHECKING
 
 from gitingest.utils.compat_func import readlink
-from gitingest.utils.file_utils import _decodes, _get_preferred_encodings, _read_chunk
+from gitingest.utils.file_utils import _CHUNK_SIZE, _decodes, _get_preferred_encodings, _read_chunk
 from gitingest.utils.notebook import process_notebook
 
 if TYPE_CHECKING:
     from pathlib import Path
+    from typing import Callable, TextIO
 
 SEPARATOR = "=" * 48  # Tiktoken, the tokenizer openai uses, counts 2 tokens if we have more than 48
 
@@ -37,7 +40,8 @@ class FileSystemStats:
 class FileSystemNode:  # pylint: disable=too-many-instance-attributes
     """Class representing a node in the file system (either a file or directory).
 
-    Tracks properties of files/directories for comprehensive analysis.
+    Tracks properties of files/directories for comprehensive analysis. Nodes read from an archive rather than from
+    disk carry their file content in ``data`` and their symlink target in ``link_target``.
     """
 
     name: str
@@ -49,6 +53,8 @@ class FileSystemNode:  # pylint: disable=too-many-instance-attributes
     dir_count: int = 0
     depth: int = 0
     children: list[FileSystemNode] = field(default_factory=list)
+    data: bytes | None = None
+    link_target: str | None = None
 
     def sort_children(self) -> None:
         """Sort the children nodes of a directory according to a specific order.
@@ -92,16 +98,41 @@ class FileSystemNode:  # pylint: disable=too-many-instance-attributes
         str
             A string representation of the node's content.
 
+        """
+        return f"{self.header_string}{self.content}\n\n"
+
+    @property
+    def header_string(self) -> str:
+        """Return the header of the node in ``content_string``, holding its type and path, without reading it.
+
+        Returns
+        -------
+        str
+            The header, followed by a newline.
+
         """
         parts = [
             SEPARATOR,
             f"{self.type.name}: {str(self.path_str).replace(os.sep, '/')}"
-            + (f" -> {readlink(self.path).name}" if self.type == FileSystemNodeType.SYMLINK else ""),
+            + (f" -> {self.link_target_name}" if self.type == FileSystemNodeType.SYMLINK else ""),
             SEPARATOR,
-            f"{self.content}",
         ]
 
-        return "\n".join(parts) + "\n\n"
+        return "\n".join(parts) + "\n"
+
+    @property
+    def link_target_name(self) -> str:
+        """Return the name of the file or directory a symlink node points to.
+
+        Returns
+        -------
+        str
+            The last component of the symlink target.
+
+        """
+        if self.link_target is not None:
+            return PurePosixPath(self.link_target).name
+        return readlink(self.path).name
 
     @property
     def content(self) -> str:  # pylint: disable=too-many-return-statements
@@ -130,35 +161,60 @@ class FileSystemNode:  # pylint: disable=too-many-instance-attributes
 
         if self.path.suffix == ".ipynb":  # Notebook
             try:
-                return process_notebook(self.path)
+                notebook = self.data.decode("utf-8") if self.data is not None else None
+                return process_notebook(self.path, content=notebook)
             except Exception as exc:
                 return f"Error processing notebook: {exc}"
 
-        chunk = _read_chunk(self.path)
+        if self.data is not None:
+            return decode_text(self.data)
 
+        chunk = _read_chunk(self.path)
         if chunk is None:
             return "Error reading file"
+        return _decode(chunk, lambda encoding: self.path.open(encoding=encoding))
+
+
+def decode_text(data: bytes) -> str:
+    """Return bytes decoded the way ``FileSystemNode.content`` decodes text files, or a placeholder.
 
-        if chunk == b"":
-            return "[Empty file]"
+    Parameters
+    ----------
+    data : bytes
+        The bytes to decode, which are not parsed as a notebook whatever file they come from.
 
-        if is_binary_file(chunk):
-            return "[Binary file]"
+    Returns
+    -------
+    str
+        The decoded text, or a placeholder for empty, binary and undecodable bytes.
 
-        # Find the first encoding that decodes the sample
-        good_enc: str | None = next(
-            (enc for enc in _get_preferred_encodings() if _decodes(chunk, encoding=enc)),
-            None,
-        )
+    """
+    # In-memory content is decoded the way ``open`` decodes files, universal newlines included
+    return _decode(data[:_CHUNK_SIZE], lambda encoding: io.TextIOWrapper(io.BytesIO(data), encoding=encoding))
+
+
+def _decode(chunk: bytes, open_text: Callable[[str], TextIO]) -> str:
+    """Decode the text ``open_text`` opens with the first encoding that decodes its first ``chunk``."""
+    if chunk == b"":
+        return "[Empty file]"
+
+    if is_binary_file(chunk):
+        return "[Binary file]"
+
+    # Find the first encoding that decodes the sample
+    good_enc: str | None = next(
+        (enc for enc in _get_preferred_encodings() if _decodes(chunk, encoding=enc)),
+        None,
+    )
 
-        if good_enc is None:
-            return "Error: Unable to decode file with available encodings"
+    if good_enc is None:
+        return "Error: Unable to decode file with available encodings"
 
-        try:
-            with self.path.open(encoding=good_enc) as fp:
-                return fp.read()
-        except (OSError, UnicodeDecodeError) as exc:
-            return f"Error reading file with {good_enc!r}: {exc}"
+    try:
+        with open_text(good_enc) as fp:
+            return fp.read()
+    except (OSError, UnicodeDecodeError) as exc:
+        return f"Error reading file with {good_enc!r}: {exc}"
 
 
 def is_binary_file(file_contents: bytes | None) -> bool:
@@ -170,4 +226,4 @@ def is_binary_file(file_contents: bytes | None) -> bool:
         {7, 8, 9, 10, 12, 13, 27}.union(set(range(0x20, 0x100)) - {0x7F}),
     )
     # If translate returns any bytes, those are non-text (binary) bytes
-    return bool(file_contents.translate(None, text_characters))
\ No newline at end of file
+    return bool(file_contents.translate(None, text_characters))
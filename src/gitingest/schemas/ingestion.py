@@ -37,6 +37,19 @@ class CloneConfig:  # pylint: disable=too-many-instance-attributes
         Whether the repository is a blob (default: ``False``).
     include_submodules: bool
         Whether to clone submodules (default: ``False``).
+    max_file_size : int | None
+        Blobs larger than this size are never transferred nor checked out (default: ``None``, no limit).
+    include_patterns : set[str] | None
+        Patterns translated into sparse-checkout rules so only matching files are checked out (default: ``None``).
+    ignore_patterns : set[str] | None
+        Patterns translated into negated sparse-checkout rules (default: ``None``).
+    use_cache : bool
+        Whether to check out from the persistent bare-mirror clone cache (default: ``False``).
+    diff_base : str | None
+        A commit fetched alongside the checkout, without its blobs, to compare the checkout with
+        (default: ``None``).
+    no_checkout : bool
+        Whether to only fetch the commit and its trees, without any blob nor working tree (default: ``False``).
 
     """
 
@@ -48,6 +61,12 @@ class CloneConfig:  # pylint: disable=too-many-instance-attributes
     subpath: str = "/"
     blob: bool = False
     include_submodules: bool = False
+    max_file_size: int | None = None
+    include_patterns: set[str] | None = None
+    ignore_patterns: set[str] | None = None
+    use_cache: bool = False
+    diff_base: str | None = None
+    no_checkout: bool = False
 
 
 class IngestionQuery(BaseModel):  # pylint: disable=too-many-instance-attributes
@@ -77,6 +96,9 @@ class IngestionQuery(BaseModel):  # pylint: disable=too-many-instance-attributes
         The commit of the repository.
     tag: str | None
         The tag of the repository.
+    resolved_commit : str | None
+        The SHA the requested ref resolved to when the digest cache key was derived. The revision is fetched at this
+        commit, so that the digest matches its key even if the ref moves in the meantime (default: ``None``).
     max_file_size : int
         The maximum file size to ingest (default: 10 MB).
     ignore_patterns : set[str]
@@ -85,6 +107,25 @@ class IngestionQuery(BaseModel):  # pylint: disable=too-many-instance-attributes
         The patterns to include.
     include_submodules : bool
         Whether to include all Git submodules within the repository. (default: ``False``)
+    diff_base : str | None
+        The revision to compare with: only the files changed since it are ingested (default: ``None``).
+    diff_target : str | None
+        The revision to compare ``diff_base`` with, or ``None`` to compare it with the files on disk
+        (default: ``None``).
+    structure_only : bool
+        Whether to only list the files, without reading their contents (default: ``False``).
+    plan : bool
+        Whether to report the size and estimated token count of each file instead of its content. Implies
+        ``structure_only`` (default: ``False``).
+    fold_duplicates : bool
+        Whether to output the content of identical files once, the other copies referring to the first one
+        (default: ``False``).
+    include_generated : bool
+        Whether to output the contents of generated, minified and vendored files instead of a placeholder
+        (default: ``False``).
+    truncate_large_files : bool
+        Whether to output the start and end of the files above ``max_file_size`` instead of skipping them
+        (default: ``False``).
 
     """
 
@@ -99,12 +140,20 @@ class IngestionQuery(BaseModel):  # pylint: disable=too-many-instance-attributes
     branch: str | None = None
     commit: str | None = None
     tag: str | None = None
+    resolved_commit: str | None = None
     max_file_size: int = Field(default=MAX_FILE_SIZE)
     ignore_patterns: set[str] = set()  # TODO: ignore_patterns and include_patterns have the same type
     include_patterns: set[str] | None = None
     include_submodules: bool = False
     remove_comments: bool = False
     comment_types: Set[CommentType] = Field(default_factory=lambda: {CommentType.ALL})
+    diff_base: str | None = None
+    diff_target: str | None = None
+    structure_only: bool = False
+    plan: bool = False
+    fold_duplicates: bool = False
+    include_generated: bool = False
+    truncate_large_files: bool = False
 
     def extract_clone_config(self) -> CloneConfig:
         """Extract the relevant fields for the CloneConfig object.
@@ -127,12 +176,19 @@ class IngestionQuery(BaseModel):  # pylint: disable=too-many-instance-attributes
         return CloneConfig(
             url=self.url,
             local_path=str(self.local_path),
-            commit=self.commit,
+            commit=self.resolved_commit or self.commit,
             branch=self.branch,
             tag=self.tag,
             subpath=self.subpath,
             blob=self.type == "blob",
             include_submodules=self.include_submodules,
+            # Truncated files are read in part from the checkout, which must hold them
+            max_file_size=None if self.truncate_large_files else self.max_file_size,
+            include_patterns=self.include_patterns,
+            ignore_patterns=self.ignore_patterns,
+            diff_base=self.diff_base,
+            # The structure of a revision is listed from its trees, unless a file or a diff needs the blobs
+            no_checkout=self.structure_only and self.type != "blob" and not self.diff_base,
         )
 
     def ensure_url(self) -> None:
@@ -0,0 +1,554 @@
+"""Persistent cache of bare repository mirrors shared by successive clones."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import shutil
+from contextlib import asynccontextmanager
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import AsyncGenerator
+from urllib.parse import urlparse
+
+from gitingest.config import CLONE_CACHE_MAX_SIZE, CLONE_CACHE_PATH, CLONE_CACHE_UPSTREAMS
+from gitingest.utils.compat_func import removesuffix
+from gitingest.utils.git_utils import create_git_command, fetch_remote_refs, resolve_commit, run_command
+from gitingest.utils.os_utils import ensure_private_directory
+
+try:
+    import fcntl
+except ImportError:  # Windows: mirrors are only coordinated within the process
+    fcntl = None  # type: ignore[assignment]
+
+_LOCK_POLL_INTERVAL = 0.05  # seconds
+_LOCK_FILE_SUFFIX = ".lock"
+_UPDATE_LOCK_FILE_SUFFIX = ".update.lock"
+_SIZE_FILE_SUFFIX = ".size"
+_COMMITS_FILE_SUFFIX = ".commits"
+
+
+class CloneCache:
+    """Cache of bare mirrors keyed by normalised repository URL, evicted least-recently-used first.
+
+    A mirror is used under a shared file lock, which keeps it from being evicted, and updated with a shallow fetch
+    of the requested ref under an exclusive lock of its own, so that concurrent updates are serialized. Fetches only
+    add objects, and the commits served are pinned by refs, so users can check out while another one updates.
+
+    The mirrors are kept in a directory private to the current user (see ``ensure_private_directory``), since their
+    paths can be derived from the URLs they mirror.
+
+    A new mirror of a fork borrows the objects of the mirror of a repository it shares history with through
+    ``objects/info/alternates``, so that only the objects the fork adds are fetched and stored. The donor is the
+    configured upstream of the fork, or else a mirror that already holds a commit the fork advertises.
+
+    Parameters
+    ----------
+    root : Path
+        The directory holding the mirrors (default: ``CLONE_CACHE_PATH``).
+    max_size : int
+        The disk budget of the cache in bytes (default: ``CLONE_CACHE_MAX_SIZE``).
+    upstreams : dict[str, str] | None
+        The upstream repository URL of the forks matching each URL pattern (default: ``CLONE_CACHE_UPSTREAMS``).
+
+    """
+
+    def __init__(
+        self,
+        root: Path = CLONE_CACHE_PATH,
+        max_size: int = CLONE_CACHE_MAX_SIZE,
+        upstreams: dict[str, str] | None = None,
+    ) -> None:
+        self.root = root
+        self.max_size = max_size
+        self.upstreams = CLONE_CACHE_UPSTREAMS if upstreams is None else upstreams
+
+    def is_available(self) -> bool:
+        """Return whether the mirrors can be kept in a directory private to the current user, creating it if needed.
+
+        Returns
+        -------
+        bool
+            ``False`` if the cache directory or one of its parents is owned, or can be modified, by another user (see
+            ``ensure_private_directory``), or cannot be created.
+
+        """
+        try:
+            ensure_private_directory(self.root)
+        except OSError:
+            return False
+        return True
+
+    def mirror_path(self, url: str) -> Path:
+        """Return the path of the bare mirror of ``url``.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the repository.
+
+        Returns
+        -------
+        Path
+            The path of the bare mirror, which may not exist yet.
+
+        """
+        key = hashlib.sha256(normalize_repo_url(url).encode()).hexdigest()[:32]
+        return self.root / f"{key}.git"
+
+    @asynccontextmanager
+    async def mirror(
+        self,
+        url: str,
+        *,
+        branch: str | None = None,
+        tag: str | None = None,
+        commit: str | None = None,
+        token: str | None = None,
+    ) -> AsyncGenerator[tuple[Path, str], None]:
+        """Fetch the requested ref into the mirror of ``url`` and yield the mirror with the resolved commit.
+
+        The mirror cannot be evicted until the context exits, and the commit stays pinned in it.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the repository.
+        branch : str | None
+            The branch to fetch.
+        tag : str | None
+            The tag to fetch. Takes precedence over ``branch``.
+        commit : str | None
+            The commit to fetch. Takes precedence over ``tag`` and ``branch``.
+        token : str | None
+            GitHub personal access token (PAT) for accessing private repositories.
+
+        Yields
+        ------
+        tuple[Path, str]
+            The path of the bare mirror and the SHA of the fetched commit.
+
+        """
+        mirror = self.mirror_path(url)
+        await asyncio.get_running_loop().run_in_executor(None, ensure_private_directory, self.root)
+
+        upstream = self.upstream_of(url)
+        # Upstreams are never seeded from their own upstream, which could loop back to ``url``
+        seed_upstream = upstream and not self.upstream_of(upstream) and not self.mirror_path(upstream).exists()
+        if seed_upstream and not mirror.exists():
+            # Seed the upstream mirror so that this fork, and every later one, only fetches its own objects
+            try:
+                async with self.mirror(upstream, token=token):
+                    pass
+            except RuntimeError:
+                pass
+
+        lock = _FileLock(mirror.with_suffix(_LOCK_FILE_SUFFIX))
+        await lock.acquire(shared=True)
+        try:
+            update_lock = _FileLock(mirror.with_suffix(_UPDATE_LOCK_FILE_SUFFIX))
+            await update_lock.acquire(shared=False)
+            try:
+                sha = await self._update(mirror, url, branch=branch, tag=tag, commit=commit, token=token)
+            finally:
+                update_lock.release()
+            yield mirror, sha
+        finally:
+            lock.release()
+
+        await asyncio.get_running_loop().run_in_executor(None, self.evict)
+
+    def upstream_of(self, url: str) -> str | None:
+        """Return the configured upstream of ``url``, if it is a fork of one.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the repository.
+
+        Returns
+        -------
+        str | None
+            The URL of the upstream repository, or ``None`` if no configured pattern matches ``url``.
+
+        """
+        normalized = normalize_repo_url(url)
+        for pattern, upstream in self.upstreams.items():
+            if fnmatchcase(normalized, normalize_repo_url(pattern)) and normalize_repo_url(upstream) != normalized:
+                return upstream
+        return None
+
+    async def _update(
+        self,
+        mirror: Path,
+        url: str,
+        *,
+        branch: str | None,
+        tag: str | None,
+        commit: str | None,
+        token: str | None,
+    ) -> str:
+        """Fetch the requested ref into ``mirror``, creating it if needed, and return the resolved commit SHA."""
+        git = create_git_command(["git"], str(mirror), url, token)
+        created = not mirror.exists()
+        donor_lock: _FileLock | None = None
+        if created:
+            await run_command("git", "init", "--bare", "--quiet", str(mirror))
+            donor_lock = await self._borrow_objects(mirror, url, token)
+
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, _sync_shallow, mirror)
+            if commit:
+                # Commits are immutable: a mirror that already has one never needs to fetch it again
+                if not await _has_commit(git, commit):
+                    await _fetch_commit(git, mirror, url, commit)
+                sha = commit
+            else:
+                # The tip is usually known from the cached ref map already: if the mirror has it, skip the fetch
+                present = await _present_tip(git, url, branch=branch, tag=tag, token=token)
+                sha = present or await _fetch_tip(git, url, branch=branch, tag=tag)
+            await _pin_commits(git, [sha])
+        except (RuntimeError, asyncio.CancelledError):
+            if created:
+                shutil.rmtree(mirror, ignore_errors=True)
+            raise
+        finally:
+            if donor_lock:
+                donor_lock.release()  # The donor is now protected from eviction as long as ``mirror`` is in use
+
+        await asyncio.get_running_loop().run_in_executor(None, _record_usage, mirror, sha)
+        return sha
+
+    async def _borrow_objects(self, mirror: Path, url: str, token: str | None) -> _FileLock | None:
+        """Make the new ``mirror`` borrow the objects of a mirror sharing history with ``url``, if there is one.
+
+        Parameters
+        ----------
+        mirror : Path
+            The new, empty mirror.
+        url : str
+            The URL of the repository mirrored by ``mirror``.
+        token : str | None
+            GitHub personal access token (PAT) for accessing private repositories.
+
+        Returns
+        -------
+        _FileLock | None
+            A shared lock on the donor mirror, keeping it from being updated or evicted until the first fetch into
+            ``mirror`` is done, or ``None`` if no donor was found.
+
+        """
+        candidates: list[Path] = []
+        upstream = self.upstream_of(url)
+        if upstream:
+            candidates.append(self.mirror_path(upstream))
+
+        try:
+            advertised = set((await fetch_remote_refs(url, token=token)).values())
+        except ValueError:
+            advertised = set()
+        if advertised:
+            loop = asyncio.get_running_loop()
+            candidates += await loop.run_in_executor(None, self._mirrors_with_commits, advertised)
+
+        for donor in candidates:
+            # Donors never borrow themselves, so that evicting one only invalidates its direct dependents
+            if donor == mirror or _alternates_file(donor).exists():
+                continue
+            lock = _FileLock(donor.with_suffix(_LOCK_FILE_SUFFIX))
+            if not lock.try_acquire(shared=True):  # Being evicted
+                lock.release()
+                continue
+            if not donor.exists():
+                lock.release()
+                continue
+            _alternates_file(mirror).write_text(f"{(donor / 'objects').resolve()}\n")
+            return lock
+        return None
+
+    def _mirrors_with_commits(self, commits: set[str]) -> list[Path]:
+        """Return the mirrors holding any of ``commits``, most recently used first."""
+        mirrors: list[tuple[float, Path]] = []
+        for mirror in self.root.glob("*.git"):
+            if _read_commits(mirror) & commits:
+                mtime = _read_mtime(mirror)
+                if mtime is not None:
+                    mirrors.append((mtime, mirror))
+        return [mirror for _, mirror in sorted(mirrors, reverse=True)]
+
+    def evict(self) -> None:
+        """Remove least-recently-used mirrors until the cache fits in its disk budget.
+
+        Mirrors that are in use (locked) are skipped. A mirror whose objects are borrowed by others is only evicted
+        together with them, and only if none of them is in use either.
+        """
+        mirrors: list[tuple[float, Path]] = []
+        for mirror in self.root.glob("*.git"):
+            mtime = _read_mtime(mirror)
+            if mtime is not None:
+                mirrors.append((mtime, mirror))
+
+        borrowers: dict[Path, list[Path]] = {}
+        for _, mirror in mirrors:
+            donor = _read_donor(mirror)
+            if donor is not None:
+                borrowers.setdefault(donor, []).append(mirror)
+
+        total_size = 0
+        counted: set[Path] = set()
+        evicted: set[Path] = set()
+        for _, mirror in sorted(mirrors, reverse=True):
+            if mirror in evicted:
+                continue
+            total_size += _read_size(mirror)
+            counted.add(mirror)
+            if total_size <= self.max_size:
+                continue
+
+            group = [mirror, *(m for m in borrowers.get(mirror.resolve(), []) if m not in evicted)]
+            sizes = {m: _read_size(m) for m in group}
+            if _remove_mirrors(group):
+                evicted.update(group)
+                total_size -= sum(size for m, size in sizes.items() if m in counted)
+
+
+def normalize_repo_url(url: str) -> str:
+    """Normalise a repository URL so that equivalent spellings share a cache entry.
+
+    Parameters
+    ----------
+    url : str
+        The URL of the repository.
+
+    Returns
+    -------
+    str
+        The URL with a lowercase host and without trailing slash nor ``.git`` suffix.
+
+    """
+    parsed = urlparse(url)
+    path = removesuffix(parsed.path.rstrip("/"), ".git")
+    return f"{parsed.scheme.lower()}://{parsed.netloc.lower()}{path}"
+
+
+async def _has_commit(git: list[str], commit: str) -> bool:
+    """Return ``True`` if the repository already contains ``commit``, reachable from its own refs or ``HEAD``.
+
+    The objects borrowed from another repository through ``objects/info/alternates`` are not enough: the mirror of a
+    public fork must not serve a commit that only the mirror of a private repository it borrows from holds.
+    """
+    try:
+        stdout, _ = await run_command(*git, "rev-list", "-n", "1", f"{commit}^{{commit}}", "--not", "--all")
+    except RuntimeError:
+        return False
+    return not stdout.strip()
+
+
+async def _present_tip(
+    git: list[str],
+    url: str,
+    *,
+    branch: str | None,
+    tag: str | None,
+    token: str | None,
+) -> str | None:
+    """Return the SHA the requested ref points to on the remote if the repository already contains it.
+
+    Return ``None`` if the ref cannot be resolved, e.g. because ``git ls-remote`` failed, so that it is fetched
+    instead.
+    """
+    try:
+        sha = await resolve_commit(url, branch=branch, tag=tag, token=token)
+    except (RuntimeError, ValueError):
+        return None
+    return sha if await _has_commit(git, sha) else None
+
+
+async def _fetch_tip(git: list[str], url: str, *, branch: str | None, tag: str | None) -> str:
+    """Fetch the tip of the requested branch or tag (or of the default branch) and return its SHA."""
+    await _pin_tips(git)
+    if tag:
+        refspec = f"+refs/tags/{tag}:refs/tags/{tag}"
+    elif branch:
+        refspec = f"+refs/heads/{branch}:refs/heads/{branch}"
+    else:
+        refspec = "+HEAD:refs/gitingest/HEAD"
+    await run_command(*git, "fetch", "--quiet", "--depth=1", url, refspec)
+    stdout, _ = await run_command(*git, "rev-parse", "FETCH_HEAD^{commit}")
+    return stdout.decode().strip()
+
+
+async def _fetch_commit(git: list[str], mirror: Path, url: str, commit: str) -> None:
+    """Fetch a single commit, falling back to the full history of all branches if the host refuses it.
+
+    Raises
+    ------
+    RuntimeError
+        If the commit cannot be fetched or is not in the history of any branch.
+
+    """
+    try:
+        await run_command(*git, "fetch", "--quiet", "--depth=1", url, commit)
+    except RuntimeError:
+        await _pin_tips(git)
+        unshallow = ["--unshallow"] if (mirror / "shallow").exists() else []
+        await run_command(*git, "fetch", "--quiet", *unshallow, url, "+refs/heads/*:refs/heads/*")
+        if not await _has_commit(git, commit):
+            msg = f"Commit {commit} not found in {url}"
+            raise RuntimeError(msg) from None
+
+
+async def _pin_tips(git: list[str]) -> None:
+    """Pin the commits the branches and tags of a mirror point to, before a fetch force-updates them.
+
+    The mirrors borrowing the objects of this one may reference any commit reachable from its refs, which must not
+    become unreachable, and eventually be pruned, once a branch or tag moves.
+    """
+    stdout, _ = await run_command(
+        *git,
+        "for-each-ref",
+        "--format=%(if)%(*objectname)%(then)%(*objectname)%(else)%(objectname)%(end)",
+        "refs/heads",
+        "refs/tags",
+        "refs/gitingest/HEAD",
+    )
+    await _pin_commits(git, stdout.decode().split())
+
+
+async def _pin_commits(git: list[str], commits: list[str]) -> None:
+    """Keep ``commits`` reachable from ``refs/gitingest/commits`` in a mirror, whatever happens to its other refs."""
+    commands = "".join(f"update refs/gitingest/commits/{sha} {sha}\n" for sha in dict.fromkeys(commits))
+    if commands:
+        await run_command(*git, "update-ref", "--stdin", stdin=commands.encode())
+
+
+def _record_usage(mirror: Path, sha: str) -> None:
+    """Mark ``mirror`` as most recently used, record its size on disk and remember that it holds ``sha``."""
+    size = sum(f.stat().st_size for f in mirror.rglob("*") if f.is_file())
+    mirror.with_suffix(_SIZE_FILE_SUFFIX).write_text(str(size))
+
+    commits_file = mirror.with_suffix(_COMMITS_FILE_SUFFIX)
+    known = commits_file.read_text().split() if commits_file.exists() else []
+    if sha not in known:
+        with commits_file.open("a") as f:
+            f.write(f"{sha}\n")
+    os.utime(mirror)
+
+
+def _alternates_file(mirror: Path) -> Path:
+    """Return the path of the file listing the object stores ``mirror`` borrows from."""
+    return mirror / "objects" / "info" / "alternates"
+
+
+def _read_donor(mirror: Path) -> Path | None:
+    """Return the mirror whose objects ``mirror`` borrows, or ``None`` if it borrows none."""
+    try:
+        return Path(_alternates_file(mirror).read_text().strip()).parent
+    except FileNotFoundError:
+        return None
+
+
+def _read_commits(mirror: Path) -> set[str]:
+    """Return the commits ``mirror`` has served, or an empty set if it never did or was evicted concurrently."""
+    try:
+        return set(mirror.with_suffix(_COMMITS_FILE_SUFFIX).read_text().split())
+    except FileNotFoundError:
+        return set()
+
+
+def _read_mtime(mirror: Path) -> float | None:
+    """Return the time ``mirror`` was last used, or ``None`` if it was evicted concurrently."""
+    try:
+        return mirror.stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def _sync_shallow(mirror: Path) -> None:
+    """Add the shallow commits of the donor of ``mirror`` to its own.
+
+    Fetching walks the history of the commits ``mirror`` borrows, which must stop where the donor's history does.
+    """
+    donor = _read_donor(mirror)
+    if donor is None:
+        return
+    try:
+        donor_shallow = (donor / "shallow").read_text().split()
+    except FileNotFoundError:
+        return
+
+    shallow_file = mirror / "shallow"
+    shallow = shallow_file.read_text().split() if shallow_file.exists() else []
+    missing = [sha for sha in donor_shallow if sha not in shallow]
+    if missing:
+        shallow_file.write_text("".join(f"{sha}\n" for sha in [*shallow, *missing]))
+
+
+def _remove_mirrors(mirrors: list[Path]) -> bool:
+    """Remove ``mirrors`` if none of them is in use, and return whether they were removed."""
+    locks = [_FileLock(mirror.with_suffix(_LOCK_FILE_SUFFIX)) for mirror in mirrors]
+    try:
+        if not all(lock.try_acquire(shared=False) for lock in locks):
+            return False
+        for mirror in mirrors:
+            shutil.rmtree(mirror, ignore_errors=True)
+            mirror.with_suffix(_SIZE_FILE_SUFFIX).unlink(missing_ok=True)
+            mirror.with_suffix(_COMMITS_FILE_SUFFIX).unlink(missing_ok=True)
+            mirror.with_suffix(_UPDATE_LOCK_FILE_SUFFIX).unlink(missing_ok=True)
+    finally:
+        for lock in locks:
+            lock.release()
+    return True
+
+
+def _read_size(mirror: Path) -> int:
+    """Return the recorded size of ``mirror`` in bytes, or ``0`` if unknown."""
+    try:
+        return int(mirror.with_suffix(_SIZE_FILE_SUFFIX).read_text())
+    except (OSError, ValueError):
+        return 0
+
+
+class _FileLock:
+    """Advisory ``flock``-based lock, polled so that waiting never blocks the event loop.
+
+    A lock is acquired in one mode and never converted: ``flock`` converts by releasing the lock first, which lets a
+    waiting holder of the other mode in.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._fd: int | None = None
+
+    async def acquire(self, *, shared: bool) -> None:
+        """Acquire the lock, waiting for conflicting holders to release it."""
+        # ``flock`` cannot be awaited, and waiting for it in a thread could not be cancelled: poll it instead
+        while True:
+            if self.try_acquire(shared=shared):
+                return
+            await asyncio.sleep(_LOCK_POLL_INTERVAL)
+
+    def try_acquire(self, *, shared: bool) -> bool:
+        """Try to acquire the lock without waiting and return whether it succeeded."""
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self._fd, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+
+    def release(self) -> None:
+        """Release the lock."""
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+
+clone_cache = CloneCache()
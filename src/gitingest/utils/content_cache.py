@@ -0,0 +1,190 @@
+"""Content-addressed cache of processed file contents, shared by every repository, commit and directory."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import closing, suppress
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from gitingest.config import CONTENT_CACHE_MAX_SIZE, CONTENT_CACHE_PATH
+from gitingest.utils.os_utils import ensure_private_directory
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from pathlib import Path
+
+    from gitingest.schemas import IngestionQuery
+
+_SCHEMA_VERSION = 1
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS contents (
+    key TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    tokens INTEGER,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS contents_last_used ON contents (last_used);
+"""
+
+# Keys looked up per statement, below the host parameter limit of older SQLite versions
+_LOOKUP_BATCH_SIZE = 500
+
+
+@dataclass(frozen=True)
+class CachedContent:
+    """The processed content of a file, as it appears in the digest after the file header.
+
+    Attributes
+    ----------
+    text : str
+        The decoded content, with its comments removed or its notebook converted as requested.
+    tokens : int | None
+        The estimated number of tokens of ``text``, or ``None`` if it could not be counted.
+
+    """
+
+    text: str
+    tokens: int | None = None
+
+
+class ContentCache:
+    """SQLite store of processed file contents, keyed by the hash of the file bytes and the transforms applied.
+
+    Forks, vendored copies and consecutive commits share most of their files, which are only decoded, processed and
+    tokenized once. Entries are evicted least-recently-used first once the cache exceeds its disk budget. Like the
+    file index, the database is kept in a directory private to the current user, since its keys can be computed by
+    anyone, and the cache is an optimization only: when the database cannot be read or written, every file is
+    processed as if the cache were empty.
+
+    Parameters
+    ----------
+    path : Path
+        The SQLite database file (default: ``CONTENT_CACHE_PATH``).
+    max_size : int
+        The budget of the cached texts in bytes (default: ``CONTENT_CACHE_MAX_SIZE``).
+
+    """
+
+    def __init__(self, path: Path = CONTENT_CACHE_PATH, max_size: int = CONTENT_CACHE_MAX_SIZE) -> None:
+        self.path = path
+        self.max_size = max_size
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, CachedContent]:
+        """Return the cached contents of ``keys`` and mark them as recently used.
+
+        Parameters
+        ----------
+        keys : Iterable[str]
+            The keys, as returned by ``content_key``.
+
+        Returns
+        -------
+        dict[str, CachedContent]
+            The contents found, keyed by key.
+
+        """
+        keys = list(dict.fromkeys(keys))
+        found: dict[str, CachedContent] = {}
+        try:
+            with closing(self._connect()) as conn, conn:
+                for start in range(0, len(keys), _LOOKUP_BATCH_SIZE):
+                    batch = keys[start : start + _LOOKUP_BATCH_SIZE]
+                    placeholders = ",".join("?" * len(batch))
+                    query = f"SELECT key, text, tokens FROM contents WHERE key IN ({placeholders})"  # noqa: S608
+                    rows = conn.execute(query, batch)
+                    found.update((key, CachedContent(text, tokens)) for key, text, tokens in rows)
+                now = time.time()
+                conn.executemany("UPDATE contents SET last_used = ? WHERE key = ?", ((now, key) for key in found))
+        except (OSError, sqlite3.Error):
+            return {}
+        return found
+
+    def put_many(self, contents: dict[str, CachedContent]) -> None:
+        """Store ``contents``, then evict old entries if the cache exceeds its budget, in a single transaction.
+
+        Parameters
+        ----------
+        contents : dict[str, CachedContent]
+            The processed contents, keyed by ``content_key``.
+
+        """
+        if not contents:
+            return
+        now = time.time()
+        rows = [
+            (key, content.text, content.tokens, len(content.text.encode("utf-8", "surrogatepass")), now)
+            for key, content in contents.items()
+        ]
+
+        # A failed update only means that these files are processed again next time
+        with suppress(OSError, sqlite3.Error, UnicodeEncodeError), closing(self._connect()) as conn, conn:
+            conn.executemany("INSERT OR REPLACE INTO contents VALUES (?, ?, ?, ?, ?)", rows)
+
+            (total_size,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM contents").fetchone()
+            if total_size > self.max_size:
+                kept = 0
+                expired = []
+                for key, size in conn.execute("SELECT key, size FROM contents ORDER BY last_used DESC"):
+                    kept += size
+                    if kept > self.max_size:
+                        expired.append((key,))
+                conn.executemany("DELETE FROM contents WHERE key = ?", expired)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database, creating or migrating its schema as needed."""
+        ensure_private_directory(self.path.parent)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")  # Concurrent ingests read while one of them writes
+            if conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+                conn.executescript(
+                    f"DROP TABLE IF EXISTS contents; {_SCHEMA}PRAGMA user_version = {_SCHEMA_VERSION};",
+                )
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
+
+
+def content_key(data: bytes, name: str, query: IngestionQuery, *, strips_comments: bool) -> str:
+    """Derive the key under which the processed content of a file is cached.
+
+    The key covers the bytes of the file and every option that changes their processing: notebooks are converted,
+    and comments are removed with the lexer matching the file name. The path of the file is not part of the key,
+    so copies of a file anywhere share their entry.
+
+    Parameters
+    ----------
+    data : bytes
+        The content of the file.
+    name : str
+        The name of the file.
+    query : IngestionQuery
+        The parsed query the file is ingested for.
+    strips_comments : bool
+        Whether the comments of the file are removed.
+
+    Returns
+    -------
+    str
+        The cache key.
+
+    """
+    transform = {
+        "notebook": name.endswith(".ipynb"),
+        "comments": [name, sorted(str(getattr(t, "value", t)) for t in query.comment_types)]
+        if strips_comments
+        else None,
+    }
+    digest = hashlib.sha256(json.dumps(transform, sort_keys=True).encode())
+    digest.update(b"\0")
+    digest.update(data)
+    return digest.hexdigest()
+
+
+content_cache = ContentCache()
@@ -0,0 +1,253 @@
+"""On-disk cache of finished digests, keyed by repository, resolved commit and ingestion options."""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO
+
+from gitingest.config import DIGEST_CACHE_MAX_SIZE, DIGEST_CACHE_PATH
+from gitingest.utils.clone_cache import normalize_repo_url
+from gitingest.utils.file_utils import append_file, write_digest
+from gitingest.utils.git_utils import check_repo_exists, resolve_commit
+from gitingest.utils.os_utils import ensure_private_directory
+
+if TYPE_CHECKING:
+    from typing import Callable
+
+    from gitingest.schemas import IngestionQuery
+
+_ENTRY_SUFFIX = ".digest"
+
+
+class DigestCache:
+    """Content-addressed store of ``(summary, tree, content)`` digests, evicted least-recently-used first.
+
+    Entries are immutable: a key covers the exact commit and every option that shapes the digest, so a hit can be
+    served as is. They are kept in a directory private to the current user (see ``ensure_private_directory``), since
+    their keys can be derived from public information. Each entry is a file holding the summary and tree as a line of
+    JSON, followed by the digest as it is written to a ``.txt`` file, so that a digest can be stored from and copied
+    to such a file without reading its content (see ``put_file`` and ``copy_to``).
+
+    Parameters
+    ----------
+    root : Path
+        The directory holding the entries (default: ``DIGEST_CACHE_PATH``).
+    max_size : int
+        The disk budget of the cache in bytes (default: ``DIGEST_CACHE_MAX_SIZE``).
+
+    """
+
+    def __init__(self, root: Path = DIGEST_CACHE_PATH, max_size: int = DIGEST_CACHE_MAX_SIZE) -> None:
+        self.root = root
+        self.max_size = max_size
+
+    def get(self, key: str) -> tuple[str, str, str] | None:
+        """Return the digest stored under ``key`` and mark it as recently used.
+
+        Parameters
+        ----------
+        key : str
+            The cache key, as returned by ``digest_cache_key``.
+
+        Returns
+        -------
+        tuple[str, str, str] | None
+            The summary, tree and content, or ``None`` on a miss.
+
+        """
+        try:
+            with self._open(key) as f:
+                summary, tree = _read_header(f)
+                f.seek(len(tree.encode()) + 1, os.SEEK_CUR)
+                content = f.read().decode()
+        except (OSError, ValueError):
+            return None
+        return summary, tree, content
+
+    def copy_to(self, key: str, path: Path) -> tuple[str, str] | None:
+        """Write the digest stored under ``key`` to the file at ``path`` and mark it as recently used.
+
+        The digest is copied in buffers, without its content being decoded or held in memory.
+
+        Parameters
+        ----------
+        key : str
+            The cache key, as returned by ``digest_cache_key``.
+        path : Path
+            The path of the ``.txt`` file to write the tree and content to.
+
+        Returns
+        -------
+        tuple[str, str] | None
+            The summary and tree, or ``None`` on a miss.
+
+        """
+        try:
+            with self._open(key) as f:
+                summary, tree = _read_header(f)
+                with path.open("wb") as target:
+                    shutil.copyfileobj(f, target)
+        except (OSError, ValueError):
+            return None
+        return summary, tree
+
+    def put(self, key: str, digest: tuple[str, str, str]) -> None:
+        """Store ``digest`` under ``key``, then evict old entries if the cache exceeds its budget.
+
+        Parameters
+        ----------
+        key : str
+            The cache key, as returned by ``digest_cache_key``.
+        digest : tuple[str, str, str]
+            The summary, tree and content to store.
+
+        """
+        summary, tree, content = digest
+
+        def write(f: BinaryIO) -> None:
+            text = io.TextIOWrapper(f, encoding="utf-8", newline="")
+            write_digest(text, tree, content)
+            text.flush()
+            text.detach()
+
+        self._store(key, summary, tree, write)
+
+    def put_file(self, key: str, summary: str, tree: str, path: Path) -> None:
+        """Store the digest written to the file at ``path`` under ``key``, without reading its content.
+
+        Parameters
+        ----------
+        key : str
+            The cache key, as returned by ``digest_cache_key``.
+        summary : str
+            The summary of the digest.
+        tree : str
+            The tree the file starts with, followed by a newline and the content.
+        path : Path
+            The path of the ``.txt`` file holding the digest.
+
+        """
+        self._store(key, summary, tree, lambda f: append_file(f, path))
+
+    def evict(self) -> None:
+        """Remove least-recently-used entries until the cache fits in its disk budget."""
+        entries: list[tuple[float, int, Path]] = []
+        for path in self.root.glob(f"*{_ENTRY_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:  # Evicted concurrently
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = 0
+        for _, size, path in sorted(entries, reverse=True):
+            total_size += size
+            if total_size > self.max_size:
+                path.unlink(missing_ok=True)
+                total_size -= size
+
+    def _open(self, key: str) -> BinaryIO:
+        """Open the entry stored under ``key`` for reading and mark it as recently used."""
+        ensure_private_directory(self.root)
+        path = self.root / f"{key}{_ENTRY_SUFFIX}"
+        f = path.open("rb")
+        os.utime(path)
+        return f
+
+    def _store(self, key: str, summary: str, tree: str, write: Callable[[BinaryIO], None]) -> None:
+        """Store an entry whose digest ``write`` writes after its header, then evict old entries."""
+        ensure_private_directory(self.root)
+
+        # Write to a temporary file first so that readers never see a partial entry
+        fd, tmp_name = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(json.dumps({"summary": summary, "tree": tree}).encode() + b"\n")
+                write(f)
+            Path(tmp_name).replace(self.root / f"{key}{_ENTRY_SUFFIX}")
+        except OSError:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+        self.evict()
+
+
+def _read_header(f: BinaryIO) -> tuple[str, str]:
+    """Read the summary and tree an entry starts with, leaving ``f`` at the start of its digest.
+
+    Raises
+    ------
+    ValueError
+        If the entry does not start with a header.
+
+    """
+    header = json.loads(f.readline())
+    return header["summary"], header["tree"]
+
+
+async def digest_cache_key(query: IngestionQuery, *, token: str | None = None) -> str | None:
+    """Resolve the commit of a remote query, pin the query to it and derive its digest cache key.
+
+    The caller must be able to access the repository with ``token``: a commit URL resolves without contacting the
+    host, so access is checked explicitly, lest a private digest be served to anyone knowing its URL. The resolved
+    commit is stored in ``query.resolved_commit``, which the revision is then fetched at.
+
+    Parameters
+    ----------
+    query : IngestionQuery
+        The parsed query of a remote repository.
+    token : str | None
+        GitHub personal access token (PAT) for accessing private repositories.
+
+    Returns
+    -------
+    str | None
+        The key, or ``None`` if the query is local, its ref cannot be resolved or the repository cannot be accessed
+        (the cache is then bypassed).
+
+    """
+    if not query.url:
+        return None
+
+    try:
+        sha = await resolve_commit(query.url, branch=query.branch, tag=query.tag, commit=query.commit, token=token)
+        # Other refs are resolved from the refs the host advertised to ``token``, which already proves access
+        if query.commit and not await check_repo_exists(query.url, token=token):
+            return None
+    except (RuntimeError, ValueError):
+        return None
+    query.resolved_commit = sha
+
+    options = {
+        "url": normalize_repo_url(query.url),
+        "sha": sha,
+        # The labels below only change the summary, but they are part of the digest all the same
+        "slug": query.slug,
+        "branch": query.branch,
+        "tag": query.tag,
+        "commit": query.commit,
+        "subpath": query.subpath,
+        "type": query.type,
+        "max_file_size": query.max_file_size,
+        "ignore_patterns": sorted(query.ignore_patterns),
+        "include_patterns": sorted(query.include_patterns or ()),
+        "include_submodules": query.include_submodules,
+        "remove_comments": query.remove_comments,
+        "comment_types": sorted(str(getattr(t, "value", t)) for t in query.comment_types),
+        "diff_base": query.diff_base,
+        "structure_only": query.structure_only,
+        "plan": query.plan,
+        "fold_duplicates": query.fold_duplicates,
+        "include_generated": query.include_generated,
+        "truncate_large_files": query.truncate_large_files,
+    }
+    return hashlib.sha256(json.dumps(options, sort_keys=True).encode()).hexdigest()
+
+
+digest_cache = DigestCache()
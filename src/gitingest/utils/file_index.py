@@ -0,0 +1,209 @@
+"""Persistent index of the processed sections of local files, so that repeated ingests only process changed files."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import closing, suppress
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from gitingest.config import FILE_INDEX_PATH, FILE_INDEX_TTL
+from gitingest.utils.os_utils import ensure_private_directory
+
+if TYPE_CHECKING:
+    import os
+    from collections.abc import Iterable
+    from pathlib import Path
+
+    from gitingest.schemas import IngestionQuery
+
+_SCHEMA_VERSION = 1
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS variants (
+    variant TEXT PRIMARY KEY,
+    last_used REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sections (
+    variant TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    section TEXT NOT NULL,
+    tokens INTEGER,
+    PRIMARY KEY (variant, path)
+) WITHOUT ROWID;
+"""
+
+# A file modified this recently may be modified again without its size or mtime changing, so it is not indexed
+_RACY_WINDOW_NS = 2_000_000_000
+
+
+@dataclass(frozen=True)
+class IndexedSection:
+    """The processed section of a file, with the stat fields of the file it was produced from.
+
+    Attributes
+    ----------
+    size : int
+        The size of the file in bytes.
+    mtime_ns : int
+        The modification time of the file in nanoseconds.
+    inode : int
+        The inode number of the file.
+    section : str
+        The section of the file in the digest content.
+    tokens : int | None
+        The estimated number of tokens of the section, or ``None`` if it could not be counted.
+
+    """
+
+    size: int
+    mtime_ns: int
+    inode: int
+    section: str
+    tokens: int | None = None
+
+    @classmethod
+    def from_stat(cls, stat: os.stat_result, section: str, tokens: int | None = None) -> IndexedSection:
+        """Create an entry for ``section``, validated by the ``stat`` of its file."""
+        return cls(stat.st_size, stat.st_mtime_ns, stat.st_ino, section, tokens)
+
+    def matches(self, stat: os.stat_result) -> bool:
+        """Return whether the file still has the size, mtime and inode the section was produced from."""
+        return (self.size, self.mtime_ns, self.inode) == (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+
+class FileIndex:
+    """SQLite store of file sections, grouped by the directory and options they were produced with.
+
+    The database is kept in a directory private to the current user (see ``ensure_private_directory``), since its
+    sections are served in place of the files they were produced from. The index is an optimization only: when the
+    database cannot be read or written, ingestion processes every file as if the index were empty.
+
+    Parameters
+    ----------
+    path : Path
+        The SQLite database file (default: ``FILE_INDEX_PATH``).
+    ttl : float
+        How long the sections of a directory that is no longer ingested are kept, in seconds
+        (default: ``FILE_INDEX_TTL``).
+
+    """
+
+    def __init__(self, path: Path = FILE_INDEX_PATH, ttl: float = FILE_INDEX_TTL) -> None:
+        self.path = path
+        self.ttl = ttl
+
+    def load(self, variant: str) -> dict[str, IndexedSection]:
+        """Return the sections indexed for ``variant``.
+
+        Parameters
+        ----------
+        variant : str
+            The directory and options the sections were produced with, as returned by ``index_variant``.
+
+        Returns
+        -------
+        dict[str, IndexedSection]
+            The indexed sections, keyed by file path.
+
+        """
+        try:
+            with closing(self._connect()) as conn:
+                rows = conn.execute(
+                    "SELECT path, size, mtime_ns, inode, section, tokens FROM sections WHERE variant = ?",
+                    (variant,),
+                )
+                return {path: IndexedSection(*fields) for path, *fields in rows}
+        except (OSError, sqlite3.Error):
+            return {}
+
+    def save(self, variant: str, updated: dict[str, IndexedSection], stale: Iterable[str] = ()) -> None:
+        """Store the sections of changed files and drop those of removed files, in a single transaction.
+
+        Sections of files modified in the last two seconds are dropped instead of stored, since a second write
+        within the same mtime tick would go unnoticed. Directories not ingested for ``ttl`` seconds are evicted.
+
+        Parameters
+        ----------
+        variant : str
+            The directory and options the sections were produced with, as returned by ``index_variant``.
+        updated : dict[str, IndexedSection]
+            The new or changed sections, keyed by file path.
+        stale : Iterable[str]
+            The paths of indexed files that were removed.
+
+        """
+        now = time.time()
+        racy_after = time.time_ns() - _RACY_WINDOW_NS
+        stale = {*stale, *(path for path, entry in updated.items() if entry.mtime_ns > racy_after)}
+        rows = [
+            (variant, path, entry.size, entry.mtime_ns, entry.inode, entry.section, entry.tokens)
+            for path, entry in updated.items()
+            if path not in stale
+        ]
+
+        # A failed update only means that the next run processes these files again
+        with suppress(OSError, sqlite3.Error), closing(self._connect()) as conn, conn:
+            conn.executemany("INSERT OR REPLACE INTO sections VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.executemany("DELETE FROM sections WHERE variant = ? AND path = ?", ((variant, p) for p in stale))
+            conn.execute("INSERT OR REPLACE INTO variants VALUES (?, ?)", (variant, now))
+
+            cursor = conn.execute("SELECT variant FROM variants WHERE last_used < ?", (now - self.ttl,))
+            expired = [expired_variant for (expired_variant,) in cursor]
+            conn.executemany("DELETE FROM sections WHERE variant = ?", ((v,) for v in expired))
+            conn.executemany("DELETE FROM variants WHERE variant = ?", ((v,) for v in expired))
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database, creating or migrating its schema as needed."""
+        ensure_private_directory(self.path.parent)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")  # Concurrent ingests read while one of them writes
+            if conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+                conn.executescript(
+                    f"DROP TABLE IF EXISTS sections; DROP TABLE IF EXISTS variants; {_SCHEMA}"
+                    f"PRAGMA user_version = {_SCHEMA_VERSION};",
+                )
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
+
+
+def index_variant(query: IngestionQuery) -> str:
+    """Derive the key under which the sections of a local query are indexed.
+
+    The key covers the ingested directory, which the paths in the section headers are relative to, and the comment
+    removal, generated file and truncation options, which change the section contents. Patterns and size limits
+    only select files, so queries differing by them share their sections, unless files are truncated to a size
+    derived from the limit.
+
+    Parameters
+    ----------
+    query : IngestionQuery
+        The parsed query of a local directory.
+
+    Returns
+    -------
+    str
+        The index key.
+
+    """
+    options = {
+        "root": str(query.local_path),
+        "remove_comments": query.remove_comments,
+        "comment_types": sorted(str(getattr(t, "value", t)) for t in query.comment_types)
+        if query.remove_comments
+        else [],
+        "include_generated": query.include_generated,
+        "truncated_size": query.max_file_size if query.truncate_large_files else None,
+    }
+    return hashlib.sha256(json.dumps(options, sort_keys=True).encode()).hexdigest()
+
+
+file_index = FileIndex()
@@ -2,12 +2,17 @@
 
 from __future__ import annotations
 
+import errno
 import locale
+import os
 import platform
+import shutil
+import sys
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from pathlib import Path
+    from typing import BinaryIO, Callable, TextIO
 
 try:
     locale.setlocale(locale.LC_ALL, "")
@@ -15,6 +20,10 @@ except locale.Error:
     locale.setlocale(locale.LC_ALL, "C")
 
 _CHUNK_SIZE = 1024  # bytes
+_WRITE_CHUNK_SIZE = 1024 * 1024  # characters
+_KERNEL_COPY_SIZE = 1024 * 1024 * 1024  # bytes copied by a single ``copy_file_range`` or ``sendfile`` call
+# Errors of ``copy_file_range`` and ``sendfile`` meaning that they do not support the files, rather than a failure
+_KERNEL_COPY_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP}
 
 
 def _get_preferred_encodings() -> list[str]:
@@ -77,3 +86,69 @@ def _decodes(chunk: bytes, encoding: str) -> bool:
     except UnicodeDecodeError:
         return False
     return True
+
+
+def write_digest(file: TextIO, tree: str, content: str) -> None:
+    """Write the tree and contents of a digest to ``file``, separated by a newline.
+
+    The parts are written in turn and the contents in slices of ``_WRITE_CHUNK_SIZE`` characters, so that neither
+    their concatenation nor the encoding of the whole digest is held in memory at once.
+
+    Parameters
+    ----------
+    file : TextIO
+        The text stream to write to.
+    tree : str
+        The tree-like string representation of the file structure.
+    content : str
+        The content of the files in the repository or directory.
+
+    """
+    file.write(tree)
+    file.write("\n")
+    file.writelines(content[start : start + _WRITE_CHUNK_SIZE] for start in range(0, len(content), _WRITE_CHUNK_SIZE))
+
+
+def append_file(target: BinaryIO, path: Path) -> None:
+    """Append the bytes of the file at ``path`` to ``target``, without reading them into Python where possible.
+
+    The bytes are copied in the kernel with ``os.copy_file_range``, or ``os.sendfile`` where the file systems do not
+    support it (Linux only), and read and written in buffers otherwise.
+
+    Parameters
+    ----------
+    target : BinaryIO
+        The binary stream to write to, backed by a file descriptor.
+    path : Path
+        The path of the file to copy.
+
+    """
+    target.flush()  # The kernel writes at the position of the file descriptor, after the buffered bytes
+    with path.open("rb", buffering=0) as source:  # Unbuffered, so that a fallback resumes where the kernel stopped
+        fds = source.fileno(), target.fileno()
+        if not (_kernel_copy(_copy_file_range, *fds) or _kernel_copy(_sendfile, *fds)):
+            shutil.copyfileobj(source, target)
+
+
+def _kernel_copy(copy: Callable[[int, int], int], source: int, target: int) -> bool:
+    """Copy the rest of ``source`` to ``target`` with ``copy``, or return ``False`` if it does not support them."""
+    try:
+        while copy(source, target):
+            pass
+    except OSError as exc:
+        if exc.errno not in _KERNEL_COPY_UNSUPPORTED:
+            raise
+        return False
+    return True
+
+
+def _copy_file_range(source: int, target: int) -> int:
+    if not hasattr(os, "copy_file_range"):
+        raise OSError(errno.ENOSYS, "copy_file_range is not available")
+    return os.copy_file_range(source, target, _KERNEL_COPY_SIZE)
+
+
+def _sendfile(source: int, target: int) -> int:
+    if not sys.platform.startswith("linux"):  # Other platforms only send files to sockets
+        raise OSError(errno.ENOSYS, "sendfile to a file is not available")
+    return os.sendfile(target, source, None, _KERNEL_COPY_SIZE)
@@ -0,0 +1,237 @@
+"""Detection of generated, minified and vendored files, whose contents are left out of the digest."""
+
+from __future__ import annotations
+
+import os
+import re
+from enum import Enum
+from typing import TYPE_CHECKING
+
+from pathspec import PathSpec
+
+from gitingest.schemas import FileSystemNodeType
+from gitingest.schemas.filesystem import is_binary_file
+from gitingest.utils.file_utils import _CHUNK_SIZE
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+    from gitingest.schemas import FileSystemNode
+
+GENERATED_SAMPLE_SIZE = 8 * 1024  # Bytes read from the start of a file to tell whether it is generated or minified
+
+# Files named by code generators, marked ``linguist-generated`` unless a ``.gitattributes`` file says otherwise
+GENERATED_FILE_PATTERNS: set[str] = {
+    # Protocol buffers and gRPC
+    "*_pb2.py",
+    "*_pb2.pyi",
+    "*_pb2_grpc.py",
+    "*.pb.go",
+    "*.pb.cc",
+    "*.pb.h",
+    "*.pb.swift",
+    "*_pb.js",
+    "*_pb.d.ts",
+    "*_grpc_pb.js",
+    "*_grpc_pb.d.ts",
+    "*.pb.dart",
+    "*.pbenum.dart",
+    "*.pbgrpc.dart",
+    "*.pbjson.dart",
+    # Dart and .NET code generators
+    "*.g.dart",
+    "*.freezed.dart",
+    "*.designer.cs",
+    "*.Designer.cs",
+    # Minified bundles
+    "*-min.js",
+    "*.min.mjs",
+}
+
+# A comment in the first lines of a file holding one of the markers code generators write
+_GENERATED_MARKER = re.compile(
+    rb"^[ \t]*(?:#|//|/\*|\*|<!--|--|;|%).*"
+    rb"(?:@generated|DO NOT EDIT|[Cc]ode generated by|Generated by the protocol buffer compiler|<auto-generated)",
+    re.MULTILINE,
+)
+_MARKER_LINES = 10  # Lines searched for a marker
+_MINIFIED_MIN_SIZE = 2048  # Samples shorter than this are too short to tell whether a file is minified
+_MINIFIED_LINE_LENGTH = 300  # Average line length above which a sample may be minified
+_MINIFIED_WHITESPACE_RATIO = 0.1  # Share of whitespace below which a sample with long lines is minified
+
+_ATTRIBUTES = ("linguist-generated", "linguist-vendored")
+
+
+class GeneratedKind(Enum):
+    """Enum representing why the content of a file is left out of the digest."""
+
+    GENERATED = "Generated"
+    MINIFIED = "Minified"
+    VENDORED = "Vendored"
+
+
+class LinguistRules:
+    """The ``linguist-generated`` and ``linguist-vendored`` attributes set by the ``.gitattributes`` files of a tree.
+
+    As in Git, the patterns of a ``.gitattributes`` file are relative to its directory, later lines override earlier
+    ones, and the files of deeper directories override those of their parents. ``GENERATED_FILE_PATTERNS`` come
+    first, so that a repository can unset them.
+    """
+
+    def __init__(self) -> None:
+        self._rules: list[tuple[str, PathSpec, str, bool]] = []
+        self.add("", "\n".join(f"{pattern} linguist-generated" for pattern in sorted(GENERATED_FILE_PATTERNS)))
+
+    def add(self, directory: str, text: str) -> None:
+        """Add the rules of the ``.gitattributes`` file of ``directory``.
+
+        Parameters
+        ----------
+        directory : str
+            The directory of the file, as a POSIX path relative to the root of the repository (``""`` for the root).
+        text : str
+            The content of the file.
+
+        """
+        prefix = f"{directory}/" if directory else ""
+        for raw in text.splitlines():
+            fields = raw.split()
+            # Comments, macro definitions and quoted patterns are not needed for the linguist attributes
+            if not fields or fields[0].startswith(("#", "[", '"')):
+                continue
+            spec = None
+            for attribute in fields[1:]:
+                name, value = _parse_attribute(attribute)
+                if name in _ATTRIBUTES:
+                    spec = spec or PathSpec.from_lines("gitwildmatch", [fields[0]])
+                    self._rules.append((prefix, spec, name, value))
+
+    def classify(self, path: str) -> GeneratedKind | None:
+        """Return whether the file at ``path`` is generated or vendored according to the rules.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file, as a POSIX path relative to the root of the repository.
+
+        Returns
+        -------
+        GeneratedKind | None
+            ``GeneratedKind.GENERATED`` or ``GeneratedKind.VENDORED``, or ``None`` if neither attribute is set.
+
+        """
+        # Later rules override earlier ones
+        values = {
+            name: value
+            for prefix, spec, name, value in self._rules
+            if path.startswith(prefix) and spec.match_file(path[len(prefix) :])
+        }
+        if values.get("linguist-generated"):
+            return GeneratedKind.GENERATED
+        if values.get("linguist-vendored"):
+            return GeneratedKind.VENDORED
+        return None
+
+
+def load_linguist_rules(node: FileSystemNode, local_path: Path) -> LinguistRules:
+    """Load the linguist attributes that apply to the files under ``node``.
+
+    The ``.gitattributes`` files are those of the directories of the tree, read from the tree for archives, and
+    those of the directories above it up to ``local_path``, read from disk.
+
+    Parameters
+    ----------
+    node : FileSystemNode
+        The root node of the ingested tree.
+    local_path : Path
+        The root of the repository or directory, which the paths of the nodes are relative to.
+
+    Returns
+    -------
+    LinguistRules
+        The rules, ``GENERATED_FILE_PATTERNS`` included.
+
+    """
+    rules = LinguistRules()
+    root = _posix(node.path_str)
+    parts = root.split("/") if root else []
+    # The directories above the root node, the root directory itself being visited with the tree
+    for depth in range(len(parts)):
+        directory = "/".join(parts[:depth])
+        text = _read_text(local_path / directory / ".gitattributes")
+        if text is not None:
+            rules.add(directory, text)
+
+    for directory in _iter_directories(node):
+        attributes = next((child for child in directory.children if child.name == ".gitattributes"), None)
+        if attributes is not None and attributes.data is not None:
+            text = attributes.data.decode("utf-8", errors="replace")
+        else:
+            text = _read_text(directory.path / ".gitattributes")
+        if text is not None:
+            rules.add(_posix(directory.path_str), text)
+    return rules
+
+
+def detect_generated(sample: bytes) -> GeneratedKind | None:
+    """Tell whether a file is generated or minified from the first ``GENERATED_SAMPLE_SIZE`` bytes of its content.
+
+    Generated files are recognized by the marker comments code generators write in their first lines, such as
+    ``Code generated by ... DO NOT EDIT.`` or ``@generated``. Minified files have long lines and little whitespace.
+
+    Parameters
+    ----------
+    sample : bytes
+        The start of the file.
+
+    Returns
+    -------
+    GeneratedKind | None
+        ``GeneratedKind.GENERATED`` or ``GeneratedKind.MINIFIED``, or ``None`` if the file looks hand-written.
+
+    """
+    if is_binary_file(sample[:_CHUNK_SIZE]):
+        return None
+
+    header = b"\n".join(sample.split(b"\n", _MARKER_LINES)[:_MARKER_LINES])
+    if _GENERATED_MARKER.search(header):
+        return GeneratedKind.GENERATED
+
+    if len(sample) >= _MINIFIED_MIN_SIZE:
+        lines = sample.count(b"\n") + 1
+        whitespace = len(sample) - len(sample.translate(None, b" \t\r\n"))
+        if len(sample) / lines > _MINIFIED_LINE_LENGTH and whitespace / len(sample) < _MINIFIED_WHITESPACE_RATIO:
+            return GeneratedKind.MINIFIED
+    return None
+
+
+def _parse_attribute(attribute: str) -> tuple[str, bool]:
+    """Return the name of a ``.gitattributes`` attribute and whether it is set."""
+    if attribute.startswith(("-", "!")):
+        return attribute[1:], False
+    name, _, value = attribute.partition("=")
+    return name, value.lower() not in ("false", "0")
+
+
+def _iter_directories(node: FileSystemNode) -> Iterator[FileSystemNode]:
+    """Yield the directory nodes under the given node, parents first."""
+    if node.type != FileSystemNodeType.DIRECTORY:
+        return
+    yield node
+    for child in node.children:
+        yield from _iter_directories(child)
+
+
+def _read_text(path: Path) -> str | None:
+    """Return the content of the file at ``path``, or ``None`` if it cannot be read."""
+    try:
+        return path.read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return None
+
+
+def _posix(path_str: str) -> str:
+    """Return a path relative to the repository as a POSIX path, ``""`` for the root."""
+    path = path_str.replace(os.sep, "/").strip("/")
+    return "" if path == "." else path
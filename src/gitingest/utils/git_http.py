@@ -0,0 +1,229 @@
+"""Ref discovery and object sizes over Git's smart HTTP protocol, without spawning ``git``."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Final
+
+from starlette.status import HTTP_200_OK
+
+if TYPE_CHECKING:
+    import httpx
+
+_FLUSH_PKT: Final[bytes] = b"0000"
+_DELIM_PKT: Final[bytes] = b"0001"
+_SPECIAL_PKT_LENGTHS: Final[set[int]] = {0, 1, 2}  # flush, delim, response-end
+_PKT_LENGTH_SIZE: Final[int] = 4
+
+# Refs ingestion can be asked for: the default branch, branches and tags
+_REF_PREFIXES: Final[tuple[str, ...]] = ("HEAD", "refs/heads/", "refs/tags/")
+
+
+async def discover_refs(
+    client: httpx.AsyncClient,
+    url: str,
+    *,
+    headers: dict[str, str] | None = None,
+) -> dict[str, str]:
+    """List the default branch, branches and tags of a repository served over smart HTTP.
+
+    Protocol v2 servers are asked for the refs with an ``ls-refs`` command restricted to the wanted prefixes. Older
+    servers answer with their full ref advertisement, which is filtered here.
+
+    Parameters
+    ----------
+    client : httpx.AsyncClient
+        The HTTP client to send the requests with.
+    url : str
+        The URL of the Git repository.
+    headers : dict[str, str] | None
+        Extra headers to send, e.g. for authentication.
+
+    Returns
+    -------
+    dict[str, str]
+        The SHA of each advertised ref, keyed by full ref name (e.g. ``"HEAD"``, ``"refs/heads/main"``, or
+        ``"refs/tags/v1.0^{}"`` for the commit an annotated tag peels to).
+
+    Raises
+    ------
+    ValueError
+        If the server does not speak the smart HTTP protocol or sends a malformed response.
+
+    """
+    base_url = url.rstrip("/")
+    headers = {**(headers or {}), "Git-Protocol": "version=2"}
+
+    lines = await _advertisement(client, base_url, headers=headers)
+    if lines and lines[0].rstrip(b"\n") == b"version 2":
+        return await _ls_refs(client, base_url, headers=headers)
+
+    return _parse_advertisement(lines)
+
+
+async def fetch_object_sizes(
+    client: httpx.AsyncClient,
+    url: str,
+    oids: list[str],
+    *,
+    headers: dict[str, str] | None = None,
+) -> dict[str, int]:
+    """Ask a repository served over smart HTTP for the sizes of objects, without downloading them.
+
+    The sizes are requested with the protocol v2 ``object-info`` command, in a single round-trip after the
+    capability advertisement.
+
+    Parameters
+    ----------
+    client : httpx.AsyncClient
+        The HTTP client to send the requests with.
+    url : str
+        The URL of the Git repository.
+    oids : list[str]
+        The IDs of the objects.
+    headers : dict[str, str] | None
+        Extra headers to send, e.g. for authentication.
+
+    Returns
+    -------
+    dict[str, int]
+        The size of each object in bytes, keyed by object ID.
+
+    Raises
+    ------
+    ValueError
+        If the server does not speak protocol v2, does not advertise ``object-info``, or sends a malformed response.
+
+    """
+    base_url = url.rstrip("/")
+    headers = {**(headers or {}), "Git-Protocol": "version=2"}
+
+    capabilities = [line.rstrip(b"\n") for line in await _advertisement(client, base_url, headers=headers)]
+    if b"version 2" not in capabilities or b"object-info" not in capabilities:
+        msg = f"{url} does not advertise the object-info command"
+        raise ValueError(msg)
+
+    arguments = ["size", *(f"oid {oid}" for oid in oids)]
+    sizes: dict[str, int] = {}
+    for line in await _command(client, base_url, "object-info", arguments, headers=headers):
+        oid, _, size = line.decode().rstrip("\n").partition(" ")
+        if size:  # The first line only repeats the requested attribute
+            sizes[oid] = int(size)
+    return sizes
+
+
+def parse_pkt_lines(data: bytes) -> list[bytes | None]:
+    """Split a stream of pkt-lines into their payloads.
+
+    Parameters
+    ----------
+    data : bytes
+        The raw pkt-line stream.
+
+    Returns
+    -------
+    list[bytes | None]
+        The payload of each pkt-line, or ``None`` for the flush, delimiter and response-end packets.
+
+    Raises
+    ------
+    ValueError
+        If the stream is truncated or a length prefix is invalid.
+
+    """
+    packets: list[bytes | None] = []
+    pos = 0
+    while pos < len(data):
+        try:
+            length = int(data[pos : pos + _PKT_LENGTH_SIZE], 16)
+        except ValueError as exc:
+            msg = f"Invalid pkt-line length at offset {pos}"
+            raise ValueError(msg) from exc
+
+        if length in _SPECIAL_PKT_LENGTHS:
+            packets.append(None)
+            pos += _PKT_LENGTH_SIZE
+            continue
+
+        if length < _PKT_LENGTH_SIZE or pos + length > len(data):
+            msg = f"Truncated pkt-line at offset {pos}"
+            raise ValueError(msg)
+
+        packets.append(data[pos + _PKT_LENGTH_SIZE : pos + length])
+        pos += length
+
+    return packets
+
+
+def _encode_pkt_line(payload: str) -> bytes:
+    """Frame ``payload`` as a pkt-line."""
+    data = payload.encode()
+    return f"{len(data) + _PKT_LENGTH_SIZE:04x}".encode() + data
+
+
+async def _advertisement(client: httpx.AsyncClient, base_url: str, *, headers: dict[str, str]) -> list[bytes]:
+    """Return the pkt-lines of the ``git-upload-pack`` advertisement, without the service announcement."""
+    response = await client.get(f"{base_url}/info/refs", params={"service": "git-upload-pack"}, headers=headers)
+    if response.status_code != HTTP_200_OK or not response.headers.get("content-type", "").startswith(
+        "application/x-git-upload-pack-advertisement",
+    ):
+        msg = f"{base_url} does not serve the smart HTTP protocol (HTTP {response.status_code})"
+        raise ValueError(msg)
+
+    lines = [line for line in parse_pkt_lines(response.content) if line is not None]
+    if lines and lines[0].startswith(b"# service="):
+        lines = lines[1:]
+    return lines
+
+
+async def _command(
+    client: httpx.AsyncClient,
+    base_url: str,
+    command: str,
+    arguments: list[str],
+    *,
+    headers: dict[str, str],
+) -> list[bytes]:
+    """Run a protocol v2 command and return the pkt-lines of its response."""
+    body = b"".join(
+        [
+            _encode_pkt_line(f"command={command}\n"),
+            _DELIM_PKT,
+            *(_encode_pkt_line(f"{argument}\n") for argument in arguments),
+            _FLUSH_PKT,
+        ],
+    )
+    response = await client.post(
+        f"{base_url}/git-upload-pack",
+        content=body,
+        headers={**headers, "Content-Type": "application/x-git-upload-pack-request"},
+    )
+    if response.status_code != HTTP_200_OK:
+        msg = f"{command} failed for {base_url} (HTTP {response.status_code})"
+        raise ValueError(msg)
+    return [line for line in parse_pkt_lines(response.content) if line is not None]
+
+
+async def _ls_refs(client: httpx.AsyncClient, base_url: str, *, headers: dict[str, str]) -> dict[str, str]:
+    """Run the protocol v2 ``ls-refs`` command and return the ref map."""
+    arguments = ["peel", *(f"ref-prefix {prefix}" for prefix in _REF_PREFIXES)]
+    refs: dict[str, str] = {}
+    for line in await _command(client, base_url, "ls-refs", arguments, headers=headers):
+        # Each line is the SHA and name of a ref, followed by attributes such as "peeled:<SHA>"
+        sha, ref, *attributes = line.decode().rstrip("\n").split(" ")
+        refs[ref] = sha
+        for attribute in attributes:
+            if attribute.startswith("peeled:"):
+                refs[f"{ref}^{{}}"] = attribute[len("peeled:") :]
+
+    return refs
+
+
+def _parse_advertisement(lines: list[bytes]) -> dict[str, str]:
+    """Return the wanted refs of a protocol v0/v1 ref advertisement."""
+    refs: dict[str, str] = {}
+    for line in lines:
+        # The first line carries the capabilities after a NUL byte
+        sha, _, ref = line.split(b"\0", 1)[0].decode().rstrip("\n").partition(" ")
+        if ref.startswith(_REF_PREFIXES):
+            refs[ref] = sha
+    return refs
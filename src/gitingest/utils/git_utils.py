@@ -4,21 +4,49 @@ from __future__ import annotations
 
 import asyncio
 import base64
+import fnmatch
+import hashlib
+import importlib.util
+import os
 import re
+import signal
+import weakref
+from contextlib import suppress
 from typing import Final
 from urllib.parse import urlparse
 
 import httpx
 from starlette.status import HTTP_200_OK, HTTP_401_UNAUTHORIZED, HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND
 
+from gitingest.config import MAX_GIT_PROCESSES, REMOTE_REFS_CACHE_TTL, REPO_EXISTS_CACHE_TTL, REPO_MISSING_CACHE_TTL
 from gitingest.utils.compat_func import removesuffix
 from gitingest.utils.exceptions import InvalidGitHubTokenError
+from gitingest.utils.git_http import discover_refs
+from gitingest.utils.ttl_cache import TTLCache
 
 # GitHub Personal-Access tokens (classic + fine-grained).
 #   - ghp_ / gho_ / ghu_ / ghs_ / ghr_  → 36 alphanumerics
 #   - github_pat_                       → 22 alphanumerics + "_" + 59 alphanumerics
 _GITHUB_PAT_PATTERN: Final[str] = r"^(?:gh[pousr]_[A-Za-z0-9]{36}|github_pat_[A-Za-z0-9]{22}_[A-Za-z0-9]{59})$"
 
+# HTTP/2 needs the optional ``h2`` package (``pip install httpx[http2]``)
+_HTTP2_AVAILABLE: Final[bool] = importlib.util.find_spec("h2") is not None
+
+_TERMINATE_GRACE_PERIOD: Final[float] = 2  # seconds a cancelled command gets to exit before it is killed
+
+_process_semaphores: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = (
+    weakref.WeakKeyDictionary()
+)
+_git_installed = False
+
+_http_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient] = weakref.WeakKeyDictionary()
+
+# (repository URL, token digest) -> whether the repository is reachable
+repo_exists_cache: TTLCache[tuple[str, str | None], bool] = TTLCache()
+
+# (repository URL, token digest) -> {ref name: SHA} advertised by the remote
+remote_refs_cache: TTLCache[tuple[str, str | None], dict[str, str]] = TTLCache()
+
 
 def is_github_host(url: str) -> bool:
     """Check if a URL is from a GitHub host (github.com or GitHub Enterprise).
@@ -38,13 +66,19 @@ def is_github_host(url: str) -> bool:
     return hostname.startswith("github.")
 
 
-async def run_command(*args: str) -> tuple[bytes, bytes]:
+async def run_command(*args: str, stdin: bytes | None = None) -> tuple[bytes, bytes]:
     """Execute a shell command asynchronously and return (stdout, stderr) bytes.
 
+    At most ``MAX_GIT_PROCESSES`` commands run at once. Each command runs in its own process group, which is
+    terminated if the awaiting task is cancelled (e.g. on timeout or client disconnect), so that no orphaned process
+    outlives its request.
+
     Parameters
     ----------
     *args : str
         The command and its arguments to execute.
+    stdin : bytes | None
+        The input written to the standard input of the command, if any.
 
     Returns
     -------
@@ -57,13 +91,21 @@ async def run_command(*args: str) -> tuple[bytes, bytes]:
         If command exits with a non-zero status.
 
     """
-    # Execute the requested command
-    proc = await asyncio.create_subprocess_exec(
-        *args,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
-    stdout, stderr = await proc.communicate()
+    async with _process_semaphore():
+        # Execute the requested command
+        proc = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=asyncio.subprocess.PIPE if stdin is not None else None,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=os.name == "posix",
+        )
+        try:
+            stdout, stderr = await proc.communicate(stdin)
+        except asyncio.CancelledError:
+            await _terminate(proc)
+            raise
+
     if proc.returncode != 0:
         msg = f"Command failed: {' '.join(args)}\nError: {stderr.decode().strip()}"
         raise RuntimeError(msg)
@@ -71,25 +113,95 @@ async def run_command(*args: str) -> tuple[bytes, bytes]:
     return stdout, stderr
 
 
+def _process_semaphore() -> asyncio.Semaphore:
+    """Return the semaphore bounding the subprocesses started from the running event loop."""
+    loop = asyncio.get_running_loop()
+    semaphore = _process_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _process_semaphores[loop] = asyncio.Semaphore(MAX_GIT_PROCESSES)
+    return semaphore
+
+
+async def _terminate(proc: asyncio.subprocess.Process) -> None:
+    """Terminate ``proc`` and its process group, killing them if they do not exit within a grace period."""
+    _signal_process_group(proc, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(proc.wait(), timeout=_TERMINATE_GRACE_PERIOD)
+    except asyncio.TimeoutError:
+        _signal_process_group(proc, getattr(signal, "SIGKILL", signal.SIGTERM))
+        await proc.wait()
+
+
+def _signal_process_group(proc: asyncio.subprocess.Process, sig: int) -> None:
+    """Send ``sig`` to the process group of ``proc`` (only to ``proc`` itself where groups are unsupported)."""
+    with suppress(ProcessLookupError):
+        if os.name == "posix":
+            os.killpg(proc.pid, sig)
+        else:
+            proc.kill()
+
+
 async def ensure_git_installed() -> None:
     """Ensure Git is installed and accessible on the system.
 
+    The check only runs until it first succeeds.
+
     Raises
     ------
     RuntimeError
         If Git is not installed or not accessible.
 
     """
+    global _git_installed  # noqa: PLW0603
+
+    if _git_installed:
+        return
+
     try:
         await run_command("git", "--version")
     except RuntimeError as exc:
         msg = "Git is not installed or not accessible. Please install Git first."
         raise RuntimeError(msg) from exc
 
+    _git_installed = True
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the HTTP client shared by the requests made from the running event loop.
+
+    The client keeps connections alive between requests (over HTTP/2 when ``h2`` is installed). Connections cannot
+    outlive their event loop, so each loop gets its own client.
+
+    Returns
+    -------
+    httpx.AsyncClient
+        The pooled HTTP client of the running event loop.
+
+    """
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(follow_redirects=True, http2=_HTTP2_AVAILABLE)
+        _http_clients[loop] = client
+    return client
+
+
+async def close_http_client() -> None:
+    """Close the HTTP client of the running event loop, if it has one.
+
+    Call it before the loop is closed, so that the connections the client keeps alive are shut down cleanly.
+    """
+    client = _http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
 
 async def check_repo_exists(url: str, token: str | None = None) -> bool:
     """Check whether a remote Git repository is reachable.
 
+    Answers are cached for ``REPO_EXISTS_CACHE_TTL`` seconds when the repository exists and
+    ``REPO_MISSING_CACHE_TTL`` seconds when it does not. Network errors are not cached.
+
     Parameters
     ----------
     url : str
@@ -108,6 +220,11 @@ async def check_repo_exists(url: str, token: str | None = None) -> bool:
         If the host returns an unrecognised status code.
 
     """
+    cache_key = _remote_cache_key(url, token)
+    cached = repo_exists_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     headers = {}
 
     if token and is_github_host(url):
@@ -117,20 +234,39 @@ async def check_repo_exists(url: str, token: str | None = None) -> bool:
         url = f"{base_api}/repos/{owner}/{repo}"
         headers["Authorization"] = f"Bearer {token}"
 
-    async with httpx.AsyncClient(follow_redirects=True) as client:
-        try:
-            response = await client.head(url, headers=headers)
-        except httpx.RequestError:
-            return False
+    try:
+        response = await get_http_client().head(url, headers=headers)
+    except httpx.RequestError:
+        return False
 
     status_code = response.status_code
 
-    if status_code == HTTP_200_OK:
-        return True
-    if status_code in {HTTP_401_UNAUTHORIZED, HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND}:
-        return False
-    msg = f"Unexpected HTTP status {status_code} for {url}"
-    raise RuntimeError(msg)
+    if status_code not in {HTTP_200_OK, HTTP_401_UNAUTHORIZED, HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND}:
+        msg = f"Unexpected HTTP status {status_code} for {url}"
+        raise RuntimeError(msg)
+
+    exists = status_code == HTTP_200_OK
+    repo_exists_cache.set(cache_key, exists, ttl=REPO_EXISTS_CACHE_TTL if exists else REPO_MISSING_CACHE_TTL)
+    return exists
+
+
+def _remote_cache_key(url: str, token: str | None) -> tuple[str, str | None]:
+    """Return the key under which facts about a remote repository are cached.
+
+    Parameters
+    ----------
+    url : str
+        The URL of the repository.
+    token : str | None
+        The token used to access the repository, which may change what is visible.
+
+    Returns
+    -------
+    tuple[str, str | None]
+        The URL without trailing slash or ``.git`` suffix, and the SHA-256 digest of the token.
+
+    """
+    return removesuffix(url.rstrip("/"), ".git"), hashlib.sha256(token.encode()).hexdigest() if token else None
 
 
 def _parse_github_url(url: str) -> tuple[str, str, str]:
@@ -171,6 +307,66 @@ def _parse_github_url(url: str) -> tuple[str, str, str]:
     return parsed.hostname, owner, repo
 
 
+async def fetch_remote_refs(url: str, *, token: str | None = None) -> dict[str, str]:
+    """Fetch the default branch, branches and tags of a remote repository in a single round-trip.
+
+    HTTP(S) remotes are asked directly over the smart HTTP protocol with the pooled client; ``git ls-remote`` is
+    only spawned for other remotes or when that fails. The ref map is cached for ``REMOTE_REFS_CACHE_TTL`` seconds,
+    so parsing a URL, resolving its ref and cloning it share one round-trip. A successful listing also proves that
+    the repository exists, which is recorded for ``check_repo_exists``.
+
+    Parameters
+    ----------
+    url : str
+        The URL of the Git repository.
+    token : str | None
+        GitHub personal access token (PAT) for accessing private repositories.
+
+    Returns
+    -------
+    dict[str, str]
+        The SHA of each advertised ref, keyed by full ref name (e.g. ``"HEAD"``, ``"refs/heads/main"``, or
+        ``"refs/tags/v1.0^{}"`` for the commit an annotated tag peels to).
+
+    """
+    cache_key = _remote_cache_key(url, token)
+    refs = remote_refs_cache.get(cache_key)
+    if refs is not None:
+        return refs
+
+    refs = await _discover_refs_over_http(url, token=token)
+    if refs is None:
+        cmd = ["git"]
+
+        # Add authentication if needed
+        if token and is_github_host(url):
+            cmd += ["-c", create_git_auth_header(token, url=url)]
+
+        cmd += ["ls-remote", url, "HEAD", "refs/heads/*", "refs/tags/*"]
+
+        await ensure_git_installed()
+        stdout, _ = await run_command(*cmd)
+
+        lines = (line.split("\t", 1) for line in stdout.decode().splitlines() if "\t" in line)
+        refs = {ref: sha for sha, ref in lines}
+
+    remote_refs_cache.set(cache_key, refs, ttl=REMOTE_REFS_CACHE_TTL)
+    repo_exists_cache.set(cache_key, value=True, ttl=REPO_EXISTS_CACHE_TTL)
+    return refs
+
+
+async def _discover_refs_over_http(url: str, *, token: str | None) -> dict[str, str] | None:
+    """Return the ref map of an HTTP(S) remote, or ``None`` if it must be listed with ``git ls-remote`` instead."""
+    if urlparse(url).scheme not in {"http", "https"}:
+        return None
+
+    headers = {"Authorization": f"Basic {_basic_auth_credentials(token)}"} if token and is_github_host(url) else {}
+    try:
+        return await discover_refs(get_http_client(), url, headers=headers)
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
 async def fetch_remote_branches_or_tags(url: str, *, ref_type: str, token: str | None = None) -> list[str]:
     """Fetch the list of branches or tags from a remote Git repository.
 
@@ -198,36 +394,67 @@ async def fetch_remote_branches_or_tags(url: str, *, ref_type: str, token: str |
         msg = f"Invalid fetch type: {ref_type}"
         raise ValueError(msg)
 
-    cmd = ["git"]
+    prefix = "refs/tags/" if ref_type == "tags" else "refs/heads/"
+    refs = await fetch_remote_refs(url, token=token)
 
-    # Add authentication if needed
-    if token and is_github_host(url):
-        cmd += ["-c", create_git_auth_header(token, url=url)]
+    # Skip the peeled tag objects (those ending with "^{}")
+    return [ref[len(prefix) :] for ref in refs if ref.startswith(prefix) and not ref.endswith("^{}")]
+
+
+async def resolve_commit(
+    url: str,
+    *,
+    branch: str | None = None,
+    tag: str | None = None,
+    commit: str | None = None,
+    token: str | None = None,
+) -> str:
+    """Resolve the requested ref of a remote repository to a commit SHA.
+
+    The ref is looked up in the cached ref map of ``fetch_remote_refs``.
 
-    cmd += ["ls-remote"]
+    Parameters
+    ----------
+    url : str
+        The URL of the Git repository.
+    branch : str | None
+        The branch to resolve.
+    tag : str | None
+        The tag to resolve. Takes precedence over ``branch``.
+    commit : str | None
+        The commit, returned as is. Takes precedence over ``tag`` and ``branch``.
+    token : str | None
+        GitHub personal access token (PAT) for accessing private repositories.
 
-    fetch_tags = ref_type == "tags"
-    to_fetch = "tags" if fetch_tags else "heads"
+    Returns
+    -------
+    str
+        The SHA of the commit the ref points to (the default branch if no ref is given).
 
-    cmd += [f"--{to_fetch}"]
+    Raises
+    ------
+    ValueError
+        If the ref does not exist in the remote repository.
 
-    # `--refs` filters out the peeled tag objects (those ending with "^{}") (for tags)
-    if fetch_tags:
-        cmd += ["--refs"]
+    """
+    if commit:
+        return commit
 
-    cmd += [url]
+    if tag:
+        # Annotated tags are advertised twice: the tag object, then the commit it peels to ("^{}")
+        candidates = [f"refs/tags/{tag}^{{}}", f"refs/tags/{tag}"]
+    elif branch:
+        candidates = [f"refs/heads/{branch}"]
+    else:
+        candidates = ["HEAD"]
 
-    await ensure_git_installed()
-    stdout, _ = await run_command(*cmd)
+    refs = await fetch_remote_refs(url, token=token)
+    for candidate in candidates:
+        if candidate in refs:
+            return refs[candidate]
 
-    # For each line in the output:
-    # - Skip empty lines and lines that don't contain "refs/{to_fetch}/"
-    # - Extract the branch or tag name after "refs/{to_fetch}/"
-    return [
-        line.split(f"refs/{to_fetch}/", 1)[1]
-        for line in stdout.decode().splitlines()
-        if line.strip() and f"refs/{to_fetch}/" in line
-    ]
+    msg = f"Could not resolve {candidates[-1]!r} in {url}"
+    raise ValueError(msg)
 
 
 def create_git_command(base_cmd: list[str], local_path: str, url: str, token: str | None = None) -> list[str]:
@@ -256,6 +483,159 @@ def create_git_command(base_cmd: list[str], local_path: str, url: str, token: st
     return cmd
 
 
+def create_sparse_checkout_rules(
+    *,
+    subpath: str = "/",
+    include_patterns: set[str] | None = None,
+    ignore_patterns: set[str] | None = None,
+    excluded_paths: list[str] | None = None,
+) -> list[str]:
+    """Translate the ingestion filters into non-cone sparse-checkout rules.
+
+    The rules use gitignore semantics where the last matching rule wins: positive rules select the files to
+    check out (include patterns, restricted to the subpath, else the subpath, else everything) and negated rules drop
+    ignored patterns and explicitly excluded paths (e.g. blobs above the size limit).
+
+    Parameters
+    ----------
+    subpath : str
+        The subpath to restrict the checkout to (default: ``"/"``).
+    include_patterns : set[str] | None
+        Patterns of files to check out, relative to the root of the repository. Only their matches under ``subpath``
+        are checked out.
+    ignore_patterns : set[str] | None
+        Patterns of files that must not be checked out.
+    excluded_paths : list[str] | None
+        Exact repository paths that must not be checked out.
+
+    Returns
+    -------
+    list[str]
+        The sparse-checkout rules, one pattern per entry.
+
+    """
+    subpath = subpath.strip("/")
+    if include_patterns and subpath:
+        rebased = {_rebase_sparse_pattern(pattern, subpath) for pattern in include_patterns}
+        # Without any match under the subpath, its directory is still checked out so that it can be ingested
+        rules = sorted(rule for rule in rebased if rule is not None) or [f"/{_escape_sparse_path(subpath)}"]
+    elif include_patterns:
+        rules = sorted(include_patterns)
+    elif subpath:
+        rules = [f"/{_escape_sparse_path(subpath)}"]
+    else:
+        rules = ["/*"]
+
+    rules += [f"!{pattern}" for pattern in sorted(ignore_patterns or ())]
+    rules += [f"!/{_escape_sparse_path(path)}" for path in excluded_paths or ()]
+    return rules
+
+
+def _rebase_sparse_pattern(pattern: str, subpath: str) -> str | None:
+    """Return a rule matching the paths under ``subpath`` that an include pattern matches.
+
+    Patterns without a slash match at any depth and are anchored below the subpath. The leading components of other
+    patterns are matched against those of the subpath and replaced by them, so that wildcards cannot select sibling
+    directories. A pattern matching the subpath or one of its parents selects the whole subpath; so does one whose
+    ``**`` spans the subpath, which the ingestion then filters.
+
+    Parameters
+    ----------
+    pattern : str
+        The include pattern, relative to the root of the repository.
+    subpath : str
+        The subpath, relative to the root of the repository and without leading or trailing slashes.
+
+    Returns
+    -------
+    str | None
+        The rule, or ``None`` if the pattern matches nothing under the subpath.
+
+    """
+    root = "/" + "/".join(_escape_sparse_path(part) for part in subpath.split("/"))
+    body = pattern.rstrip("/")
+    suffix = pattern[len(body) :]
+    if "/" not in body:
+        if any(fnmatch.fnmatchcase(part, body) for part in subpath.split("/")):
+            return root
+        return f"{root}/**/{pattern}"
+
+    components = body.lstrip("/").split("/")
+    parts = subpath.split("/")
+    for component, part in zip(components, parts):
+        if component == "**":
+            return root
+        if not fnmatch.fnmatchcase(part, component):
+            return None
+    if len(components) <= len(parts):
+        return root
+    return f"{root}/{'/'.join(components[len(parts) :])}{suffix}"
+
+
+def rebase_submodule_patterns(patterns: set[str] | None, path: str) -> set[str] | None:
+    """Return the patterns of a parent repository that apply inside its submodule at ``path``, relative to the latter.
+
+    Patterns without a slash match at any depth and are kept, unless they match a directory of ``path``. The leading
+    components of other patterns are matched against those of ``path`` and removed, and the patterns matching other
+    directories are dropped. Patterns matching ``path`` or one of its parents select the whole submodule; so do those
+    whose ``**`` spans ``path`` and has nothing after it, the others keeping what follows their ``**``.
+
+    Parameters
+    ----------
+    patterns : set[str] | None
+        The include or ignore patterns, relative to the root of the parent repository.
+    path : str
+        The path of the submodule in the parent repository.
+
+    Returns
+    -------
+    set[str] | None
+        The patterns relative to the root of the submodule, or ``None`` if ``patterns`` is ``None``.
+
+    """
+    if patterns is None:
+        return None
+    parts = path.strip("/").split("/")
+    rebased = {_rebase_submodule_pattern(pattern, parts) for pattern in patterns}
+    return {pattern for pattern in rebased if pattern is not None}
+
+
+def _rebase_submodule_pattern(pattern: str, parts: list[str]) -> str | None:
+    """Return ``pattern`` relative to the submodule whose path has the components ``parts``, or ``None``."""
+    body = pattern.rstrip("/")
+    suffix = pattern[len(body) :]
+    if "/" not in body:
+        return "/*" if any(fnmatch.fnmatchcase(part, body) for part in parts) else pattern
+
+    components = body.lstrip("/").split("/")
+    for i, (component, part) in enumerate(zip(components, parts)):
+        if component == "**":
+            rest = "/".join(components[i + 1 :])
+            return f"**/{rest}{suffix}" if rest else "/*"
+        if not fnmatch.fnmatchcase(part, component):
+            return None
+    if len(components) <= len(parts):
+        return "/*"
+    return f"/{'/'.join(components[len(parts) :])}{suffix}"
+
+
+def _escape_sparse_path(path: str) -> str:
+    """Escape the wildcard characters of a literal path so git matches it verbatim.
+
+    Parameters
+    ----------
+    path : str
+        The repository path to escape.
+
+    Returns
+    -------
+    str
+        The escaped path.
+
+    """
+    return re.sub(r"([*?\[\]\\!#])", r"\\\1", path)
+
+
 def create_git_auth_header(token: str, url: str = "https://github.com") -> str:
     """Create a Basic authentication header for GitHub git operations.
 
@@ -283,8 +663,24 @@ def create_git_auth_header(token: str, url: str = "https://github.com") -> str:
         msg = f"Invalid GitHub URL: {url!r}"
         raise ValueError(msg)
 
-    basic = base64.b64encode(f"x-oauth-basic:{token}".encode()).decode()
-    return f"http.https://{hostname}/.extraheader=Authorization: Basic {basic}"
+    return f"http.https://{hostname}/.extraheader=Authorization: Basic {_basic_auth_credentials(token)}"
+
+
+def _basic_auth_credentials(token: str) -> str:
+    """Return the Base64-encoded Basic authentication credentials for a GitHub token.
+
+    Parameters
+    ----------
+    token : str
+        GitHub personal access token (PAT) for accessing private repositories.
+
+    Returns
+    -------
+    str
+        The credentials to send after ``Authorization: Basic``.
+
+    """
+    return base64.b64encode(f"x-oauth-basic:{token}".encode()).decode()
 
 
 def validate_github_token(token: str) -> None:
@@ -13,7 +13,7 @@ if TYPE_CHECKING:
     from pathlib import Path
 
 
-def process_notebook(file: Path, *, include_output: bool = True) -> str:
+def process_notebook(file: Path, *, include_output: bool = True, content: str | None = None) -> str:
     """Process a Jupyter notebook file and return an executable Python script as a string.
 
     Parameters
@@ -22,6 +22,8 @@ def process_notebook(file: Path, *, include_output: bool = True) -> str:
         The path to the Jupyter notebook file.
     include_output : bool
         Whether to include cell outputs in the generated script (default: ``True``).
+    content : str | None
+        The JSON content of the notebook, if already in memory (default: ``None``, read from ``file``).
 
     Returns
     -------
@@ -35,8 +37,11 @@ def process_notebook(file: Path, *, include_output: bool = True) -> str:
 
     """
     try:
-        with file.open(encoding="utf-8") as f:
-            notebook: dict[str, Any] = json.load(f)
+        if content is None:
+            with file.open(encoding="utf-8") as f:
+                notebook: dict[str, Any] = json.load(f)
+        else:
+            notebook = json.loads(content)
     except json.JSONDecodeError as exc:
         msg = f"Invalid JSON in notebook: {file}"
         raise InvalidNotebookError(msg) from exc
@@ -1,5 +1,7 @@
 """Utility functions for working with the operating system."""
 
+import os
+import stat
 from pathlib import Path
 
 
@@ -22,3 +24,41 @@ async def ensure_directory(path: Path) -> None:
     except OSError as exc:
         msg = f"Failed to create directory {path}: {exc}"
         raise OSError(msg) from exc
+
+
+def ensure_private_directory(path: Path) -> None:
+    """Ensure the directory exists and that no user but the current one can read or modify it.
+
+    The directory is created with mode ``0700``, or restricted to it if the current user owns it. Its parents must not
+    be writable by other users, except through the sticky bit (as ``/tmp`` is), so that the directory cannot be
+    replaced either. Caches keep their entries in such directories, since their keys can be computed by anyone.
+
+    Parameters
+    ----------
+    path : Path
+        The path to ensure exists.
+
+    Raises
+    ------
+    PermissionError
+        If the directory or one of its parents is owned, or can be modified, by another user.
+
+    """
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if os.name != "posix":  # Per-user application data directories are private on Windows
+        return
+
+    uid = os.getuid()
+    info = path.stat()
+    if info.st_uid != uid:
+        msg = f"Cache directory {path} is owned by another user"
+        raise PermissionError(msg)
+    if stat.S_IMODE(info.st_mode) & 0o077:
+        path.chmod(0o700)
+
+    for parent in path.resolve().parents:
+        info = parent.stat()
+        writable = info.st_mode & (stat.S_IWGRP | stat.S_IWOTH) and not info.st_mode & stat.S_ISVTX
+        if info.st_uid not in (uid, 0) or writable:
+            msg = f"Cache directory {path} is inside {parent}, which other users can modify"
+            raise PermissionError(msg)
@@ -0,0 +1,77 @@
+"""In-memory cache whose entries expire after a per-entry time-to-live."""
+
+from __future__ import annotations
+
+import time
+from typing import Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Bounded in-memory mapping whose entries expire ``ttl`` seconds after they were stored.
+
+    When full, storing a new key drops the expired entries, then the oldest ones.
+
+    Parameters
+    ----------
+    max_entries : int
+        The maximum number of entries kept (default: 1024).
+
+    """
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._entries: dict[K, tuple[float, V]] = {}
+
+    def get(self, key: K) -> V | None:
+        """Return the value stored under ``key``, or ``None`` if it is missing or has expired.
+
+        Parameters
+        ----------
+        key : K
+            The key to look up.
+
+        Returns
+        -------
+        V | None
+            The cached value, if still fresh.
+
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        return value
+
+    def set(self, key: K, value: V, ttl: float) -> None:
+        """Store ``value`` under ``key`` for ``ttl`` seconds.
+
+        Parameters
+        ----------
+        key : K
+            The key to store the value under.
+        value : V
+            The value to cache.
+        ttl : float
+            The number of seconds the value stays fresh.
+
+        """
+        self._entries.pop(key, None)
+        if len(self._entries) >= self.max_entries:
+            now = time.monotonic()
+            self._entries = {k: entry for k, entry in self._entries.items() if entry[0] > now}
+            while len(self._entries) >= self.max_entries:
+                del self._entries[next(iter(self._entries))]
+
+        self._entries[key] = (time.monotonic() + ttl, value)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        self._entries.clear()
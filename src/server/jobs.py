@@ -0,0 +1,235 @@
+"""Job table and background workers backing the asynchronous ingestion API."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+import uuid
+import weakref
+from dataclasses import dataclass, field
+
+from server.models import IngestErrorResponse, IngestRequest, IngestResponse, JobResponse, JobStage, JobStatus
+from server.query_processor import process_query
+from server.server_config import DELETE_REPO_AFTER, JOB_REQUEUE_DELAY, JOB_WORKERS, MAX_PENDING_JOBS
+from server.worker_pool import QueueFullError
+
+
+@dataclass
+class Job:
+    """An ingestion submitted through the job API.
+
+    Attributes
+    ----------
+    job_id : str
+        The identifier of the job.
+    request : IngestRequest
+        The ingestion parameters.
+    status : JobStatus
+        The current state of the job.
+    stage : JobStage | None
+        The step a running job has reached.
+    result : IngestResponse | None
+        The response of ``process_query`` once the job has finished.
+    created_at : float
+        When the job was submitted, as a Unix timestamp.
+    started_at : float | None
+        When the job started running, as a Unix timestamp.
+    finished_at : float | None
+        When the job completed or failed, as a Unix timestamp.
+    task : asyncio.Task[None] | None
+        The background task running the job.
+
+    """
+
+    job_id: str
+    request: IngestRequest
+    status: JobStatus = JobStatus.QUEUED
+    stage: JobStage | None = None
+    result: IngestResponse | None = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    task: asyncio.Task[None] | None = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        """Whether the job has completed or failed."""
+        return self.status in {JobStatus.COMPLETED, JobStatus.FAILED}
+
+    @property
+    def progress(self) -> float:
+        """The fraction of the steps of the ingestion the job has completed, from 0 to 1."""
+        if self.finished:
+            return 1.0
+        if self.stage is None:
+            return 0.0
+        steps = list(JobStage)
+        return steps.index(self.stage) / len(steps)
+
+    def advance(self, stage: JobStage) -> None:
+        """Record that the running job has reached ``stage``, unless it has already finished."""
+        if self.status == JobStatus.RUNNING:
+            self.stage = stage
+
+    def to_response(self) -> JobResponse:
+        """Describe the job for the status endpoint.
+
+        Returns
+        -------
+        JobResponse
+            The status of the job.
+
+        """
+        return JobResponse(
+            job_id=self.job_id,
+            status=self.status,
+            stage=self.stage,
+            progress=self.progress,
+            repo_url=self.request.input_text,
+            error=self.result.error if isinstance(self.result, IngestErrorResponse) else None,
+            created_at=self.created_at,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+        )
+
+
+class JobManager:
+    """In-memory job table whose jobs run in the background through ``process_query``.
+
+    At most ``workers`` jobs run at once and the others wait in submission order. A job the ingestion pool turns away
+    because it is busy with other requests goes back to the queue and is retried after ``JOB_REQUEUE_DELAY`` seconds.
+    Finished jobs are forgotten after ``ttl`` seconds, along with their result.
+
+    Parameters
+    ----------
+    workers : int
+        The number of jobs running at once (default: ``JOB_WORKERS``).
+    max_pending : int
+        The number of queued or running jobs above which submissions are rejected (default: ``MAX_PENDING_JOBS``).
+    ttl : float
+        The number of seconds a finished job is kept (default: ``DELETE_REPO_AFTER``).
+
+    """
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        max_pending: int = MAX_PENDING_JOBS,
+        ttl: float = DELETE_REPO_AFTER,
+    ) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._jobs: dict[str, Job] = {}
+        # Created in the loop the jobs run in, as ``job_manager`` is created at import, before any loop runs
+        self._semaphores: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def submit(self, request: IngestRequest) -> Job:
+        """Queue an ingestion and start it in the background.
+
+        Parameters
+        ----------
+        request : IngestRequest
+            The ingestion parameters.
+
+        Returns
+        -------
+        Job
+            The queued job.
+
+        Raises
+        ------
+        QueueFullError
+            If ``max_pending`` jobs are already queued or running.
+
+        """
+        self._purge_expired()
+        if sum(not job.finished for job in self._jobs.values()) >= self.max_pending:
+            msg = "Too many pending jobs, please retry later."
+            raise QueueFullError(msg)
+
+        job = Job(job_id=uuid.uuid4().hex, request=request)
+        job.task = asyncio.create_task(self._run(job))
+        self._jobs[job.job_id] = job
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        """Return the job with the given identifier, or ``None`` if it is unknown or has expired.
+
+        Parameters
+        ----------
+        job_id : str
+            The identifier of the job.
+
+        Returns
+        -------
+        Job | None
+            The job, if it is known.
+
+        """
+        self._purge_expired()
+        return self._jobs.get(job_id)
+
+    async def shutdown(self) -> None:
+        """Cancel the jobs that have not finished yet."""
+        tasks = [job.task for job in self._jobs.values() if job.task and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, job: Job) -> None:
+        """Run ``job`` once a worker is free and record its outcome, retrying while the ingestion pool is busy."""
+        while True:
+            if await self._attempt(job):
+                return
+            await asyncio.sleep(JOB_REQUEUE_DELAY)
+
+    async def _attempt(self, job: Job) -> bool:
+        """Run ``job`` once a worker is free and return ``False`` if the ingestion pool turned it away."""
+        async with self._semaphore():
+            job.status = JobStatus.RUNNING
+            job.started_at = time.time()
+            request = job.request
+            try:
+                job.result = await process_query(
+                    input_text=request.input_text,
+                    slider_position=request.max_file_size,
+                    pattern_type=request.pattern_type,
+                    pattern=request.pattern,
+                    token=request.token,
+                    remove_comments=request.remove_comments,
+                    comment_types=request.comment_types,
+                    progress=job.advance,
+                )
+            except QueueFullError:
+                job.status = JobStatus.QUEUED
+                job.stage = None
+                job.started_at = None
+                return False
+            except Exception as exc:  # every failure is reported through the job table
+                job.result = IngestErrorResponse(error=str(exc), repo_url=request.input_text)
+
+            job.finished_at = time.time()
+            job.status = JobStatus.FAILED if isinstance(job.result, IngestErrorResponse) else JobStatus.COMPLETED
+            job.stage = None
+            return True
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        """Return the semaphore bounding the jobs run from the running event loop to ``workers`` at once."""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.workers)
+        return semaphore
+
+    def _purge_expired(self) -> None:
+        """Forget the jobs that finished more than ``ttl`` seconds ago."""
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished_at and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+job_manager = JobManager()
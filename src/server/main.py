@@ -12,7 +12,7 @@ from fastapi.staticfiles import StaticFiles
 from slowapi.errors import RateLimitExceeded
 from starlette.middleware.trustedhost import TrustedHostMiddleware
 
-from server.routers import dynamic, index, ingest
+from server.routers import dynamic, index, ingest, jobs
 from server.server_utils import lifespan, limiter, rate_limit_exception_handler
 
 # Load environment variables from .env file
@@ -101,4 +101,5 @@ async def llm_txt() -> FileResponse:
 # Include routers for modular endpoints
 app.include_router(index)
 app.include_router(ingest)
+app.include_router(jobs)
 app.include_router(dynamic)
@@ -18,6 +18,31 @@ class PatternType(str, Enum):
     EXCLUDE = "exclude"
 
 
+class CacheStatus(str, Enum):
+    """Enumeration for the digest cache outcome of an ingestion."""
+
+    HIT = "hit"
+    MISS = "miss"
+    BYPASS = "bypass"
+
+
+class JobStatus(str, Enum):
+    """Enumeration for the lifecycle states of an ingestion job."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class JobStage(str, Enum):
+    """Enumeration for the steps of a running ingestion job, in the order they run."""
+
+    CLONING = "cloning"
+    INGESTING = "ingesting"
+    FORMATTING = "formatting"
+
+
 class IngestRequest(BaseModel):
     """Request model for the /api/ingest endpoint.
 
@@ -89,6 +114,9 @@ class IngestSuccessResponse(BaseModel):
         Whether comments were removed from processed files.
     comment_types : List[str]
         Types of comments that were removed.
+    cache_status : CacheStatus
+        Whether the digest was served from the digest cache (hit), computed and stored (miss), or computed without
+        the cache because the commit could not be resolved (bypass).
 
     """
 
@@ -102,6 +130,7 @@ class IngestSuccessResponse(BaseModel):
     pattern: str = Field(..., description="Pattern used")
     remove_comments: bool = Field(..., description="Whether comments were removed")
     comment_types: List[str] = Field(..., description="Types of comments that were removed")
+    cache_status: CacheStatus = Field(default=CacheStatus.BYPASS, description="Digest cache status")
 
 
 class IngestErrorResponse(BaseModel):
@@ -120,5 +149,42 @@ class IngestErrorResponse(BaseModel):
     repo_url: str = Field(..., description="Repository URL that failed")
 
 
+class JobResponse(BaseModel):
+    """Status response model for the /api/jobs endpoints.
+
+    Attributes
+    ----------
+    job_id : str
+        The identifier of the job, used to poll its status and fetch its result.
+    status : JobStatus
+        The current state of the job.
+    stage : JobStage | None
+        The step a running job has reached.
+    progress : float
+        The fraction of the steps the job has completed, from 0 to 1.
+    repo_url : str
+        The repository URL or slug the job ingests.
+    error : str | None
+        Error message of a failed job.
+    created_at : float
+        When the job was submitted, as a Unix timestamp.
+    started_at : float | None
+        When the job started running, as a Unix timestamp.
+    finished_at : float | None
+        When the job completed or failed, as a Unix timestamp.
+
+    """
+
+    job_id: str = Field(..., description="Job identifier")
+    status: JobStatus = Field(..., description="Current state of the job")
+    stage: JobStage | None = Field(default=None, description="Step a running job has reached")
+    progress: float = Field(default=0.0, ge=0.0, le=1.0, description="Fraction of the steps completed")
+    repo_url: str = Field(..., description="Repository URL or slug being ingested")
+    error: str | None = Field(default=None, description="Error message of a failed job")
+    created_at: float = Field(..., description="Submission time (Unix timestamp)")
+    started_at: float | None = Field(default=None, description="Start time (Unix timestamp)")
+    finished_at: float | None = Field(default=None, description="Completion time (Unix timestamp)")
+
+
 # Union type for API responses
 IngestResponse = Union[IngestSuccessResponse, IngestErrorResponse]
@@ -2,17 +2,39 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
+from functools import partial
 from pathlib import Path
-from typing import cast
+from typing import TYPE_CHECKING, cast
 
+from gitingest.archive import download_archive, read_archive_file
 from gitingest.clone import clone_repo
-from gitingest.ingestion import ingest_query
+from gitingest.ingestion import build_node
+from gitingest.output_formatter import write_node
 from gitingest.query_parser import IngestionQuery, parse_query
-from gitingest.utils.git_utils import validate_github_token
 from gitingest.utils.comment_removal import CommentType
-from server.models import IngestErrorResponse, IngestResponse, IngestSuccessResponse
+from gitingest.utils.digest_cache import digest_cache, digest_cache_key
+from gitingest.utils.git_utils import validate_github_token
+from gitingest.utils.os_utils import ensure_directory
+from server.models import CacheStatus, IngestErrorResponse, IngestResponse, IngestSuccessResponse, JobStage
 from server.server_config import MAX_DISPLAY_SIZE
 from server.server_utils import Colors, log_slider_to_size
+from server.single_flight import SingleFlight
+from server.worker_pool import QueueFullError, ingestion_pool, report_progress
+
+if TYPE_CHECKING:
+    from typing import Awaitable, Callable
+
+_in_flight_queries: SingleFlight[IngestResponse] = SingleFlight()
+_query_progress: dict[tuple, _QueryProgress] = {}
+
+_COMMENT_TYPES = {
+    "all": CommentType.ALL,
+    "single_line": CommentType.SINGLE_LINE,
+    "multi_line": CommentType.MULTI_LINE,
+    "documentation": CommentType.DOCUMENTATION,
+}
 
 
 async def process_query(
@@ -23,11 +45,15 @@ async def process_query(
     token: str | None = None,
     remove_comments: bool = False,
     comment_types: list[str] | None = None,
+    *,
+    progress: Callable[[JobStage], None] | None = None,
 ) -> IngestResponse:
     """Process a query by parsing input, cloning a repository, and generating a summary.
 
     Handle user input, process Git repository data, and prepare
     a response for rendering a template with the processed results or an error message.
+    Concurrent identical queries are coalesced: they await a single in-flight ingestion and share its response.
+    Each ingestion takes a slot in the bounded ingestion pool, which runs ``ingest_query`` in a worker process.
 
     Parameters
     ----------
@@ -45,6 +71,8 @@ async def process_query(
         Whether to remove comments from processed files.
     comment_types : list[str] | None
         List of comment types to remove.
+    progress : Callable[[JobStage], None] | None
+        Called with each step the ingestion reaches, including the steps an identical query in flight has reached.
 
     Returns
     -------
@@ -55,17 +83,92 @@ async def process_query(
     ------
     ValueError
         If an invalid pattern type is provided.
+    QueueFullError
+        If the ingestion pool cannot admit another request.
 
     """
-    if pattern_type == "include":
-        include_patterns = pattern
-        exclude_patterns = None
-    elif pattern_type == "exclude":
-        exclude_patterns = pattern
-        include_patterns = None
-    else:
-        msg = f"Invalid pattern type: {pattern_type}"
-        raise ValueError(msg)
+    key = (
+        input_text.strip(),
+        slider_position,
+        str(getattr(pattern_type, "value", pattern_type)),
+        pattern.strip(),
+        hashlib.sha256(token.encode()).hexdigest() if token else None,
+        remove_comments,
+        tuple(sorted(str(getattr(t, "value", t)) for t in comment_types or ["all"])),
+    )
+    query_progress = _query_progress.setdefault(key, _QueryProgress())
+    query_progress.add(progress)
+    try:
+        return await _in_flight_queries.do(
+            key,
+            lambda: _admit_and_process_query(
+                partial(
+                    _process_query,
+                    input_text=input_text,
+                    slider_position=slider_position,
+                    pattern_type=pattern_type,
+                    pattern=pattern,
+                    token=token,
+                    remove_comments=remove_comments,
+                    comment_types=comment_types,
+                    progress=query_progress.report,
+                ),
+            ),
+        )
+    finally:
+        if query_progress.remove(progress) and _query_progress.get(key) is query_progress:
+            del _query_progress[key]
+
+
+class _QueryProgress:
+    """The step reached by an in-flight query, relayed to the ``progress`` callbacks of every caller awaiting it."""
+
+    def __init__(self) -> None:
+        self.step: JobStage | None = None
+        self.waiters = 0
+        self._callbacks: list[Callable[[JobStage], None]] = []
+
+    def add(self, callback: Callable[[JobStage], None] | None) -> None:
+        """Count a new caller and, if it has a callback, tell it the step already reached."""
+        self.waiters += 1
+        if callback is not None:
+            self._callbacks.append(callback)
+            if self.step is not None:
+                callback(self.step)
+
+    def remove(self, callback: Callable[[JobStage], None] | None) -> bool:
+        """Forget a caller and return ``True`` if it was the last one."""
+        self.waiters -= 1
+        if callback is not None:
+            self._callbacks.remove(callback)
+        return self.waiters == 0
+
+    def report(self, step: JobStage) -> None:
+        """Record that the query has reached ``step`` and tell every caller."""
+        self.step = step
+        for callback in list(self._callbacks):
+            callback(step)
+
+
+async def _admit_and_process_query(process: Callable[[], Awaitable[IngestResponse]]) -> IngestResponse:
+    """Run ``process`` once the ingestion pool has admitted the request."""
+    async with ingestion_pool.admit():
+        return await process()
+
+
+async def _process_query(
+    *,
+    input_text: str,
+    slider_position: int,
+    pattern_type: str,
+    pattern: str,
+    token: str | None,
+    remove_comments: bool,
+    comment_types: list[str] | None,
+    progress: Callable[[JobStage], None],
+) -> IngestResponse:
+    """Run a single ingestion for ``process_query``, whose parameters it takes."""
+    include_patterns, exclude_patterns = _split_pattern(pattern_type, pattern)
 
     if token:
         validate_github_token(token)
@@ -85,37 +188,19 @@ async def process_query(
             token=token,
         )
         query.ensure_url()
-        
+
         # Set comment removal options
         query.remove_comments = remove_comments
-        
         if comment_types:
-            comment_type_enums = set()
-            for comment_type in comment_types:
-                if comment_type == "all":
-                    comment_type_enums.add(CommentType.ALL)
-                elif comment_type == "single_line":
-                    comment_type_enums.add(CommentType.SINGLE_LINE)
-                elif comment_type == "multi_line":
-                    comment_type_enums.add(CommentType.MULTI_LINE)
-                elif comment_type == "documentation":
-                    comment_type_enums.add(CommentType.DOCUMENTATION)
-            
-            query.comment_types = comment_type_enums
+            query.comment_types = {_COMMENT_TYPES[t] for t in comment_types if t in _COMMENT_TYPES}
 
         # Sets the "<user>/<repo>" for the page title
         short_repo_url = f"{query.user_name}/{query.repo_name}"
 
-        clone_config = query.extract_clone_config()
-        await clone_repo(clone_config, token=token)
-
-        summary, tree, content = ingest_query(query)
-
-        local_txt_file = Path(clone_config.local_path).with_suffix(".txt")
-
-        with local_txt_file.open("w", encoding="utf-8") as f:
-            f.write(tree + "\n" + content)
+        summary, tree, content, cache_status = await _build_digest(query, token, progress)
 
+    except QueueFullError:
+        raise
     except Exception as exc:
         if query and query.url:
             _print_error(query.url, exc, max_file_size, pattern_type, pattern)
@@ -125,12 +210,6 @@ async def process_query(
 
         return IngestErrorResponse(error=str(exc), repo_url=short_repo_url)
 
-    if len(content) > MAX_DISPLAY_SIZE:
-        content = (
-            f"(Files content cropped to {int(MAX_DISPLAY_SIZE / 1_000)}k characters, "
-            "download full ingest to see more)\n" + content[:MAX_DISPLAY_SIZE]
-        )
-
     query.ensure_url()
     query.url = cast("str", query.url)
 
@@ -153,6 +232,157 @@ async def process_query(
         pattern=pattern,
         remove_comments=remove_comments,
         comment_types=comment_types or ["all"],
+        cache_status=cache_status,
+    )
+
+
+def _split_pattern(pattern_type: str, pattern: str) -> tuple[str | None, str | None]:
+    """Return the include and exclude patterns of a query from its pattern type.
+
+    Raises
+    ------
+    ValueError
+        If an invalid pattern type is provided.
+
+    """
+    if pattern_type == "include":
+        return pattern, None
+    if pattern_type == "exclude":
+        return None, pattern
+    msg = f"Invalid pattern type: {pattern_type}"
+    raise ValueError(msg)
+
+
+async def _build_digest(
+    query: IngestionQuery,
+    token: str | None,
+    progress: Callable[[JobStage], None],
+) -> tuple[str, str, str, CacheStatus]:
+    """Serve the digest of ``query`` from the digest cache, or build it from an archive or a clone.
+
+    Parameters
+    ----------
+    query : IngestionQuery
+        The parsed query of a remote repository.
+    token : str | None
+        GitHub personal access token (PAT) for accessing private repositories.
+    progress : Callable[[JobStage], None]
+        Called with each step the ingestion reaches.
+
+    Returns
+    -------
+    tuple[str, str, str, CacheStatus]
+        The summary, tree and content cropped for display, and whether the digest cache was hit.
+
+    """
+    loop = asyncio.get_running_loop()
+
+    # Identical requests for an already-ingested commit are served from the digest cache
+    cache_key = await digest_cache_key(query, token=token)
+    clone_config = query.extract_clone_config()  # At the commit the key was resolved to
+    local_txt_file = Path(clone_config.local_path).with_suffix(".txt")
+
+    if cache_key:
+        await ensure_directory(local_txt_file.parent)
+        cached = await loop.run_in_executor(None, _write_cached_digest, local_txt_file, cache_key)
+        if cached:
+            return (*cached, CacheStatus.HIT)
+
+    # The worker writes the digest and returns it cropped, so that the full content never reaches this process
+    cache_status = CacheStatus.MISS if cache_key else CacheStatus.BYPASS
+    await ensure_directory(local_txt_file.parent)
+    progress(JobStage.CLONING)
+    digest = None
+    # The archive is read in the worker, so that the tree and its content are never sent to it
+    archive = local_txt_file.with_suffix(".tar.gz")
+    if await download_archive(query, archive, token=token):
+        try:
+            progress(JobStage.INGESTING)
+            digest = await ingestion_pool.run(
+                _write_built_digest,
+                local_txt_file,
+                cache_key,
+                query,
+                archive,
+                progress=progress,
+            )
+        finally:
+            await loop.run_in_executor(None, partial(archive.unlink, missing_ok=True))
+    if digest is None:
+        progress(JobStage.CLONING)
+        clone_config.use_cache = True
+        await clone_repo(clone_config, token=token)
+        progress(JobStage.INGESTING)
+        digest = await ingestion_pool.run(_write_built_digest, local_txt_file, cache_key, query, progress=progress)
+    return (*digest, cache_status)
+
+
+def _write_built_digest(
+    path: Path,
+    cache_key: str | None,
+    query: IngestionQuery,
+    archive: Path | None = None,
+) -> tuple[str, str, str] | None:
+    """Build the digest of ``query``, write it to ``path`` and store it in the digest cache.
+
+    Run in a worker process. The sections are written to ``path`` as they are produced (see ``write_node``), and the
+    content displayed is read back from it, so that neither the worker nor the server holds the full content.
+
+    Parameters
+    ----------
+    path : Path
+        The path of the ``.txt`` file served for download.
+    cache_key : str | None
+        The digest cache key of the query, or ``None`` if the cache is bypassed.
+    query : IngestionQuery
+        The parsed query.
+    archive : Path | None
+        The archive of the repository downloaded by ``download_archive``, or ``None`` to build the digest from the
+        clone at ``query.local_path``.
+
+    Returns
+    -------
+    tuple[str, str, str] | None
+        The summary, tree and content, cropped to ``MAX_DISPLAY_SIZE`` characters, or ``None`` if the archive cannot
+        be ingested and the repository should be cloned instead.
+
+    """
+    if archive is None:
+        root = build_node(query)
+    else:
+        try:
+            root = read_archive_file(archive, query)
+        except ValueError:
+            return None
+    report_progress(JobStage.FORMATTING)
+    summary, tree = write_node(root, query, path)
+    if cache_key:
+        digest_cache.put_file(cache_key, summary, tree, path)
+    return summary, tree, _read_cropped_content(path, tree)
+
+
+def _write_cached_digest(path: Path, cache_key: str) -> tuple[str, str, str] | None:
+    """Write the digest cached under ``cache_key`` to ``path`` and return it cropped, or ``None`` on a miss."""
+    cached = digest_cache.copy_to(cache_key, path)
+    if cached is None:
+        return None
+    summary, tree = cached
+    return summary, tree, _read_cropped_content(path, tree)
+
+
+def _read_cropped_content(path: Path, tree: str) -> str:
+    """Read the content of the digest written to ``path`` for display, cropped to ``MAX_DISPLAY_SIZE`` characters.
+
+    Only the tree and the displayed characters are read. Cropped content points to the download for the rest.
+    """
+    with path.open(encoding="utf-8", newline="") as f:
+        f.read(len(tree) + 1)
+        content = f.read(MAX_DISPLAY_SIZE + 1)
+    if len(content) <= MAX_DISPLAY_SIZE:
+        return content
+    return (
+        f"(Files content cropped to {int(MAX_DISPLAY_SIZE / 1_000)}k characters, "
+        "download full ingest to see more)\n" + content[:MAX_DISPLAY_SIZE]
     )
 
 
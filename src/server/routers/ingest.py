@@ -6,7 +6,9 @@ from fastapi.responses import JSONResponse
 from server.form_types import QueryForm
 from server.models import IngestErrorResponse, IngestRequest, IngestSuccessResponse, PatternType
 from server.query_processor import process_query
+from server.server_config import INGEST_RETRY_AFTER
 from server.server_utils import limiter
+from server.worker_pool import QueueFullError
 
 router = APIRouter()
 
@@ -17,6 +19,7 @@ router = APIRouter()
         status.HTTP_200_OK: {"model": IngestSuccessResponse, "description": "Successful ingestion"},
         status.HTTP_400_BAD_REQUEST: {"model": IngestErrorResponse, "description": "Bad request or processing error"},
         status.HTTP_500_INTERNAL_SERVER_ERROR: {"model": IngestErrorResponse, "description": "Internal server error"},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"model": IngestErrorResponse, "description": "Ingestion queue is full"},
     },
 )
 @limiter.limit("10/minute")
@@ -40,6 +43,7 @@ async def api_ingest(
     -------
     JSONResponse
         Success response with ingestion results or error response with appropriate HTTP status code
+        (503 with a ``Retry-After`` header when the ingestion queue is full)
 
     """
     repo_url = form_data.get("input_text", "Unknown")
@@ -78,6 +82,15 @@ async def api_ingest(
             content=result.model_dump(),
         )
 
+    except QueueFullError as exc:
+        # Shed load early, the client should come back once the backlog has drained
+        error_response = IngestErrorResponse(error=str(exc), repo_url=repo_url)
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content=error_response.model_dump(),
+            headers={"Retry-After": str(INGEST_RETRY_AFTER)},
+        )
+
     except ValueError as ve:
         # Handle validation errors with 400 status code
         error_response = IngestErrorResponse(
@@ -0,0 +1,120 @@
+"""Asynchronous ingestion job endpoints for the API."""
+
+from fastapi import APIRouter, Request, status
+from fastapi.responses import JSONResponse
+
+from server.jobs import job_manager
+from server.models import IngestErrorResponse, IngestRequest, IngestSuccessResponse, JobResponse
+from server.server_config import INGEST_RETRY_AFTER
+from server.server_utils import limiter
+from server.worker_pool import QueueFullError
+
+router = APIRouter()
+
+
+@router.post(
+    "/api/jobs",
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={
+        status.HTTP_202_ACCEPTED: {"model": JobResponse, "description": "Job queued"},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"model": IngestErrorResponse, "description": "Too many pending jobs"},
+    },
+)
+@limiter.limit("10/minute")
+async def create_job(request: Request, ingest_request: IngestRequest) -> JSONResponse:  # noqa: ARG001 (unused-function-argument) needed by the limiter
+    """Queue the ingestion of a Git repository and return immediately.
+
+    The job runs in the background; poll ``GET /api/jobs/{job_id}`` for its status and fetch the digest from
+    ``GET /api/jobs/{job_id}/result`` once it has completed.
+
+    Parameters
+    ----------
+    request : Request
+        FastAPI request object
+    ingest_request : IngestRequest
+        The ingestion parameters, as for ``/api/ingest``
+
+    Returns
+    -------
+    JSONResponse
+        The status of the queued job, or an error response with a ``Retry-After`` header if too many jobs are pending
+
+    """
+    try:
+        job = job_manager.submit(ingest_request)
+    except QueueFullError as exc:
+        error_response = IngestErrorResponse(error=str(exc), repo_url=ingest_request.input_text)
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content=error_response.model_dump(),
+            headers={"Retry-After": str(INGEST_RETRY_AFTER)},
+        )
+
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=job.to_response().model_dump(),
+        headers={"Location": f"/api/jobs/{job.job_id}"},
+    )
+
+
+@router.get(
+    "/api/jobs/{job_id}",
+    responses={
+        status.HTTP_200_OK: {"model": JobResponse, "description": "Job status"},
+        status.HTTP_404_NOT_FOUND: {"description": "Unknown or expired job"},
+    },
+)
+async def get_job(job_id: str) -> JSONResponse:
+    """Return the status of an ingestion job.
+
+    Parameters
+    ----------
+    job_id : str
+        The identifier returned by ``POST /api/jobs``
+
+    Returns
+    -------
+    JSONResponse
+        The status of the job, or ``404`` if the job is unknown or has expired
+
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Job not found"})
+
+    return JSONResponse(status_code=status.HTTP_200_OK, content=job.to_response().model_dump())
+
+
+@router.get(
+    "/api/jobs/{job_id}/result",
+    responses={
+        status.HTTP_200_OK: {"model": IngestSuccessResponse, "description": "Successful ingestion"},
+        status.HTTP_400_BAD_REQUEST: {"model": IngestErrorResponse, "description": "The ingestion failed"},
+        status.HTTP_404_NOT_FOUND: {"description": "Unknown or expired job"},
+        status.HTTP_409_CONFLICT: {"model": JobResponse, "description": "The job has not finished yet"},
+    },
+)
+async def get_job_result(job_id: str) -> JSONResponse:
+    """Return the result of a finished ingestion job.
+
+    Parameters
+    ----------
+    job_id : str
+        The identifier returned by ``POST /api/jobs``
+
+    Returns
+    -------
+    JSONResponse
+        The ingestion results, the error of a failed job, ``404`` if the job is unknown or has expired, or ``409``
+        with the job status if it has not finished yet
+
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Job not found"})
+
+    if not job.finished or job.result is None:
+        return JSONResponse(status_code=status.HTTP_409_CONFLICT, content=job.to_response().model_dump())
+
+    status_code = status.HTTP_400_BAD_REQUEST if isinstance(job.result, IngestErrorResponse) else status.HTTP_200_OK
+    return JSONResponse(status_code=status_code, content=job.result.model_dump())
@@ -2,11 +2,23 @@
 
 from __future__ import annotations
 
+import os
+
 from fastapi.templating import Jinja2Templates
 
 MAX_DISPLAY_SIZE: int = 300_000
 DELETE_REPO_AFTER: int = 60 * 60  # In seconds (1 hour)
 
+# Ingestion worker pool (ingestion is CPU- and disk-bound, so it runs outside the event loop)
+INGEST_WORKERS: int = int(os.getenv("GITINGEST_INGEST_WORKERS", str(min(4, os.cpu_count() or 1))))
+INGEST_QUEUE_SIZE: int = int(os.getenv("GITINGEST_INGEST_QUEUE_SIZE", "16"))  # Admitted requests beyond the workers
+INGEST_RETRY_AFTER: int = 30  # In seconds, advertised to clients turned away by a full queue
+
+# Asynchronous ingestion jobs (finished jobs are forgotten with their repositories, after DELETE_REPO_AFTER)
+JOB_WORKERS: int = INGEST_WORKERS  # Jobs running at once, the others wait in submission order
+MAX_PENDING_JOBS: int = int(os.getenv("GITINGEST_MAX_PENDING_JOBS", "100"))  # Queued or running jobs
+JOB_REQUEUE_DELAY: int = 5  # In seconds, before retrying a job turned away by a full ingestion queue
+
 # Slider configuration (if updated, update the logSliderToSize function in src/static/js/utils.js)
 MAX_FILE_SIZE_KB: int = 100 * 1024  # 100 MB
 MAX_SLIDER_POSITION: int = 500  # Maximum slider position
@@ -15,7 +15,9 @@ from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
 
 from gitingest.config import TMP_BASE_PATH
+from gitingest.utils.git_utils import close_http_client
 from server.server_config import DELETE_REPO_AFTER, MAX_FILE_SIZE_KB, MAX_SLIDER_POSITION
+from server.worker_pool import ingestion_pool
 
 # Initialize a rate limiter
 limiter = Limiter(key_func=get_remote_address)
@@ -59,6 +61,9 @@ async def lifespan(_: FastAPI) -> AsyncGenerator[None, None]:
         Yields control back to the FastAPI application while the background task runs.
 
     """
+    # Imported here because the job manager depends on this module, through the query processor
+    from server.jobs import job_manager  # noqa: PLC0415 (import-outside-top-level)
+
     task = asyncio.create_task(_remove_old_repositories())
 
     yield  # app runs while the background task is alive
@@ -67,6 +72,10 @@ async def lifespan(_: FastAPI) -> AsyncGenerator[None, None]:
     with suppress(asyncio.CancelledError):
         await task  # swallow the cancellation signal
 
+    await job_manager.shutdown()
+    ingestion_pool.shutdown()
+    await close_http_client()
+
 
 async def _remove_old_repositories(
     base_path: Path = TMP_BASE_PATH,
@@ -0,0 +1,69 @@
+"""Coalescing of concurrent identical requests into a single in-flight task."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """Run at most one task per key and share its result with every concurrent caller.
+
+    The first caller for a key starts the task; callers arriving while it runs await the same task. A caller that is
+    cancelled (e.g. because its client disconnected) stops waiting without affecting the others, and the task itself
+    is only cancelled when its last waiter goes away.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, _Call[T]] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Return the result of ``func()``, sharing a single execution among concurrent callers with the same key.
+
+        Parameters
+        ----------
+        key : Hashable
+            The key identifying identical requests.
+        func : Callable[[], Awaitable[T]]
+            The coroutine function to run if no task is in flight for ``key``.
+
+        Returns
+        -------
+        T
+            The result of the shared task.
+
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # The last waiter is gone: nobody needs the result anymore
+                self._forget(key, call)
+                call.task.cancel()
+
+    def in_flight(self) -> int:
+        """Return the number of tasks currently in flight."""
+        return len(self._calls)
+
+    def _forget(self, key: Hashable, call: _Call[T]) -> None:
+        """Stop sharing ``call`` so that later callers start a new task."""
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+class _Call(Generic[T]):
+    """A task in flight and the number of callers awaiting it."""
+
+    def __init__(self, task: asyncio.Future[T]) -> None:
+        self.task = task
+        self.waiters = 0
@@ -0,0 +1,223 @@
+"""Bounded process pool running ingestions outside of the event loop."""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import multiprocessing
+import queue
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager, suppress
+from typing import Any, AsyncGenerator, Callable, TypeVar
+
+from server.server_config import INGEST_QUEUE_SIZE, INGEST_WORKERS
+
+T = TypeVar("T")
+
+_PROGRESS_POLL_INTERVAL = 0.5  # In seconds, how often the progress reader checks that its pool is still running
+
+# Set in the worker processes: the queue progress is reported through, and the job running in the process
+_progress_queue: multiprocessing.Queue | None = None
+_current_job: int | None = None
+
+
+class QueueFullError(Exception):
+    """Exception raised when the ingestion pool cannot admit another request."""
+
+
+class IngestionPool:
+    """Process pool with an admission queue for CPU- and disk-bound ingestion work.
+
+    At most ``workers`` jobs run at once, and at most ``queue_size`` more wait for a worker. Requests beyond that are
+    turned away with ``QueueFullError`` instead of piling up.
+
+    Workers are started from a fork server (or spawned where there is none) rather than forked from the server,
+    whose threads could hold locks at the time of the fork. A pool whose worker died, e.g. killed for using too much
+    memory, is replaced so that later jobs still run.
+
+    Jobs report the steps they reach with ``report_progress``, which is relayed to the ``progress`` callback they were
+    run with.
+
+    Parameters
+    ----------
+    workers : int
+        The number of worker processes (default: ``INGEST_WORKERS``).
+    queue_size : int
+        The number of admitted requests allowed to wait for a worker (default: ``INGEST_QUEUE_SIZE``).
+
+    """
+
+    def __init__(self, workers: int = INGEST_WORKERS, queue_size: int = INGEST_QUEUE_SIZE) -> None:
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self._admitted = 0
+        self._executor: ProcessPoolExecutor | None = None
+        self._progress_stopped: threading.Event | None = None
+        self._listeners: dict[int, tuple[asyncio.AbstractEventLoop, Callable[[Any], None]]] = {}
+        self._job_ids = itertools.count()
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncGenerator[None, None]:
+        """Reserve a slot for a request for as long as the context is active.
+
+        Raises
+        ------
+        QueueFullError
+            If every worker is busy and the queue is full.
+
+        """
+        if self._admitted >= self.capacity:
+            msg = "The server is busy, please retry later."
+            raise QueueFullError(msg)
+
+        self._admitted += 1
+        try:
+            yield
+        finally:
+            self._admitted -= 1
+
+    async def run(
+        self,
+        func: Callable[..., T],
+        *args: object,
+        progress: Callable[[Any], None] | None = None,
+    ) -> T:
+        """Run ``func(*args)`` in a worker process and return its result.
+
+        ``func`` and its arguments must be picklable, and ``func`` importable by the worker processes.
+
+        Parameters
+        ----------
+        func : Callable[..., T]
+            The function to run.
+        *args : object
+            The positional arguments of ``func``.
+        progress : Callable[[Any], None] | None
+            Called in the event loop with each step ``func`` reports through ``report_progress``. Steps reported just
+            before ``func`` returns may be delivered after this coroutine has returned, or not at all.
+
+        Returns
+        -------
+        T
+            The result of ``func(*args)``.
+
+        Raises
+        ------
+        BrokenProcessPool
+            If a worker process died while the job was pending or running.
+
+        """
+        if self._executor is None:
+            self._start()
+        executor = self._executor
+        loop = asyncio.get_running_loop()
+        job = next(self._job_ids)
+        if progress is not None:
+            self._listeners[job] = (loop, progress)
+        try:
+            return await loop.run_in_executor(executor, _run_job, job, func, *args)
+        except BrokenProcessPool:
+            # Every job of the pool fails with it: the first to notice replaces it for later jobs
+            if self._executor is executor:
+                self._stop(cancel_futures=False)
+            raise
+        finally:
+            self._listeners.pop(job, None)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes, cancelling the jobs that have not started yet."""
+        if self._executor is not None:
+            self._stop(cancel_futures=True)
+
+    def _start(self) -> None:
+        """Start the worker processes and the thread relaying the progress they report."""
+        context = _mp_context()
+        progress_queue = context.Queue()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(progress_queue,),
+        )
+        self._progress_stopped = threading.Event()
+        threading.Thread(
+            target=self._relay_progress,
+            args=(progress_queue, self._progress_stopped),
+            name="ingestion-progress",
+            daemon=True,
+        ).start()
+
+    def _stop(self, *, cancel_futures: bool) -> None:
+        """Stop the worker processes and the thread relaying their progress."""
+        executor, stopped = self._executor, self._progress_stopped
+        self._executor = self._progress_stopped = None
+        if stopped is not None:
+            stopped.set()
+        if executor is None:
+            return
+        if cancel_futures and sys.version_info >= (3, 9):
+            executor.shutdown(wait=False, cancel_futures=True)
+        else:  # ``cancel_futures`` is not supported before 3.9: pending jobs run before the workers stop
+            executor.shutdown(wait=False)
+
+    def _relay_progress(self, progress_queue: multiprocessing.Queue, stopped: threading.Event) -> None:
+        """Pass the steps reported by the workers to the callbacks of their jobs, until ``stopped`` is set.
+
+        The queue is polled rather than sent a sentinel, since a worker that died while writing to it may have left it
+        locked.
+        """
+        while not stopped.is_set():
+            try:
+                job, step = progress_queue.get(timeout=_PROGRESS_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            except (OSError, EOFError, ValueError):  # The queue was closed or a message was cut short
+                return
+            listener = self._listeners.get(job)
+            if listener is not None:
+                loop, callback = listener
+                with suppress(RuntimeError):  # The event loop is closed
+                    loop.call_soon_threadsafe(callback, step)
+
+
+def report_progress(step: object) -> None:
+    """Report that the job running in this worker process has reached ``step``.
+
+    Does nothing outside of the worker processes of an ``IngestionPool``, so that jobs can also be run directly.
+
+    Parameters
+    ----------
+    step : object
+        The step reached, which must be picklable.
+
+    """
+    if _progress_queue is not None and _current_job is not None:
+        _progress_queue.put((_current_job, step))
+
+
+def _init_worker(progress_queue: multiprocessing.Queue) -> None:
+    """Keep the queue progress is reported through, in a new worker process."""
+    global _progress_queue  # noqa: PLW0603 (global-statement) set once per worker process
+    _progress_queue = progress_queue
+
+
+def _run_job(job: int, func: Callable[..., T], *args: object) -> T:
+    """Run ``func(*args)`` in a worker process, reporting its progress as that of ``job``."""
+    global _current_job  # noqa: PLW0603 (global-statement) a worker process runs one job at a time
+    _current_job = job
+    try:
+        return func(*args)
+    finally:
+        _current_job = None
+
+
+def _mp_context() -> multiprocessing.context.BaseContext:
+    """Return the context worker processes are started with: a fork server where available, else spawning."""
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+ingestion_pool = IngestionPool()
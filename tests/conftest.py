@@ -7,13 +7,17 @@ to write ``.ipynb`` notebooks for testing notebook utilities.
 from __future__ import annotations
 
 import json
+import subprocess
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Callable, Dict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Generator
 from unittest.mock import AsyncMock
 
 import pytest
 
 from gitingest.query_parser import IngestionQuery
+from gitingest.utils.content_cache import ContentCache
+from gitingest.utils.file_index import FileIndex
+from gitingest.utils.git_utils import remote_refs_cache, repo_exists_cache, run_command
 
 if TYPE_CHECKING:
     from pytest_mock import MockerFixture
@@ -23,6 +27,29 @@ WriteNotebookFunc = Callable[[str, Dict[str, Any]], Path]
 DEMO_URL = "https://github.com/user/repo"
 LOCAL_REPO_PATH = "/tmp/repo"
 
+# Commits made by the tests need an identity, and submodules are added from local repositories
+GIT_TEST_CONFIG = ["-c", "user.name=test", "-c", "user.email=test@example.com", "-c", "protocol.file.allow=always"]
+
+
+def run_git(repo: Path, *args: str, stdin: bytes | None = None, env: dict[str, str] | None = None) -> bytes:
+    """Run a git command in ``repo`` from a synchronous test, fixture or mock handler and return its raw output.
+
+    Async tests use ``git_async`` instead, which does not block the event loop.
+    """
+    command = ["git", "-C", str(repo), *GIT_TEST_CONFIG, *args]
+    return subprocess.run(command, input=stdin, env=env, capture_output=True, check=True).stdout  # noqa: S603
+
+
+def git(repo: Path, *args: str) -> str:
+    """Run a git command in ``repo`` from a synchronous test or fixture and return its output, stripped."""
+    return run_git(repo, *args).decode().strip()
+
+
+async def git_async(repo: Path, *args: str) -> str:
+    """Run a git command in ``repo`` from an async test with ``run_command`` and return its output, stripped."""
+    stdout, _ = await run_command("git", "-C", str(repo), *GIT_TEST_CONFIG, *args)
+    return stdout.decode().strip()
+
 
 @pytest.fixture
 def sample_query() -> IngestionQuery:
@@ -144,8 +171,9 @@ def stub_branches(mocker: MockerFixture) -> Callable[[list[str]], None]:
         mocker.patch(
             "gitingest.utils.git_utils.run_command",
             new_callable=AsyncMock,
-            return_value=("\n".join(f"refs/heads/{b}" for b in branches).encode() + b"\n", b""),
+            return_value=("\n".join(f"{'0' * 40}\trefs/heads/{b}" for b in branches).encode() + b"\n", b""),
         )
+        mocker.patch("gitingest.utils.git_utils._discover_refs_over_http", return_value=None)
         mocker.patch(
             "gitingest.utils.git_utils.fetch_remote_branches_or_tags",
             new_callable=AsyncMock,
@@ -155,6 +183,32 @@ def stub_branches(mocker: MockerFixture) -> Callable[[list[str]], None]:
     return _factory
 
 
+@pytest.fixture(autouse=True)
+def clear_remote_caches() -> Generator[None, None, None]:
+    """Start every test without remembered repository existence checks or ref maps."""
+    repo_exists_cache.clear()
+    remote_refs_cache.clear()
+    yield
+    repo_exists_cache.clear()
+    remote_refs_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def isolated_file_index(tmp_path_factory: pytest.TempPathFactory, mocker: MockerFixture) -> FileIndex:
+    """Index the files of local ingests in a per-test database instead of the shared one."""
+    index = FileIndex(path=tmp_path_factory.mktemp("file-index") / "files.sqlite3")
+    mocker.patch("gitingest.output_formatter.file_index", index)
+    return index
+
+
+@pytest.fixture(autouse=True)
+def isolated_content_cache(tmp_path_factory: pytest.TempPathFactory, mocker: MockerFixture) -> ContentCache:
+    """Cache processed file contents in a per-test database instead of the shared one."""
+    cache = ContentCache(path=tmp_path_factory.mktemp("content-cache") / "contents.sqlite3")
+    mocker.patch("gitingest.output_formatter.content_cache", cache)
+    return cache
+
+
 @pytest.fixture
 def repo_exists_true(mocker: MockerFixture) -> AsyncMock:
     """Patch ``gitingest.clone.check_repo_exists`` to always return ``True``."""
@@ -176,3 +230,47 @@ def run_command_mock(mocker: MockerFixture) -> AsyncMock:
     mock_exec.return_value = dummy_process
 
     return mock_exec
+
+
+@pytest.fixture
+def local_git_repo(tmp_path: Path) -> Path:
+    """Create a small committed Git repository that can be cloned over ``file://``.
+
+    The repository allows partial-clone filters and fetching unadvertised commits, like the major Git hosts.
+
+    The structure includes:
+    origin/
+    ├── README.md
+    ├── big.txt      (4 kB)
+    ├── src/
+    │   ├── main.py
+    │   └── data.json
+    └── docs/
+        └── guide.md
+
+    Parameters
+    ----------
+    tmp_path : Path
+        The temporary directory path provided by the ``tmp_path`` fixture.
+
+    Returns
+    -------
+    Path
+        The path to the created repository.
+
+    """
+    repo = tmp_path / "origin"
+    (repo / "src").mkdir(parents=True)
+    (repo / "docs").mkdir()
+    (repo / "README.md").write_text("# Origin\n")
+    (repo / "big.txt").write_text("x" * 4096)
+    (repo / "src" / "main.py").write_text("print('hello')\n")
+    (repo / "src" / "data.json").write_text('{"key": "value"}\n')
+    (repo / "docs" / "guide.md").write_text("Guide\n")
+
+    git(repo, "init", "-q", "-b", "main")
+    git(repo, "config", "uploadpack.allowFilter", "true")
+    git(repo, "config", "uploadpack.allowAnySHA1InWant", "true")
+    git(repo, "add", ".")
+    git(repo, "commit", "-q", "-m", "initial")
+    return repo
@@ -0,0 +1,262 @@
+"""Tests for the ``archive`` module.
+
+These tests ingest a local repository from the output of ``git archive``, served behind a mock transport the way a
+host serves tarballs, and compare the digest with the one of a clone of the same repository. They also ingest local
+zip and tar archives in place and compare the digest with the one of the directory they were made from.
+"""
+
+from __future__ import annotations
+
+import io
+import shutil
+import tarfile
+from typing import TYPE_CHECKING, Callable
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+
+from gitingest.archive import archive_url, download_archive, fetch_archive, read_archive, read_archive_file
+from gitingest.entrypoint import ingest_async
+from gitingest.ingestion import ingest_query
+from gitingest.output_formatter import format_node
+from gitingest.query_parser import IngestionQuery, parse_query
+from tests.conftest import git, git_async
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+REPO_URL = "https://github.com/user/repo"
+TOKEN = "ghp_" + "A" * 36
+
+
+def _archive_server(repo: Path, sha: str) -> Callable[[httpx.Request], httpx.Response]:
+    """Return a request handler serving the gzipped tarball of ``sha`` at the GitHub archive endpoint."""
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        if str(request.url) != f"https://codeload.github.com/user/repo/tar.gz/{sha}":
+            return httpx.Response(404)
+        archive = repo.parent / f"{sha}.tar.gz"
+        git(repo, "archive", "--format=tar.gz", f"--prefix=user-repo-{sha[:7]}/", "-o", str(archive), sha)
+        return httpx.Response(200, headers={"Content-Type": "application/x-gzip"}, content=archive.read_bytes())
+
+    return handle
+
+
+@pytest.fixture
+def archived_repo(local_git_repo: Path, mocker: MockerFixture) -> tuple[Path, AsyncMock]:
+    """Serve the archive of ``local_git_repo`` as ``REPO_URL`` and return a clone of it with the client mock."""
+    (local_git_repo / "src" / "link.py").symlink_to("main.py")
+    (local_git_repo / "docs" / "windows.txt").write_bytes(b"line 1\r\nline 2\r\n")
+    (local_git_repo / "docs" / "nested" / "deeper").mkdir(parents=True)
+    (local_git_repo / "docs" / "nested" / "deeper" / "notes.md").write_text("Notes\n")
+    git(local_git_repo, "add", ".")
+    git(local_git_repo, "commit", "-q", "-m", "more files")
+    sha = git(local_git_repo, "rev-parse", "HEAD")
+
+    clone = local_git_repo.parent / "clone" / "user-repo"
+    git(local_git_repo, "clone", "-q", str(local_git_repo), str(clone))
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(_archive_server(local_git_repo, sha)))
+    mocker.patch("gitingest.archive.get_http_client", return_value=client)
+    mocker.patch("gitingest.archive.check_repo_exists", new_callable=AsyncMock, return_value=True)
+    resolve_mock = mocker.patch("gitingest.archive.resolve_commit", new_callable=AsyncMock, return_value=sha)
+    return clone, resolve_mock
+
+
+def _query(local_path: Path, **kwargs: object) -> IngestionQuery:
+    return IngestionQuery(
+        user_name="user",
+        repo_name="repo",
+        url=REPO_URL,
+        local_path=local_path,
+        slug="user-repo",
+        id="id",
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"max_file_size": 1024},
+        {"include_patterns": {"*.py", "docs/nested/"}},
+        {"ignore_patterns": {".git", "*.json", "nested"}},
+        {"subpath": "/docs"},
+    ],
+)
+async def test_fetch_archive_matches_clone(archived_repo: tuple[Path, AsyncMock], options: dict) -> None:
+    """Test that a digest built from the archive is identical to the one built from a clone.
+
+    Given a repository served as an archive, and a clone of it:
+    When both are ingested with the same subpath, size limit and patterns,
+    Then the summary, tree and content should be identical.
+    """
+    clone, _ = archived_repo
+    options = {"ignore_patterns": {".git"}, **options}
+    query = _query(clone, **options)
+
+    root = await fetch_archive(query)
+
+    assert root is not None
+    assert format_node(root, query) == ingest_query(_query(clone, **options))
+
+
+@pytest.mark.asyncio
+async def test_fetch_archive_falls_back(archived_repo: tuple[Path, AsyncMock]) -> None:
+    """Test that revisions that cannot be read from an archive are left to the clone.
+
+    Given a missing archive, a missing subpath, an unsupported host and a submodule request:
+    When ``fetch_archive`` is called,
+    Then it should return ``None``.
+    """
+    clone, resolve_mock = archived_repo
+
+    assert await fetch_archive(_query(clone, subpath="/missing")) is None
+    assert await fetch_archive(_query(clone, include_submodules=True)) is None
+    assert await fetch_archive(_query(clone).model_copy(update={"url": "https://git.example.com/user/repo"})) is None
+
+    resolve_mock.return_value = "0" * 40  # Not served
+    assert await fetch_archive(_query(clone)) is None
+
+
+@pytest.mark.asyncio
+async def test_fetch_archive_checks_repository_access(
+    archived_repo: tuple[Path, AsyncMock],
+    mocker: MockerFixture,
+) -> None:
+    """Test that repositories the token cannot reach are left to the clone, even if their archive is served."""
+    clone, _ = archived_repo
+    mocker.patch("gitingest.archive.check_repo_exists", new_callable=AsyncMock, return_value=False)
+
+    assert await fetch_archive(_query(clone)) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("attribute", ["export-ignore", "export-subst"])
+async def test_fetch_archive_falls_back_on_export_attributes(
+    local_git_repo: Path,
+    mocker: MockerFixture,
+    attribute: str,
+) -> None:
+    """Test that repositories whose archives omit or rewrite files are left to the clone.
+
+    Given a repository whose ``.gitattributes`` declares an export attribute:
+    When its archive is fetched or downloaded and read,
+    Then both should give up and leave the repository to the clone.
+    """
+    (local_git_repo / "docs" / ".gitattributes").write_text(f"*.md {attribute}\n")
+    await git_async(local_git_repo, "add", ".")
+    await git_async(local_git_repo, "commit", "-q", "-m", "export attributes")
+    sha = await git_async(local_git_repo, "rev-parse", "HEAD")
+    client = httpx.AsyncClient(transport=httpx.MockTransport(_archive_server(local_git_repo, sha)))
+    mocker.patch("gitingest.archive.get_http_client", return_value=client)
+    mocker.patch("gitingest.archive.check_repo_exists", new_callable=AsyncMock, return_value=True)
+    mocker.patch("gitingest.archive.resolve_commit", new_callable=AsyncMock, return_value=sha)
+    query = _query(local_git_repo)
+    archive = local_git_repo.parent / "repo.tar.gz"
+
+    assert await fetch_archive(query) is None
+    assert await download_archive(query, archive)
+    with pytest.raises(ValueError, match="export attributes"):
+        read_archive_file(archive, query)
+
+
+@pytest.mark.asyncio
+async def test_downloaded_archive_matches_clone(archived_repo: tuple[Path, AsyncMock]) -> None:
+    """Test that an archive downloaded to disk gives the digest of a clone, and that failed downloads leave nothing."""
+    clone, resolve_mock = archived_repo
+    query = _query(clone, ignore_patterns={".git"})
+    archive = clone.parent / "repo.tar.gz"
+
+    assert await download_archive(query, archive)
+    root = read_archive_file(archive, query)
+
+    assert format_node(root, query) == ingest_query(_query(clone, ignore_patterns={".git"}))
+
+    archive.unlink()
+    resolve_mock.return_value = "0" * 40  # Not served
+    assert not await download_archive(query, archive)
+    assert not archive.exists()
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("archived_repo")
+async def test_ingest_async_reads_archive_without_cloning(mocker: MockerFixture) -> None:
+    """Test that ``ingest_async`` ingests a repository served as an archive without cloning it."""
+    mocker.patch("gitingest.entrypoint.digest_cache_key", new_callable=AsyncMock, return_value=None)
+    clone_mock = mocker.patch("gitingest.entrypoint.clone_repo", new_callable=AsyncMock)
+
+    _, tree, content = await ingest_async(REPO_URL)
+
+    clone_mock.assert_not_called()
+    assert "link.py -> main.py" in tree
+    assert "print('hello')" in content
+
+
+def test_archive_url() -> None:
+    """Test that archive endpoints are built for the known hosts, and through the API for private repositories."""
+    sha = "a" * 40
+
+    assert archive_url("https://gitlab.com/group/repo.git", sha) == (
+        f"https://gitlab.com/group/repo/-/archive/{sha}/repo-{sha}.tar.gz",
+        {},
+    )
+    assert archive_url("https://github.com/user/repo", sha, token=TOKEN) == (
+        f"https://api.github.com/repos/user/repo/tarball/{sha}",
+        {"Authorization": f"Bearer {TOKEN}"},
+    )
+    assert archive_url("https://codeberg.org/user/repo", sha, token=TOKEN) is None
+    assert archive_url("https://git.example.com/user/repo", sha) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("archive_format", ["zip", "gztar", "xztar"])
+async def test_ingest_local_archive_matches_directory(temp_directory: Path, archive_format: str) -> None:
+    """Test that a local archive is ingested like the directory it contains, without being extracted.
+
+    Given an archive of a directory:
+    When the archive and the directory are ingested with the same patterns,
+    Then the files analyzed, the tree below the root and the content should be identical.
+    """
+    if archive_format != "zip":  # ``make_archive`` only keeps symlinks in tar archives
+        (temp_directory / "src" / "link").symlink_to("subfile1.txt")
+    archive = shutil.make_archive(
+        str(temp_directory.parent / "release"),
+        archive_format,
+        root_dir=temp_directory.parent,
+        base_dir=temp_directory.name,
+    )
+    directory_query = await parse_query(str(temp_directory.parent), max_file_size=1024, from_web=False)
+    archive_query = await parse_query(archive, max_file_size=1024, from_web=False, ignore_patterns="*.py")
+    directory_query.ignore_patterns.update({"*.py", "release.*"})
+    files_before = sorted(temp_directory.parent.rglob("*"))
+
+    archive_summary, archive_tree, archive_content = ingest_query(archive_query)
+    summary, tree, content = ingest_query(directory_query)
+
+    assert archive_query.type == "archive"
+    assert archive_summary.splitlines()[1:] == summary.splitlines()[1:]
+    assert archive_tree.splitlines()[2:] == tree.splitlines()[2:]
+    assert archive_content == content
+    assert sorted(temp_directory.parent.rglob("*")) == files_before  # Nothing extracted
+
+
+def test_read_archive_skips_members_outside_root(tmp_path: Path) -> None:
+    """Test that members with absolute paths or ``..`` components are ignored, and ``./`` prefixes are dropped."""
+    archive = tmp_path / "unsafe.tar"
+    with tarfile.open(archive, "w") as tar:
+        for name in ("./ok.txt", "../escape.txt", "/absolute.txt", "dir/../../escape.txt"):
+            info = tarfile.TarInfo(name)
+            info.size = len(b"data")
+            tar.addfile(info, io.BytesIO(b"data"))
+
+    root = read_archive(
+        IngestionQuery(local_path=archive, slug="unsafe.tar", id="id", type="archive", ignore_patterns=set()),
+    )
+
+    assert [child.path_str for child in root.children] == ["ok.txt"]
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import io
 from inspect import signature
 from pathlib import Path
 
@@ -10,6 +11,7 @@ from click.testing import CliRunner, Result
 
 from gitingest.__main__ import main
 from gitingest.config import MAX_FILE_SIZE, OUTPUT_FILE_NAME
+from gitingest.utils import file_utils
 
 
 @pytest.mark.parametrize(
@@ -90,6 +92,18 @@ def test_cli_with_stdout_output() -> None:
             output_file.unlink()
 
 
+def test_digest_is_written_in_chunks(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that writing the contents in slices outputs the same digest as writing them at once."""
+    monkeypatch.setattr(file_utils, "_WRITE_CHUNK_SIZE", 7)
+    tree = "Directory structure:\n└── repo/\n"
+    content = "=" * 48 + "\nFILE: main.py\n" + "=" * 48 + "\nprint('héllo wörld')\n" * 5
+    output = io.StringIO()
+
+    file_utils.write_digest(output, tree, content)
+
+    assert output.getvalue() == f"{tree}\n{content}"
+
+
 def _invoke_isolated_cli_runner(args: list[str]) -> Result:
     """Return a ``CliRunner`` that keeps ``stderr`` separate on Click 8.0-8.1."""
     kwargs = {}
@@ -33,7 +33,7 @@ async def test_clone_with_commit(repo_exists_true: AsyncMock, run_command_mock:
     When ``clone_repo`` is called,
     Then the repository should be cloned and checked out at that commit.
     """
-    expected_call_count = 2
+    expected_call_count = 4
     clone_config = CloneConfig(
         url=DEMO_URL,
         local_path=LOCAL_REPO_PATH,
@@ -44,7 +44,7 @@ async def test_clone_with_commit(repo_exists_true: AsyncMock, run_command_mock:
     await clone_repo(clone_config)
 
     repo_exists_true.assert_called_once_with(clone_config.url, token=None)
-    assert run_command_mock.call_count == expected_call_count  # Clone and checkout calls
+    assert run_command_mock.call_count == expected_call_count  # Init, remote, fetch and checkout calls
 
 
 @pytest.mark.asyncio
@@ -179,15 +179,51 @@ async def test_clone_commit(run_command_mock: AsyncMock) -> None:
     When ``clone_repo`` is called,
     Then the repository should be cloned and checked out at that commit.
     """
-    expected_call_count = 2
+    expected_call_count = 4
     # Simulating a valid commit hash
     clone_config = CloneConfig(url=DEMO_URL, local_path=LOCAL_REPO_PATH, commit="a" * 40)
 
     await clone_repo(clone_config)
 
-    assert run_command_mock.call_count == expected_call_count  # Clone and checkout calls
-    run_command_mock.assert_any_call("git", "clone", "--single-branch", clone_config.url, clone_config.local_path)
-    run_command_mock.assert_any_call("git", "-C", clone_config.local_path, "checkout", clone_config.commit)
+    assert run_command_mock.call_count == expected_call_count  # Init, remote, fetch and checkout calls
+    run_command_mock.assert_any_call("git", "init", "--quiet", clone_config.local_path)
+    run_command_mock.assert_any_call(
+        "git",
+        "-C",
+        clone_config.local_path,
+        "fetch",
+        "--quiet",
+        "--depth=1",
+        "origin",
+        clone_config.commit,
+    )
+    run_command_mock.assert_any_call("git", "-C", clone_config.local_path, "checkout", "--quiet", clone_config.commit)
+
+
+@pytest.mark.asyncio
+async def test_clone_commit_falls_back_to_branch_history(run_command_mock: AsyncMock) -> None:
+    """Test cloning a commit from a host that refuses to serve unadvertised commits.
+
+    Given a host rejecting ``git fetch --depth=1 origin <sha>``:
+    When ``clone_repo`` is called with a commit hash,
+    Then the history of all branches should be fetched instead and the commit checked out.
+    """
+    clone_config = CloneConfig(url=DEMO_URL, local_path=LOCAL_REPO_PATH, commit="a" * 40)
+    run_command_mock.side_effect = [(b"", b""), (b"", b""), RuntimeError("not our ref"), (b"", b""), (b"", b"")]
+
+    await clone_repo(clone_config)
+
+    run_command_mock.assert_any_call(
+        "git",
+        "-C",
+        clone_config.local_path,
+        "fetch",
+        "--quiet",
+        "origin",
+        "+refs/heads/*:refs/remotes/origin/*",
+    )
+    checkout_call = ("git", "-C", clone_config.local_path, "checkout", "--quiet", clone_config.commit)
+    run_command_mock.assert_called_with(*checkout_call)
 
 
 @pytest.mark.asyncio
@@ -349,21 +385,23 @@ async def test_clone_with_commit_and_subpath(run_command_mock: AsyncMock) -> Non
     Then the repository should be cloned with sparse checkout enabled,
     checked out at the specific commit, and only include the specified subpath.
     """
-    expected_call_count = 3
+    expected_call_count = 5
     # Simulating a valid commit hash
     clone_config = CloneConfig(url=DEMO_URL, local_path=LOCAL_REPO_PATH, commit="a" * 40, subpath="src/docs")
 
     await clone_repo(clone_config)
 
-    # Verify the clone command includes sparse checkout flags
+    # Verify that only the commit is fetched, without its blobs
     run_command_mock.assert_any_call(
         "git",
-        "clone",
-        "--single-branch",
-        "--filter=blob:none",
-        "--sparse",
-        clone_config.url,
+        "-C",
         clone_config.local_path,
+        "fetch",
+        "--quiet",
+        "--depth=1",
+        "--filter=blob:none",
+        "origin",
+        clone_config.commit,
     )
 
     # Verify sparse-checkout set
@@ -382,6 +420,7 @@ async def test_clone_with_commit_and_subpath(run_command_mock: AsyncMock) -> Non
         "-C",
         clone_config.local_path,
         "checkout",
+        "--quiet",
         clone_config.commit,
     )
 
@@ -394,7 +433,7 @@ async def test_clone_with_include_submodules(run_command_mock: AsyncMock) -> Non
 
     Given a valid URL and ``include_submodules=True``:
     When ``clone_repo`` is called,
-    Then the repository should be cloned with ``--recurse-submodules`` in the git command.
+    Then the repository should be cloned with shallow submodules fetched in parallel.
     """
     expected_call_count = 1  # No commit and no partial clone
     clone_config = CloneConfig(url=DEMO_URL, local_path=LOCAL_REPO_PATH, branch="main", include_submodules=True)
@@ -407,7 +446,143 @@ async def test_clone_with_include_submodules(run_command_mock: AsyncMock) -> Non
         "clone",
         "--single-branch",
         "--recurse-submodules",
+        "--shallow-submodules",
+        "--jobs=4",
         "--depth=1",
         clone_config.url,
         clone_config.local_path,
-    )
\ No newline at end of file
+    )
+
+
+@pytest.mark.asyncio
+async def test_clone_with_size_limit_and_patterns(run_command_mock: AsyncMock) -> None:
+    """Test cloning a repository with a file size limit and ignore patterns.
+
+    Given a ``max_file_size`` and ``ignore_patterns``:
+    When ``clone_repo`` is called,
+    Then the clone should filter blobs by size, skip the checkout, and check out the sparse rules only.
+    """
+    clone_config = CloneConfig(
+        url=DEMO_URL,
+        local_path=LOCAL_REPO_PATH,
+        max_file_size=1000,
+        ignore_patterns={"*.log"},
+    )
+    run_command_mock.side_effect = [
+        (b"", b""),  # clone
+        (b"?" + b"b" * 40 + b"\n", b""),  # rev-list
+        (b"100644 blob " + b"a" * 40 + b"\tsmall.txt\x00100644 blob " + b"b" * 40 + b"\tbig.bin\x00", b""),  # ls-tree
+        (b"", b""),  # sparse-checkout
+        (b"", b""),  # checkout
+    ]
+
+    await clone_repo(clone_config)
+
+    run_command_mock.assert_any_call(
+        "git",
+        "clone",
+        "--single-branch",
+        "--no-checkout",
+        "--filter=blob:limit=1001",
+        "--depth=1",
+        clone_config.url,
+        clone_config.local_path,
+    )
+    run_command_mock.assert_any_call(
+        "git",
+        "-C",
+        clone_config.local_path,
+        "sparse-checkout",
+        "set",
+        "--no-cone",
+        "--",
+        "/*",
+        "!*.log",
+        "!/big.bin",
+    )
+    run_command_mock.assert_called_with("git", "-C", clone_config.local_path, "checkout")
+
+
+@pytest.mark.asyncio
+async def test_clone_filtered_local_repository(local_git_repo: Path, tmp_path: Path) -> None:
+    """Test a filtered clone of a real repository.
+
+    Given a repository with a file above ``max_file_size`` and files matching ``ignore_patterns``:
+    When ``clone_repo`` is called,
+    Then neither the oversized nor the ignored files should be checked out, and the oversized blob not fetched.
+    """
+    local_path = tmp_path / "clone"
+    clone_config = CloneConfig(
+        url=local_git_repo.as_uri(),
+        local_path=str(local_path),
+        max_file_size=1024,
+        ignore_patterns={"*.md"},
+    )
+
+    await clone_repo(clone_config)
+
+    checked_out = sorted(p.relative_to(local_path).as_posix() for p in local_path.rglob("*") if ".git" not in p.parts)
+    assert checked_out == ["src", "src/data.json", "src/main.py"]
+
+    loop = asyncio.get_running_loop()
+    objects = await loop.run_in_executor(
+        None,
+        subprocess.check_output,
+        ["git", "-C", str(local_path), "rev-list", "--objects", "--all", "--missing=print"],
+    )
+    missing = [line for line in objects.decode().splitlines() if line.startswith("?")]
+    assert len(missing) == 1  # Only the blob of ``big.txt`` was never transferred
+
+
+@pytest.mark.asyncio
+async def test_clone_commit_local_repository(local_git_repo: Path, tmp_path: Path) -> None:
+    """Test cloning an older commit of a real repository.
+
+    Given a repository whose ``main`` branch has moved past the requested commit:
+    When ``clone_repo`` is called with that commit and a subpath,
+    Then only the commit itself should be fetched, and the subpath checked out as of that commit.
+    """
+    git = ["git", "-C", str(local_git_repo), "-c", "user.name=test", "-c", "user.email=test@example.com"]
+    loop = asyncio.get_running_loop()
+    commit = (await loop.run_in_executor(None, subprocess.check_output, [*git, "rev-parse", "HEAD"])).decode().strip()
+    (local_git_repo / "src" / "main.py").write_text("print('changed')\n")
+    await loop.run_in_executor(None, subprocess.check_output, [*git, "commit", "-q", "-am", "change"])
+
+    local_path = tmp_path / "clone"
+    clone_config = CloneConfig(url=local_git_repo.as_uri(), local_path=str(local_path), commit=commit, subpath="src")
+    await clone_repo(clone_config)
+
+    assert (local_path / "src" / "main.py").read_text() == "print('hello')\n"
+    assert not (local_path / "docs").exists()
+    history = await loop.run_in_executor(
+        None,
+        subprocess.check_output,
+        ["git", "-C", str(local_path), "rev-list", "--all"],
+    )
+    assert history.decode().split() == [commit]
+
+
+@pytest.mark.asyncio
+async def test_clone_failure_removes_partial_directory(run_command_mock: AsyncMock, tmp_path: Path) -> None:
+    """Test that a failed clone does not leave its half-cloned directory behind.
+
+    Given a clone that fails after its directory was created:
+    When ``clone_repo`` is called,
+    Then the error should propagate and the directory should be removed.
+    """
+    local_path = tmp_path / "clone"
+    clone_config = CloneConfig(url=DEMO_URL, local_path=str(local_path), commit="a" * 40)
+
+    async def fail_after_init(*args: str) -> "tuple[bytes, bytes]":
+        if "init" in args:
+            (local_path / ".git").mkdir(parents=True)
+            return b"", b""
+        msg = "Command failed: git fetch"
+        raise RuntimeError(msg)
+
+    run_command_mock.side_effect = fail_after_init
+
+    with pytest.raises(RuntimeError, match="git fetch"):
+        await clone_repo(clone_config)
+
+    assert not local_path.exists()
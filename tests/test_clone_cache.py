@@ -0,0 +1,420 @@
+"""Tests for the ``clone_cache`` module.
+
+These tests cover checking out repositories from persistent bare mirrors, reusing mirrors across clones, URL
+normalisation, and least-recently-used eviction under the disk budget.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+import pytest
+
+from gitingest.clone import clone_repo
+from gitingest.schemas import CloneConfig
+from gitingest.utils import clone_cache as clone_cache_module
+from gitingest.utils.clone_cache import CloneCache, normalize_repo_url
+from gitingest.utils.git_utils import remote_refs_cache
+from tests.conftest import git_async
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+pytestmark = pytest.mark.usefixtures("repo_exists_true")
+
+
+@pytest.fixture
+def cache(tmp_path: Path, mocker: MockerFixture) -> CloneCache:
+    """Replace the process-wide clone cache with one rooted in a temporary directory."""
+    cache = CloneCache(root=tmp_path / "mirrors", max_size=1024 * 1024 * 1024)
+    mocker.patch("gitingest.clone.clone_cache", cache)
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_clone_from_cache_reuses_mirror(local_git_repo: Path, tmp_path: Path, cache: CloneCache) -> None:
+    """Test that successive cached clones of a repository share a single mirror.
+
+    Given two clones of the same repository with ``use_cache=True``:
+    When ``clone_repo`` is called,
+    Then both working copies should be checked out from one bare mirror without copying its objects.
+    """
+    url = local_git_repo.as_uri()
+
+    for name in ("first", "second"):
+        local_path = tmp_path / name
+        await clone_repo(CloneConfig(url=url, local_path=str(local_path), use_cache=True))
+
+        assert (local_path / "src" / "main.py").read_text() == "print('hello')\n"
+        alternates = (local_path / ".git" / "objects" / "info" / "alternates").read_text().strip()
+        assert alternates == str((cache.mirror_path(url) / "objects").resolve())
+
+    assert [p.name for p in cache.root.glob("*.git")] == [cache.mirror_path(url).name]
+
+
+@pytest.mark.asyncio
+async def test_clone_from_cache_with_filters(local_git_repo: Path, tmp_path: Path, cache: CloneCache) -> None:
+    """Test that a cached clone honours the subpath and patterns.
+
+    Given a cached clone of a subpath with ``ignore_patterns``:
+    When ``clone_repo`` is called,
+    Then only the files of the subpath that are not ignored should be checked out.
+    """
+    local_path = tmp_path / "clone"
+    clone_config = CloneConfig(
+        url=local_git_repo.as_uri(),
+        local_path=str(local_path),
+        subpath="/src",
+        ignore_patterns={"*.json"},
+        use_cache=True,
+    )
+
+    await clone_repo(clone_config)
+
+    checked_out = sorted(p.relative_to(local_path).as_posix() for p in local_path.rglob("*") if ".git" not in p.parts)
+    assert checked_out == ["src", "src/main.py"]
+    assert cache.mirror_path(clone_config.url).exists()
+
+
+@pytest.mark.asyncio
+async def test_size_limited_clone_skips_cache(local_git_repo: Path, tmp_path: Path, cache: CloneCache) -> None:
+    """Test that a clone with a size limit is fetched without the cache, so that large blobs are never transferred.
+
+    Given a clone with ``max_file_size`` and ``use_cache=True``:
+    When ``clone_repo`` is called,
+    Then no mirror should be created and the blob of the oversized file should be missing from the clone.
+    """
+    local_path = tmp_path / "clone"
+    url = local_git_repo.as_uri()
+
+    await clone_repo(CloneConfig(url=url, local_path=str(local_path), max_file_size=1024, use_cache=True))
+
+    assert (local_path / "README.md").exists()
+    assert not (local_path / "big.txt").exists()
+    assert not cache.mirror_path(url).exists()
+    missing = await git_async(local_path, "rev-list", "--objects", "--missing=print", "HEAD")
+    assert any(line.startswith("?") for line in missing.splitlines())
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(os.name != "posix", reason="Permissions are only checked on POSIX systems")
+async def test_clone_without_private_cache_directory(
+    local_git_repo: Path,
+    tmp_path: Path,
+    cache: CloneCache,
+) -> None:
+    """Test that a cached clone is fetched directly when the cache directory could be modified by other users.
+
+    Given a clone cache inside a directory other users can write to:
+    When ``clone_repo`` is called with ``use_cache=True``,
+    Then the repository should be cloned without a mirror instead of failing.
+    """
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+    cache.root = shared / "mirrors"
+    local_path = tmp_path / "clone"
+
+    await clone_repo(CloneConfig(url=local_git_repo.as_uri(), local_path=str(local_path), use_cache=True))
+
+    assert (local_path / "src" / "main.py").read_text() == "print('hello')\n"
+    assert not (local_path / ".git" / "objects" / "info" / "alternates").exists()
+    assert not cache.mirror_path(local_git_repo.as_uri()).exists()
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("cache")
+async def test_clone_from_cache_commit_skips_fetch(
+    local_git_repo: Path,
+    tmp_path: Path,
+    mocker: MockerFixture,
+) -> None:
+    """Test that a commit already present in the mirror is not fetched again.
+
+    Given a commit that has been cloned from the cache once:
+    When ``clone_repo`` is called again for the same commit,
+    Then no ``git fetch`` should be run.
+    """
+    commit = (local_git_repo / ".git" / "refs" / "heads" / "main").read_text().strip()
+    url = local_git_repo.as_uri()
+    await clone_repo(CloneConfig(url=url, local_path=str(tmp_path / "first"), commit=commit, use_cache=True))
+
+    spy = mocker.spy(clone_cache_module, "run_command")
+    await clone_repo(CloneConfig(url=url, local_path=str(tmp_path / "second"), commit=commit, use_cache=True))
+
+    assert not [call for call in spy.call_args_list if "fetch" in call.args]
+    assert (tmp_path / "second" / "README.md").exists()
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("cache")
+async def test_clone_from_cache_fetches_unresolved_tip(
+    local_git_repo: Path,
+    tmp_path: Path,
+    mocker: MockerFixture,
+) -> None:
+    """Test that a branch whose tip cannot be resolved without fetching is fetched instead of failing the clone."""
+    mocker.patch.object(clone_cache_module, "resolve_commit", side_effect=RuntimeError("ls-remote failed"))
+
+    await clone_repo(CloneConfig(url=local_git_repo.as_uri(), local_path=str(tmp_path / "clone"), use_cache=True))
+
+    assert (tmp_path / "clone" / "README.md").exists()
+
+
+@pytest.mark.asyncio
+async def test_clone_from_cache_with_submodules(
+    local_git_repo: Path,
+    tmp_path: Path,
+    cache: CloneCache,
+    mocker: MockerFixture,
+) -> None:
+    """Test that submodules are checked out from their own mirror, shared by every parent repository.
+
+    Given two repositories pinning the same submodule commit:
+    When both are cloned from the cache with ``include_submodules=True``,
+    Then both should get the submodule files, the submodule should be fetched only once, and ignore patterns
+    should apply inside it relative to the parent repository.
+    """
+    submodule = tmp_path / "submodule"
+    (submodule / "pkg").mkdir(parents=True)
+    (submodule / "pkg" / "lib.py").write_text("VALUE = 1\n")
+    (submodule / "NOTES.md").write_text("Notes\n")
+    await git_async(submodule, "init", "-q", "-b", "main")
+    await git_async(submodule, "add", ".")
+    await git_async(submodule, "commit", "-q", "-m", "initial")
+    await git_async(local_git_repo, "submodule", "-q", "add", submodule.as_uri(), "lib")
+    await git_async(local_git_repo, "commit", "-q", "-m", "add submodule")
+    fork = tmp_path / "fork"
+    await git_async(tmp_path, "clone", "-q", "--bare", str(local_git_repo), str(fork))
+
+    spy = mocker.spy(clone_cache_module, "run_command")
+    for parent in (local_git_repo, fork):
+        local_path = tmp_path / f"{parent.name}-clone"
+        clone_config = CloneConfig(
+            url=parent.as_uri(),
+            local_path=str(local_path),
+            ignore_patterns={"*.md", "/pkg"},  # Only ``lib/pkg`` exists, which ``/pkg`` does not match
+            include_submodules=True,
+            use_cache=True,
+        )
+        await clone_repo(clone_config)
+
+        assert (local_path / "lib" / "pkg" / "lib.py").read_text() == "VALUE = 1\n"
+        assert not (local_path / "lib" / "NOTES.md").exists()
+
+    assert len([call for call in spy.call_args_list if "fetch" in call.args and submodule.as_uri() in call.args]) == 1
+    assert cache.mirror_path(submodule.as_uri()).exists()
+
+    local_path = tmp_path / "included"
+    await clone_repo(
+        CloneConfig(
+            url=local_git_repo.as_uri(),
+            local_path=str(local_path),
+            include_patterns={"lib/pkg/", "/src/*.py"},
+            include_submodules=True,
+            use_cache=True,
+        ),
+    )
+    assert (local_path / "lib" / "pkg" / "lib.py").exists()
+    assert not (local_path / "lib" / "NOTES.md").exists()
+
+
+@pytest.mark.asyncio
+async def test_clone_from_cache_for_diff_owns_its_objects(
+    local_git_repo: Path,
+    tmp_path: Path,
+    cache: CloneCache,
+) -> None:
+    """Test that a working copy compared with another revision keeps working once its mirror is evicted."""
+    base = (local_git_repo / ".git" / "refs" / "heads" / "main").read_text().strip()
+    await _commit_file(local_git_repo, "CHANGELOG.md", "v2\n")
+    local_path = tmp_path / "clone"
+
+    await clone_repo(
+        CloneConfig(url=local_git_repo.as_uri(), local_path=str(local_path), diff_base=base, use_cache=True),
+    )
+    cache.max_size = 0
+    cache.evict()
+
+    assert not cache.mirror_path(local_git_repo.as_uri()).exists()
+    assert not (local_path / ".git" / "objects" / "info" / "alternates").exists()
+    assert (await git_async(local_path, "diff", "--name-only", base, "HEAD")).split() == ["CHANGELOG.md"]
+
+
+def test_evict_least_recently_used(tmp_path: Path) -> None:
+    """Test that eviction removes the least-recently-used mirrors first until the cache fits its budget."""
+    cache = CloneCache(root=tmp_path, max_size=250)
+    for age, name in enumerate(("newest", "middle", "oldest")):
+        mirror = tmp_path / f"{name}.git"
+        mirror.mkdir()
+        mirror.with_suffix(".size").write_text("100")
+        os.utime(mirror, (1_000_000 - age, 1_000_000 - age))
+
+    cache.evict()
+
+    assert sorted(p.name for p in tmp_path.glob("*.git")) == ["middle.git", "newest.git"]
+    assert not (tmp_path / "oldest.size").exists()
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://github.com/user/repo",
+        "https://GitHub.com/user/repo/",
+        "https://github.com/user/repo.git",
+    ],
+)
+def test_normalize_repo_url(url: str) -> None:
+    """Test that equivalent spellings of a repository URL share a cache key."""
+    assert normalize_repo_url(url) == "https://github.com/user/repo"
+
+
+async def _commit_file(repo: Path, name: str, content: str) -> None:
+    """Commit a file to the checked-out branch of ``repo``."""
+    (repo / name).write_text(content)
+    await git_async(repo, "add", name)
+    await git_async(repo, "commit", "-q", "-m", f"add {name}")
+
+
+async def _make_fork(upstream: Path, fork: Path) -> None:
+    """Clone ``upstream`` to ``fork`` and commit a file of its own on a new ``feature`` branch."""
+    await git_async(upstream, "clone", "-q", str(upstream), str(fork))
+    await git_async(fork, "checkout", "-q", "-b", "feature")
+    await _commit_file(fork, "fork.txt", "fork\n")
+
+
+async def _object_count(mirror: Path) -> int:
+    """Return the number of objects stored in ``mirror`` itself, excluding borrowed ones."""
+    counts = dict(line.split(": ") for line in (await git_async(mirror, "count-objects", "-v")).splitlines())
+    return int(counts["count"]) + int(counts["in-pack"])
+
+
+@pytest.mark.asyncio
+async def test_clone_fork_borrows_upstream_objects(local_git_repo: Path, tmp_path: Path, cache: CloneCache) -> None:
+    """Test that the mirror of a fork borrows the objects of the mirror of its upstream.
+
+    Given a cached upstream and a fork advertising a commit of the upstream mirror:
+    When the fork is cloned from the cache,
+    Then its mirror should borrow the upstream mirror's objects and only store the objects the fork adds.
+    """
+    await _commit_file(local_git_repo, "CHANGELOG.md", "v2\n")  # Makes the upstream mirror shallow
+    fork = tmp_path / "fork"
+    await _make_fork(local_git_repo, fork)
+    await clone_repo(
+        CloneConfig(url=local_git_repo.as_uri(), local_path=str(tmp_path / "upstream-clone"), use_cache=True),
+    )
+
+    local_path = tmp_path / "fork-clone"
+    await clone_repo(CloneConfig(url=fork.as_uri(), local_path=str(local_path), branch="feature", use_cache=True))
+
+    fork_mirror = cache.mirror_path(fork.as_uri())
+    alternates = (fork_mirror / "objects" / "info" / "alternates").read_text().strip()
+    assert alternates == str((cache.mirror_path(local_git_repo.as_uri()) / "objects").resolve())
+    expected_objects = 3  # The fork's commit, root tree and blob
+    assert await _object_count(fork_mirror) == expected_objects
+    assert (local_path / "fork.txt").read_text() == "fork\n"
+    assert (local_path / "src" / "main.py").read_text() == "print('hello')\n"
+
+
+@pytest.mark.asyncio
+async def test_clone_fork_seeds_configured_upstream(local_git_repo: Path, tmp_path: Path, cache: CloneCache) -> None:
+    """Test that a fork matching a configured upstream pattern first seeds the upstream mirror.
+
+    Given an upstream mapping for the fork and no mirror of the upstream yet:
+    When the fork is cloned from the cache,
+    Then the upstream mirror should be created and the fork mirror should borrow its objects.
+    """
+    fork = tmp_path / "fork"
+    await _make_fork(local_git_repo, fork)
+    await git_async(fork, "branch", "-q", "-D", "main")  # Diverged: nothing in common
+    cache.upstreams = {f"{tmp_path.as_uri()}/fo*": local_git_repo.as_uri()}
+
+    await clone_repo(CloneConfig(url=fork.as_uri(), local_path=str(tmp_path / "clone"), use_cache=True))
+
+    upstream_mirror = cache.mirror_path(local_git_repo.as_uri())
+    alternates = (cache.mirror_path(fork.as_uri()) / "objects" / "info" / "alternates").read_text().strip()
+    assert alternates == str((upstream_mirror / "objects").resolve())
+    assert (tmp_path / "clone" / "fork.txt").exists()
+
+
+@pytest.mark.asyncio
+async def test_clone_fork_does_not_serve_borrowed_commits(
+    local_git_repo: Path,
+    tmp_path: Path,
+    cache: CloneCache,
+) -> None:
+    """Test that the mirror of a fork only serves the commits of the fork, not those it could borrow.
+
+    Given a fork borrowing the objects of its upstream mirror, which holds a commit the fork does not have:
+    When that commit is cloned from the fork,
+    Then the clone should fail instead of checking out the upstream's commit.
+    """
+    fork = tmp_path / "fork"
+    await _make_fork(local_git_repo, fork)
+    await _commit_file(local_git_repo, "SECRET.md", "upstream only\n")
+    upstream_only = await git_async(local_git_repo, "rev-parse", "--verify", "HEAD")
+    cache.upstreams = {fork.as_uri(): local_git_repo.as_uri()}
+    await clone_repo(CloneConfig(url=local_git_repo.as_uri(), local_path=str(tmp_path / "upstream"), use_cache=True))
+    await clone_repo(CloneConfig(url=fork.as_uri(), local_path=str(tmp_path / "fork-main"), use_cache=True))
+    assert (cache.mirror_path(fork.as_uri()) / "objects" / "info" / "alternates").exists()
+
+    local_path = tmp_path / "fork-clone"
+    with pytest.raises(RuntimeError, match="not found"):
+        await clone_repo(
+            CloneConfig(url=fork.as_uri(), local_path=str(local_path), commit=upstream_only, use_cache=True),
+        )
+
+    assert not (local_path / "SECRET.md").exists()
+
+
+@pytest.mark.asyncio
+async def test_fetch_pins_superseded_tips(local_git_repo: Path, tmp_path: Path, cache: CloneCache) -> None:
+    """Test that a branch tip rewritten upstream stays reachable in the mirror, for the mirrors borrowing it.
+
+    Given a mirror of a branch whose history is then rewritten:
+    When the branch is cloned again,
+    Then the mirror should fetch the new tip and keep the superseded one under ``refs/gitingest/commits``.
+    """
+    await _commit_file(local_git_repo, "CHANGELOG.md", "v2\n")
+    superseded = await git_async(local_git_repo, "rev-parse", "--verify", "HEAD")
+    await clone_repo(CloneConfig(url=local_git_repo.as_uri(), local_path=str(tmp_path / "first"), use_cache=True))
+    await git_async(local_git_repo, "reset", "-q", "--hard", "HEAD~1")
+    await _commit_file(local_git_repo, "NEWS.md", "rewritten\n")
+    remote_refs_cache.clear()
+
+    await clone_repo(CloneConfig(url=local_git_repo.as_uri(), local_path=str(tmp_path / "second"), use_cache=True))
+
+    mirror = cache.mirror_path(local_git_repo.as_uri())
+    assert await git_async(mirror, "rev-parse", "--verify", "refs/gitingest/HEAD") != superseded
+    assert await git_async(mirror, "rev-parse", "--verify", f"refs/gitingest/commits/{superseded}") == superseded
+    assert (tmp_path / "second" / "NEWS.md").exists()
+
+
+@pytest.mark.asyncio
+async def test_evict_removes_borrowers_with_their_donor(
+    local_git_repo: Path,
+    tmp_path: Path,
+    cache: CloneCache,
+) -> None:
+    """Test that a mirror whose objects are borrowed is only evicted together with its borrowers.
+
+    Given an upstream mirror borrowed by a fork mirror, the upstream being least recently used:
+    When the cache is evicted down to the size of a single mirror,
+    Then both mirrors should be removed, since the fork mirror is incomplete without the upstream one.
+    """
+    fork = tmp_path / "fork"
+    await _make_fork(local_git_repo, fork)
+    await clone_repo(CloneConfig(url=local_git_repo.as_uri(), local_path=str(tmp_path / "a"), use_cache=True))
+    await clone_repo(CloneConfig(url=fork.as_uri(), local_path=str(tmp_path / "b"), branch="feature", use_cache=True))
+    upstream_mirror = cache.mirror_path(local_git_repo.as_uri())
+    fork_mirror = cache.mirror_path(fork.as_uri())
+    os.utime(upstream_mirror, (0, 0))
+
+    cache.max_size = int((fork_mirror.with_suffix(".size")).read_text())
+    cache.evict()
+
+    assert not upstream_mirror.exists()
+    assert not fork_mirror.exists()
@@ -0,0 +1,152 @@
+"""Tests for the ``content_cache`` module.
+
+These tests cover reusing the processed contents and token counts of files already ingested under other paths, keys
+covering the processing options, eviction of the least recently used entries and an unreadable database.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+from typing import TYPE_CHECKING
+
+import pytest
+
+from gitingest import output_formatter
+from gitingest.ingestion import ingest_query
+from gitingest.query_parser import IngestionQuery
+from gitingest.utils.content_cache import CachedContent, ContentCache, content_key
+
+if TYPE_CHECKING:
+    from pathlib import Path
+    from unittest.mock import MagicMock
+
+    from pytest_mock import MockerFixture
+
+
+def _query(local_path: Path, **kwargs: object) -> IngestionQuery:
+    return IngestionQuery(local_path=local_path, slug="test_repo", id="id", ignore_patterns=set(), **kwargs)
+
+
+@pytest.fixture
+def count_tokens(mocker: MockerFixture) -> MagicMock:
+    """Count one token per character, so that estimates do not depend on the tokenizer being available."""
+    return mocker.patch(
+        "gitingest.output_formatter._count_tokens",
+        side_effect=lambda texts: [len(text) for text in texts],
+    )
+
+
+def test_copies_are_processed_once(
+    temp_directory: Path,
+    tmp_path: Path,
+    isolated_content_cache: ContentCache,
+    count_tokens: MagicMock,
+    mocker: MockerFixture,
+) -> None:
+    """Test that files already ingested from another directory are neither processed nor tokenized again.
+
+    Given a directory ingested once:
+    When a copy of it is ingested,
+    Then only the headers of its files and its tree should be tokenized, and the digest should match one built
+    without the cache.
+    """
+    ingest_query(_query(temp_directory))
+    fork = tmp_path / "fork"
+    shutil.copytree(temp_directory, fork)
+    body_spy = mocker.spy(output_formatter, "_section_body")
+    count_tokens.reset_mock()
+
+    digest = ingest_query(_query(fork))
+
+    assert body_spy.call_count == 0
+    tokenized = [text for call in count_tokens.call_args_list for text in call.args[0]]
+    expected_files = 8
+    assert len(tokenized) == expected_files + 1
+    assert all(text == digest[1] or text.startswith("=" * 48) for text in tokenized)
+
+    isolated_content_cache.path = isolated_content_cache.path.with_name("empty.sqlite3")
+    assert ingest_query(_query(fork)) == digest
+
+
+@pytest.mark.usefixtures("count_tokens")
+def test_processing_options_have_their_own_entries(tmp_path: Path, mocker: MockerFixture) -> None:
+    """Test that a file stripped of its comments is not served the content cached with them, and vice versa."""
+    (tmp_path / "main.py").write_text("x = 1  # the answer\n")
+    body_spy = mocker.spy(output_formatter, "_section_body")
+
+    _, _, with_comments = ingest_query(_query(tmp_path))
+    _, _, without_comments = ingest_query(_query(tmp_path, remove_comments=True))
+    _, _, again = ingest_query(_query(tmp_path))
+
+    expected_calls = 2
+    assert body_spy.call_count == expected_calls
+    assert "# the answer" in with_comments
+    assert "# the answer" not in without_comments
+    assert again == with_comments
+
+
+def test_content_key_ignores_path_but_not_options(tmp_path: Path) -> None:
+    """Test that keys depend on the bytes and processing of a file, not on where it lives."""
+    query = _query(tmp_path)
+
+    key = content_key(b"x = 1\n", "main.py", query, strips_comments=False)
+
+    assert content_key(b"x = 1\n", "main.py", _query(tmp_path / "other"), strips_comments=False) == key
+    assert content_key(b"x = 2\n", "main.py", query, strips_comments=False) != key
+    assert content_key(b"x = 1\n", "main.py", query, strips_comments=True) != key
+    assert content_key(b"x = 1\n", "main.ipynb", query, strips_comments=False) != key
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path: Path) -> None:
+    """Test that entries used least recently are evicted first once the cache exceeds its budget."""
+    entry_size = 100
+    cache = ContentCache(path=tmp_path / "contents.sqlite3", max_size=2 * entry_size)
+    cache.put_many({"old": CachedContent("a" * entry_size, 1), "used": CachedContent("b" * entry_size, 1)})
+    assert set(cache.get_many(["used"])) == {"used"}
+
+    cache.put_many({"new": CachedContent("c" * entry_size, 1)})
+
+    assert set(cache.get_many(["old", "used", "new"])) == {"used", "new"}
+
+
+def test_unreadable_cache_is_ignored(tmp_path: Path) -> None:
+    """Test that a corrupt database is treated as an empty cache, and that storing into it does not fail."""
+    cache = ContentCache(path=tmp_path / "contents.sqlite3")
+    cache.path.write_bytes(b"not a database" * 100)
+
+    cache.put_many({"key": CachedContent("text", 1)})
+
+    assert cache.get_many(["key"]) == {}
+
+
+@pytest.mark.skipif(os.name != "posix", reason="Permissions are only checked on POSIX systems")
+def test_cache_in_shared_directory_is_ignored(tmp_path: Path) -> None:
+    """Test that the cache is not created in a directory other users could plant contents in."""
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+    cache = ContentCache(path=shared / "cache" / "contents.sqlite3")
+
+    cache.put_many({"key": CachedContent("text", 1)})
+
+    assert cache.get_many(["key"]) == {}
+    assert not cache.path.exists()
+
+
+@pytest.mark.usefixtures("count_tokens")
+def test_files_are_read_in_batches_bounded_by_size(
+    temp_directory: Path,
+    isolated_content_cache: ContentCache,
+    mocker: MockerFixture,
+) -> None:
+    """Test that files whose total size exceeds ``CONTENT_BATCH_MAX_SIZE`` are read and looked up apart."""
+    expected_digest = ingest_query(_query(temp_directory))
+    mocker.patch("gitingest.output_formatter.CONTENT_BATCH_MAX_SIZE", 1)
+    lookup_spy = mocker.spy(isolated_content_cache, "get_many")
+
+    digest = ingest_query(_query(temp_directory))
+
+    expected_batches = 8  # One per file, each being larger than the budget
+    assert lookup_spy.call_count == expected_batches
+    assert digest == expected_digest
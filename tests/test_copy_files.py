@@ -0,0 +1,135 @@
+"""Tests for writing digests section by section, with their plain text files copied into the output file or not.
+
+These tests compare the digests written by ``write_node`` with the ones rendered by ``format_node``, whatever way the
+bytes of the files are copied, and check the options that cannot be combined with copying.
+"""
+
+from __future__ import annotations
+
+import errno
+from typing import TYPE_CHECKING
+
+import pytest
+from click.testing import CliRunner
+
+from gitingest import output_formatter
+from gitingest.__main__ import main
+from gitingest.entrypoint import ingest_async
+from gitingest.ingestion import build_node
+from gitingest.output_formatter import format_node, write_node
+from gitingest.query_parser import IngestionQuery
+from gitingest.utils import file_utils
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+
+def _query(local_path: Path, **kwargs: object) -> IngestionQuery:
+    return IngestionQuery(local_path=local_path, slug="test_repo", id="id", ignore_patterns=set(), **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def count_tokens(mocker: MockerFixture) -> None:
+    """Count one token per character, so that estimates do not depend on the tokenizer being available."""
+    mocker.patch("gitingest.output_formatter._count_tokens", side_effect=lambda texts: [len(t) for t in texts])
+
+
+@pytest.fixture
+def mixed_directory(temp_directory: Path) -> Path:
+    """Add files whose sections are not their bytes to ``temp_directory``."""
+    (temp_directory / "windows.txt").write_bytes(b"line 1\r\nline 2\r\n")
+    (temp_directory / "empty.txt").write_bytes(b"")
+    (temp_directory / "image.bin").write_bytes(bytes(range(256)))
+    (temp_directory / "latin.txt").write_bytes("café\n".encode("latin-1"))
+    (temp_directory / "accents.md").write_text("Ünïcödé text\n" * 200, encoding="utf-8")
+    (temp_directory / "commented.py").write_text("# A comment\nx = 1  # Another one\n")
+    return temp_directory
+
+
+@pytest.mark.parametrize(
+    ("options", "copy_files", "expected_copies"),
+    [({}, True, 9), ({"remove_comments": True}, True, 0), ({"fold_duplicates": True}, True, 0), ({}, False, 0)],
+)
+def test_written_digest_matches_formatted_digest(
+    mixed_directory: Path,
+    tmp_path: Path,
+    mocker: MockerFixture,
+    *,
+    options: dict,
+    copy_files: bool,
+    expected_copies: int,
+) -> None:
+    """Test that a digest written section by section, its plain text files copied or not, is the rendered one.
+
+    Given a directory of plain text, CRLF, empty, binary, non-UTF-8 and commented files:
+    When its digest is written with ``write_node``,
+    Then the output file should hold the tree and contents rendered by ``format_node``, with the same summary, the
+    plain text files being copied with ``copy_files`` unless an option transforms them, and their tokens estimated.
+    """
+    query = _query(mixed_directory, **options)
+    output = tmp_path / "digest.txt"
+    append_spy = mocker.spy(output_formatter, "append_file")
+
+    summary, tree = write_node(build_node(query), query, output, copy_files=copy_files)
+
+    expected_summary, expected_tree, expected_content = format_node(build_node(query), query)
+    assert output.read_bytes() == f"{expected_tree}\n{expected_content}".encode()
+    assert tree == expected_tree
+    assert append_spy.call_count == expected_copies
+    if expected_copies:
+        assert summary.split("Estimated tokens")[0] == expected_summary.split("Estimated tokens")[0]
+    else:
+        assert summary == expected_summary
+
+
+@pytest.mark.parametrize(
+    ("copy_file_range_error", "sendfile_error"),
+    [(errno.EXDEV, None), (errno.ENOSYS, errno.ENOSYS)],
+    ids=["sendfile", "buffered"],
+)
+def test_append_file_falls_back(
+    tmp_path: Path,
+    mocker: MockerFixture,
+    copy_file_range_error: int,
+    sendfile_error: int | None,
+) -> None:
+    """Test that files are copied by ``sendfile``, then in buffers, when the faster copies do not support them."""
+    source = tmp_path / "source.txt"
+    source.write_bytes(b"0123456789" * 100_000)
+    mocker.patch.object(file_utils, "_copy_file_range", side_effect=OSError(copy_file_range_error, "Unsupported"))
+    if sendfile_error is not None:
+        mocker.patch.object(file_utils, "_sendfile", side_effect=OSError(sendfile_error, "Unsupported"))
+    elif not hasattr(file_utils.os, "sendfile"):
+        pytest.skip("sendfile is not available")
+    target = tmp_path / "target.txt"
+
+    with target.open("wb") as f:
+        f.write(b"header\n")
+        file_utils.append_file(f, source)
+        f.write(b"\nfooter")
+
+    assert target.read_bytes() == b"header\n" + source.read_bytes() + b"\nfooter"
+
+
+@pytest.mark.asyncio
+async def test_copy_files_requires_an_output_file(temp_directory: Path, tmp_path: Path) -> None:
+    """Test that ``copy_files`` writes the digest and returns no content, and is refused without an output file."""
+    output = tmp_path / "digest.txt"
+
+    _, tree, content = await ingest_async(str(temp_directory), output=str(output), copy_files=True)
+
+    assert content == ""
+    assert output.read_text().startswith(f"{tree}\n")
+    with pytest.raises(ValueError, match="requires an output file"):
+        await ingest_async(str(temp_directory), output="-", copy_files=True)
+
+
+def test_cli_rejects_copy_files_to_stdout(temp_directory: Path) -> None:
+    """Test that ``--copy-files`` is rejected with ``--output -`` and ``--watch``."""
+    runner = CliRunner()
+    expected_exit_code = 2  # Usage error
+
+    assert runner.invoke(main, [str(temp_directory), "--copy-files", "-o", "-"]).exit_code == expected_exit_code
+    assert runner.invoke(main, [str(temp_directory), "--copy-files", "--watch"]).exit_code == expected_exit_code
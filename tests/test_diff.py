@@ -0,0 +1,150 @@
+"""Tests for the ``diff`` module.
+
+These tests ingest only the files changed between two revisions of a local repository, or since a revision with the
+uncommitted changes on disk, and compare a remote checkout with a base commit fetched without its blobs.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+
+from gitingest.clone import clone_repo
+from gitingest.diff import ChangedFile, list_changed_files, read_diff
+from gitingest.entrypoint import ingest_async
+from gitingest.query_parser import IngestionQuery
+from gitingest.schemas import CloneConfig
+from gitingest.utils.git_utils import run_command
+from tests.conftest import git, git_async
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+
+@pytest.fixture
+def changed_repo(local_git_repo: Path) -> tuple[Path, str, str]:
+    """Commit a modification, an addition, a deletion and a rename on top of ``local_git_repo``.
+
+    Returns the repository with the base and target commits. The working tree also has an uncommitted modification.
+    """
+    base = git(local_git_repo, "rev-parse", "HEAD")
+    (local_git_repo / "src" / "main.py").write_text("print('changed')\n")
+    (local_git_repo / "docs" / "new.md").write_text("New page\n")
+    (local_git_repo / "big.txt").unlink()
+    git(local_git_repo, "mv", "src/data.json", "src/settings.json")
+    git(local_git_repo, "add", "-A")
+    git(local_git_repo, "commit", "-q", "-m", "change")
+    target = git(local_git_repo, "rev-parse", "HEAD")
+    (local_git_repo / "README.md").write_text("# Uncommitted\n")
+    return local_git_repo, base, target
+
+
+@pytest.fixture(autouse=True)
+def count_tokens(mocker: MockerFixture) -> None:
+    """Count one token per character, so that estimates do not depend on the tokenizer being available."""
+    mocker.patch("gitingest.output_formatter._count_tokens", side_effect=lambda texts: [len(t) for t in texts])
+
+
+@pytest.mark.asyncio
+async def test_list_changed_files(changed_repo: tuple[Path, str, str]) -> None:
+    """Test that additions, modifications, deletions and renames are reported with their paths."""
+    repo, base, target = changed_repo
+
+    changes = await list_changed_files(repo, base, target)
+
+    assert sorted(changes, key=lambda change: change.path) == [
+        ChangedFile(status="D", path="big.txt"),
+        ChangedFile(status="A", path="docs/new.md"),
+        ChangedFile(status="M", path="src/main.py"),
+        ChangedFile(status="R100", path="src/settings.json", old_path="src/data.json"),
+    ]
+    assert await list_changed_files(repo / "docs", base, target) == [ChangedFile(status="A", path="new.md")]
+
+
+@pytest.mark.asyncio
+async def test_ingest_since_includes_uncommitted_changes(changed_repo: tuple[Path, str, str]) -> None:
+    """Test that ``diff=<base>`` ingests the files changed since ``base``, as they are on disk.
+
+    Given a repository with committed and uncommitted changes since a base commit, and untracked files:
+    When it is ingested with ``diff`` set to the base commit,
+    Then only the added, modified, renamed and untracked files should be ingested, with their content on disk.
+    """
+    repo, base, _ = changed_repo
+    (repo / ".gitignore").write_text("*.log\n")
+    (repo / "docs" / "draft.md").write_text("Draft page\n")
+    (repo / "debug.log").write_text("Ignored\n")
+
+    summary, tree, content = await ingest_async(str(repo), diff=base)
+
+    assert f"Changes since: {base}" in summary
+    assert "Files analyzed: 5" in summary
+    assert "Draft page" in content
+    assert "debug.log" not in tree
+    assert "# Uncommitted" in content
+    assert "print('changed')" in content
+    assert "FILE: src/settings.json" in content
+    assert "FILE: docs/new.md" in content
+    assert "guide.md" not in tree
+    assert "big.txt" not in tree
+
+
+@pytest.mark.asyncio
+async def test_ingest_diff_range_reads_target_revision(changed_repo: tuple[Path, str, str]) -> None:
+    """Test that ``diff=<base>..<target>`` ingests the changed files as of ``target``, whatever is on disk."""
+    repo, base, target = changed_repo
+    (repo / "src" / "main.py").write_text("print('not committed')\n")
+
+    summary, tree, content = await ingest_async(str(repo), diff=f"{base}..{target}", include_patterns="src/")
+
+    assert f"Changes: {base}..{target}" in summary
+    assert "print('changed')" in content
+    assert "not committed" not in content
+    assert "new.md" not in tree
+    assert "README.md" not in tree
+
+
+@pytest.mark.asyncio
+async def test_ingest_diff_range_archives_paths_in_batches(
+    changed_repo: tuple[Path, str, str],
+    mocker: MockerFixture,
+) -> None:
+    """Test that long lists of changed paths are read with several ``git archive`` commands."""
+    repo, base, target = changed_repo
+    mocker.patch("gitingest.diff._ARCHIVE_PATHS_MAX_BYTES", 1)
+    run_mock = mocker.patch("gitingest.diff.run_command", side_effect=run_command)
+
+    summary, _, content = await ingest_async(str(repo), diff=f"{base}..{target}")
+
+    expected_archives = 3  # One per file still present in the target
+    assert [call.args[3] for call in run_mock.call_args_list].count("archive") == expected_archives
+    assert "Files analyzed: 3" in summary
+    assert "print('changed')" in content
+    assert "New page" in content
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("diff", ["a...b", "..b"])
+async def test_ingest_rejects_invalid_ranges(local_git_repo: Path, diff: str) -> None:
+    """Test that symmetric and base-less ranges are rejected."""
+    with pytest.raises(ValueError, match="Invalid diff range"):
+        await ingest_async(str(local_git_repo), diff=diff)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("repo_exists_true")
+async def test_clone_fetches_diff_base(changed_repo: tuple[Path, str, str], tmp_path: Path) -> None:
+    """Test that a checkout of the target commit can be compared with a base commit fetched without its blobs."""
+    repo, base, target = changed_repo
+    local_path = tmp_path / "clone"
+
+    await clone_repo(
+        CloneConfig(url=repo.as_uri(), local_path=str(local_path), commit=target, diff_base=base, use_cache=False),
+    )
+    root = await read_diff(IngestionQuery(local_path=local_path, slug="repo", id="id", diff_base=base))
+
+    assert sorted(child.name for child in root.children) == ["docs", "src"]
+    missing = await git_async(local_path, "rev-list", "--objects", "--missing=print", base)
+    assert "?" in missing  # The blobs of the base commit were never transferred
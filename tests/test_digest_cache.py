@@ -0,0 +1,133 @@
+"""Tests for the ``digest_cache`` module.
+
+These tests cover storing and retrieving digests, least-recently-used eviction, cache keys derived from the resolved
+commit and ingestion options, and serving ``ingest_async`` from the cache.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+from unittest.mock import AsyncMock
+
+import pytest
+
+from gitingest.entrypoint import ingest_async
+from gitingest.utils.digest_cache import DigestCache, digest_cache_key
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+    from gitingest.query_parser import IngestionQuery
+
+TOKEN = "ghp_" + "A" * 36
+DIGEST = ("Repository: user/repo", "Directory structure:\n└── repo/\n", "content")
+
+
+def test_digest_cache_roundtrip(tmp_path: Path) -> None:
+    """Test that a stored digest is returned as is, and that unknown keys miss."""
+    cache = DigestCache(root=tmp_path)
+
+    cache.put("key", DIGEST)
+
+    assert cache.get("key") == DIGEST
+    assert cache.get("other") is None
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_digest_cache_copies_digest_files(tmp_path: Path) -> None:
+    """Test that a digest stored from a ``.txt`` file is copied back to one byte for byte, and read as stored."""
+    cache = DigestCache(root=tmp_path / "digests")
+    summary, tree, content = DIGEST
+    source = tmp_path / "source.txt"
+    source.write_bytes(f"{tree}\n{content}".encode())
+    target = tmp_path / "target.txt"
+
+    cache.put_file("key", summary, tree, source)
+
+    assert cache.copy_to("key", target) == (summary, tree)
+    assert target.read_bytes() == source.read_bytes()
+    assert cache.get("key") == DIGEST
+    assert cache.copy_to("other", target) is None
+
+
+def test_digest_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    """Test that the least-recently-used entries are evicted once the cache exceeds its budget."""
+    cache = DigestCache(root=tmp_path, max_size=10_000)
+    cache.put("old", DIGEST)
+    entry_size = (tmp_path / "old.digest").stat().st_size
+    os.utime(tmp_path / "old.digest", (1, 1))
+    cache.put("new", DIGEST)
+
+    cache.max_size = entry_size
+    cache.evict()
+
+    assert cache.get("old") is None
+    assert cache.get("new") == DIGEST
+
+
+@pytest.mark.asyncio
+async def test_digest_cache_key(sample_query: IngestionQuery, mocker: MockerFixture) -> None:
+    """Test that the key depends on the resolved commit and on the options shaping the digest."""
+    resolve_mock = mocker.patch("gitingest.utils.digest_cache.resolve_commit", new_callable=AsyncMock)
+    resolve_mock.return_value = "a" * 40
+    sample_query.url = "https://github.com/user/repo"
+
+    key = await digest_cache_key(sample_query)
+    assert key == await digest_cache_key(sample_query)
+
+    sample_query.max_file_size += 1
+    assert await digest_cache_key(sample_query) != key
+    sample_query.max_file_size -= 1
+
+    resolve_mock.return_value = "b" * 40
+    assert await digest_cache_key(sample_query) != key
+
+    resolve_mock.side_effect = RuntimeError("ls-remote failed")
+    assert await digest_cache_key(sample_query) is None
+
+
+@pytest.mark.asyncio
+async def test_digest_cache_key_pins_commit_and_checks_access(
+    sample_query: IngestionQuery,
+    mocker: MockerFixture,
+) -> None:
+    """Test that the query is fetched at the resolved commit, and that commit URLs need access to the repository."""
+    sha = "a" * 40
+    mocker.patch("gitingest.utils.digest_cache.resolve_commit", new_callable=AsyncMock, return_value=sha)
+    exists_mock = mocker.patch("gitingest.utils.digest_cache.check_repo_exists", new_callable=AsyncMock)
+    sample_query.url = "https://github.com/user/repo"
+    sample_query.branch = "main"
+
+    assert await digest_cache_key(sample_query) is not None
+    assert sample_query.extract_clone_config().commit == sha
+    exists_mock.assert_not_called()
+
+    sample_query.commit = sha
+    exists_mock.return_value = False
+    assert await digest_cache_key(sample_query, token=TOKEN) is None
+    exists_mock.assert_awaited_once_with(sample_query.url, token=TOKEN)
+
+
+@pytest.mark.asyncio
+async def test_ingest_async_served_from_digest_cache(tmp_path: Path, mocker: MockerFixture) -> None:
+    """Test that ``ingest_async`` returns a cached digest without cloning.
+
+    Given a remote repository whose resolved commit and options are already in the digest cache:
+    When ``ingest_async`` is called,
+    Then the cached digest should be returned and written to the output without cloning.
+    """
+    cache = DigestCache(root=tmp_path / "digests")
+    cache.put("key", DIGEST)
+    mocker.patch("gitingest.entrypoint.digest_cache", cache)
+    mocker.patch("gitingest.entrypoint.digest_cache_key", new_callable=AsyncMock, return_value="key")
+    clone_mock = mocker.patch("gitingest.entrypoint.clone_repo", new_callable=AsyncMock)
+    output = tmp_path / "digest.txt"
+
+    result = await ingest_async("https://github.com/user/repo", output=str(output))
+
+    assert result == DIGEST
+    assert output.read_text() == f"{DIGEST[1]}\n{DIGEST[2]}"
+    clone_mock.assert_not_called()
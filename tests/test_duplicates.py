@@ -0,0 +1,93 @@
+"""Tests for folding duplicate files in the digest.
+
+These tests cover outputting the content of identical files once, with references from the other copies in the
+contents, tree and summary, and keeping short contents, which a reference would not shorten.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+import pytest
+
+from gitingest.ingestion import ingest_query
+from gitingest.output_formatter import _format_token_count
+from gitingest.query_parser import IngestionQuery
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+LICENSE = "Permission is hereby granted, free of charge, to any person obtaining a copy of this software.\n" * 10
+
+
+def _query(local_path: Path, **kwargs: object) -> IngestionQuery:
+    return IngestionQuery(local_path=local_path, slug="monorepo", id="id", ignore_patterns=set(), **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def count_tokens(mocker: MockerFixture) -> None:
+    """Count one token per character, so that estimates do not depend on the tokenizer being available."""
+    mocker.patch("gitingest.output_formatter._count_tokens", side_effect=lambda texts: [len(t) for t in texts])
+
+
+@pytest.fixture
+def monorepo(tmp_path: Path) -> Path:
+    """Create three packages sharing a license file and a short ``__init__.py``."""
+    for package in ("a", "b", "c"):
+        (tmp_path / package).mkdir()
+        (tmp_path / package / "LICENSE").write_text(LICENSE)
+        (tmp_path / package / "__init__.py").write_text('"""Package."""\n')
+    (tmp_path / "c" / "LICENSE").write_text(LICENSE.upper())
+    return tmp_path
+
+
+def test_identical_files_are_folded(monorepo: Path) -> None:
+    """Test that the copies of a file refer to the first one in the contents, the tree and the summary.
+
+    Given packages sharing a license file:
+    When the directory is ingested with ``fold_duplicates``,
+    Then the license should be output once, the other copy should refer to it, and the token estimate should count
+    the folded digest.
+    """
+    summary, tree, content = ingest_query(_query(monorepo, fold_duplicates=True))
+
+    assert content.count(LICENSE) == 1
+    assert "FILE: b/LICENSE (identical to a/LICENSE)\n" in content
+    assert "LICENSE (identical to a/LICENSE)" in tree
+    assert LICENSE.upper() in content
+    assert "Duplicate files folded: 1\n" in summary
+    sections = content.count("=" * 48) // 2
+    expected_tokens = len(tree) + len(content) - (sections - 1)  # Sections are joined by newlines
+    assert summary.endswith(f"Estimated tokens: {_format_token_count(expected_tokens)}")
+
+
+def test_short_files_are_not_folded(monorepo: Path) -> None:
+    """Test that contents shorter than a reference are repeated."""
+    _, _, content = ingest_query(_query(monorepo, fold_duplicates=True))
+
+    expected_copies = 3
+    assert content.count('"""Package."""') == expected_copies
+    assert "__init__.py (identical to" not in content
+
+
+def test_folding_is_opt_in(monorepo: Path) -> None:
+    """Test that every copy is output in full unless ``fold_duplicates`` is set."""
+    summary, tree, content = ingest_query(_query(monorepo))
+
+    expected_copies = 2
+    assert content.count(LICENSE) == expected_copies
+    assert "identical to" not in tree
+    assert "Duplicate files folded" not in summary
+
+
+def test_folding_applies_to_indexed_sections(monorepo: Path) -> None:
+    """Test that a second ingest, served from the file index, folds the same files."""
+    old_mtime = 1_600_000_000  # Well outside the window in which files are too recent to be indexed
+    for path in monorepo.rglob("*"):
+        os.utime(path, (old_mtime, old_mtime))
+    first = ingest_query(_query(monorepo, fold_duplicates=True))
+
+    assert ingest_query(_query(monorepo, fold_duplicates=True)) == first
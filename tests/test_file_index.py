@@ -0,0 +1,128 @@
+"""Tests for the ``file_index`` module.
+
+These tests cover reusing the sections and token counts of unchanged files across local ingests, and the cases where
+the index must not be trusted: racily modified files, removed files, other options and an unreadable database.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+import pytest
+
+from gitingest import output_formatter
+from gitingest.ingestion import ingest_query
+from gitingest.query_parser import IngestionQuery
+from gitingest.utils.file_index import FileIndex, index_variant
+
+if TYPE_CHECKING:
+    from pathlib import Path
+    from unittest.mock import MagicMock
+
+    from pytest_mock import MockerFixture
+
+OLD_MTIME = 1_600_000_000  # Well outside the window in which files are too recent to be indexed
+
+
+def _query(local_path: Path, **kwargs: object) -> IngestionQuery:
+    return IngestionQuery(local_path=local_path, slug="test_repo", id="id", ignore_patterns=set(), **kwargs)
+
+
+def _age(directory: Path) -> None:
+    """Set the modification time of every file under ``directory`` to ``OLD_MTIME``."""
+    for path in directory.rglob("*"):
+        os.utime(path, (OLD_MTIME, OLD_MTIME))
+
+
+@pytest.fixture
+def count_tokens(mocker: MockerFixture) -> MagicMock:
+    """Count one token per character, so that estimates do not depend on the tokenizer being available."""
+    return mocker.patch(
+        "gitingest.output_formatter._count_tokens",
+        side_effect=lambda texts: [len(text) for text in texts],
+    )
+
+
+def test_reingest_processes_only_changed_files(
+    temp_directory: Path,
+    isolated_file_index: FileIndex,
+    count_tokens: MagicMock,
+    mocker: MockerFixture,
+) -> None:
+    """Test that a second ingest only processes the edited file and splices the indexed sections of the others.
+
+    Given a directory ingested once:
+    When one file is edited and the directory is ingested again,
+    Then only that file should be read and tokenized, and the digest should match one built without the index.
+    """
+    _age(temp_directory)
+    ingest_query(_query(temp_directory))
+    edited = temp_directory / "src" / "subfile1.txt"
+    edited.write_text("Edited in src")
+    os.utime(edited, (OLD_MTIME + 1, OLD_MTIME + 1))
+    header_spy = mocker.spy(output_formatter, "_section_header")
+    body_spy = mocker.spy(output_formatter, "_section_body")
+    count_tokens.reset_mock()
+
+    digest = ingest_query(_query(temp_directory))
+
+    assert [call.args[0].path for call in body_spy.call_args_list] == [edited]
+    tokenized = [text for call in count_tokens.call_args_list for text in call.args[0]]
+    assert sorted(tokenized) == sorted([digest[1], header_spy.spy_return, body_spy.spy_return])
+    assert body_spy.spy_return == "Edited in src\n\n"
+
+    isolated_file_index.path = isolated_file_index.path.with_name("empty.sqlite3")
+    assert ingest_query(_query(temp_directory)) == digest
+
+
+@pytest.mark.usefixtures("count_tokens")
+def test_recent_and_removed_files_are_not_indexed(temp_directory: Path, isolated_file_index: FileIndex) -> None:
+    """Test that files modified in the last seconds are not indexed, and that removed files are dropped."""
+    _age(temp_directory)
+    (temp_directory / "file1.txt").write_text("Just written")
+    query = _query(temp_directory)
+
+    ingest_query(query)
+    (temp_directory / "dir1" / "file_dir1.txt").unlink()
+    ingest_query(query)
+
+    indexed = isolated_file_index.load(index_variant(query))
+    assert str(temp_directory / "file2.py") in indexed
+    assert str(temp_directory / "file1.txt") not in indexed
+    assert str(temp_directory / "dir1" / "file_dir1.txt") not in indexed
+
+
+def test_index_variant(temp_directory: Path) -> None:
+    """Test that sections are indexed apart for other roots and comment options, but not for other patterns."""
+    variant = index_variant(_query(temp_directory))
+
+    assert index_variant(_query(temp_directory, include_patterns={"*.py"}, max_file_size=10)) == variant
+    assert index_variant(_query(temp_directory / "src")) != variant
+    assert index_variant(_query(temp_directory, remove_comments=True)) != variant
+
+
+@pytest.mark.usefixtures("count_tokens")
+def test_unreadable_index_is_ignored(temp_directory: Path, isolated_file_index: FileIndex) -> None:
+    """Test that ingestion processes every file when the index database is corrupt."""
+    isolated_file_index.path.write_bytes(b"not a database" * 100)
+    expected_digest = ingest_query(_query(temp_directory))
+
+    isolated_file_index.path.unlink()
+
+    assert ingest_query(_query(temp_directory)) == expected_digest
+
+
+@pytest.mark.skipif(os.name != "posix", reason="Permissions are only checked on POSIX systems")
+def test_index_in_shared_directory_is_ignored(tmp_path: Path) -> None:
+    """Test that the index is not created in a directory other users could plant sections in."""
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+    index = FileIndex(path=shared / "cache" / "files.sqlite3")
+    variant = index_variant(_query(tmp_path))
+
+    index.save(variant, {})
+
+    assert index.load(variant) == {}
+    assert not index.path.exists()
@@ -0,0 +1,104 @@
+"""Tests for the ``generated`` module.
+
+These tests cover recognizing generated and minified files from their first bytes, applying the linguist attributes
+of ``.gitattributes`` files, and replacing the contents of such files by placeholders in the digest.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+
+from gitingest import output_formatter
+from gitingest.ingestion import ingest_query
+from gitingest.query_parser import IngestionQuery
+from gitingest.utils.generated import GENERATED_SAMPLE_SIZE, GeneratedKind, LinguistRules, detect_generated
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+MINIFIED = b"function a(b){return b.map(function(c){return c*2}).filter(Boolean)};" * 100
+
+
+def _query(local_path: Path, **kwargs: object) -> IngestionQuery:
+    return IngestionQuery(local_path=local_path, slug="repo", id="id", ignore_patterns=set(), **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def count_tokens(mocker: MockerFixture) -> None:
+    """Count one token per character, so that estimates do not depend on the tokenizer being available."""
+    mocker.patch("gitingest.output_formatter._count_tokens", side_effect=lambda texts: [len(t) for t in texts])
+
+
+@pytest.mark.parametrize(
+    ("sample", "expected_kind"),
+    [
+        (b"// Code generated by protoc-gen-go. DO NOT EDIT.\npackage api\n", GeneratedKind.GENERATED),
+        (b"#!/usr/bin/env python\n# @generated by tool\nx = 1\n", GeneratedKind.GENERATED),
+        (b'"""Module."""\n\nMARKER = "DO NOT EDIT"\n', None),
+        (b"def f():\n    return 1\n" * 200, None),
+        (MINIFIED, GeneratedKind.MINIFIED),
+        (b"\x00\x01" * GENERATED_SAMPLE_SIZE, None),
+    ],
+    ids=["go-header", "generated-tag", "marker-in-code", "hand-written", "minified", "binary"],
+)
+def test_detect_generated(sample: bytes, expected_kind: GeneratedKind | None) -> None:
+    """Test that generated and minified files are told apart from hand-written and binary ones."""
+    assert detect_generated(sample[:GENERATED_SAMPLE_SIZE]) == expected_kind
+
+
+def test_linguist_rules() -> None:
+    """Test that deeper and later ``.gitattributes`` rules override earlier ones, as in Git."""
+    rules = LinguistRules()
+    rules.add("", "dist/** linguist-generated\nthird_party/** linguist-vendored=true\n# *.py linguist-generated\n")
+    rules.add("dist", "keep.js -linguist-generated\n")
+    rules.add("proto", "*_pb2.py linguist-generated=false\n")
+
+    assert rules.classify("dist/app.js") == GeneratedKind.GENERATED
+    assert rules.classify("dist/keep.js") is None
+    assert rules.classify("third_party/lib/x.c") == GeneratedKind.VENDORED
+    assert rules.classify("src/main.py") is None
+    assert rules.classify("api/service_pb2.py") == GeneratedKind.GENERATED
+    assert rules.classify("proto/service_pb2.py") is None
+
+
+def test_generated_files_are_replaced_by_placeholders(tmp_path: Path, mocker: MockerFixture) -> None:
+    """Test that generated, minified and vendored files are listed with a placeholder instead of their contents.
+
+    Given a directory holding files generated according to ``.gitattributes``, to their names and to their contents:
+    When it is ingested,
+    Then these files should be listed in the tree with placeholders, and none of them should be processed.
+    """
+    (tmp_path / ".gitattributes").write_text("vendor/** linguist-vendored\n")
+    (tmp_path / "vendor").mkdir()
+    (tmp_path / "vendor" / "lib.py").write_text("VENDORED = True\n")
+    (tmp_path / "api_pb2.py").write_text("NAMED = True\n")
+    (tmp_path / "client.go").write_text("// Code generated by mockgen. DO NOT EDIT.\npackage api\n")
+    (tmp_path / "bundle.js").write_bytes(MINIFIED * 10)
+    (tmp_path / "main.py").write_text("print('hand-written')\n")
+    body_spy = mocker.spy(output_formatter, "_section_body")
+
+    _, tree, content = ingest_query(_query(tmp_path))
+
+    assert sorted(call.args[0].name for call in body_spy.call_args_list) == [".gitattributes", "main.py"]
+    assert "lib.py" in tree
+    assert "FILE: vendor/lib.py\n" + "=" * 48 + "\n[Vendored file]\n" in content
+    assert "FILE: api_pb2.py\n" + "=" * 48 + "\n[Generated file]\n" in content
+    assert "FILE: client.go\n" + "=" * 48 + "\n[Generated file]\n" in content
+    assert "FILE: bundle.js\n" + "=" * 48 + "\n[Minified file]\n" in content
+    assert "hand-written" in content
+
+
+def test_include_generated(tmp_path: Path) -> None:
+    """Test that ``include_generated`` outputs the contents of generated files, and that single files are output."""
+    generated = tmp_path / "client.go"
+    generated.write_text("// Code generated by mockgen. DO NOT EDIT.\npackage api\n")
+
+    _, _, content = ingest_query(_query(tmp_path, include_generated=True))
+    assert "package api" in content
+
+    _, _, content = ingest_query(_query(generated))
+    assert "package api" in content
@@ -0,0 +1,118 @@
+"""Tests for the ``git_http`` module.
+
+These tests list the refs of a local repository served by ``git http-backend``, run as a CGI script behind a mock
+transport, over both protocol v2 and the original ref advertisement, and ask it for the sizes of objects.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING, Callable
+
+import httpx
+import pytest
+
+from gitingest.utils import git_utils
+from gitingest.utils.git_http import discover_refs, fetch_object_sizes, parse_pkt_lines
+from gitingest.utils.git_utils import fetch_remote_refs
+from tests.conftest import git, git_async, run_git
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+BASE_URL = "http://git.example.com/origin"
+
+
+def _http_backend(project_root: Path, *, protocol_v2: bool) -> Callable[[httpx.Request], httpx.Response]:
+    """Return a request handler that runs ``git http-backend`` the way a web server runs a CGI script."""
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        env = {
+            **os.environ,
+            "GIT_PROJECT_ROOT": str(project_root),
+            "GIT_HTTP_EXPORT_ALL": "1",
+            "PATH_INFO": request.url.path,
+            "QUERY_STRING": request.url.query.decode(),
+            "REQUEST_METHOD": request.method,
+            "CONTENT_TYPE": request.headers.get("content-type", ""),
+            "CONTENT_LENGTH": str(len(request.content)),
+        }
+        if protocol_v2 and "git-protocol" in request.headers:
+            env["HTTP_GIT_PROTOCOL"] = request.headers["git-protocol"]
+
+        output = run_git(project_root, "http-backend", stdin=request.content, env=env)
+        head, _, body = output.partition(b"\r\n\r\n")
+        headers = dict(line.split(": ", 1) for line in head.decode().split("\r\n"))
+        status_code = int(headers.pop("Status", "200").split()[0])
+        return httpx.Response(status_code, headers=headers, content=body)
+
+    return handle
+
+
+@pytest.fixture
+def tagged_repo(local_git_repo: Path) -> tuple[Path, str]:
+    """Add an annotated tag to the local repository and return it with the SHA of its ``main`` branch."""
+    git(local_git_repo, "tag", "-a", "v1.0", "-m", "release")
+    git(local_git_repo, "update-ref", "refs/pull/1/head", "HEAD")
+    sha = git(local_git_repo, "rev-parse", "HEAD")
+    return local_git_repo, sha
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("protocol_v2", [True, False])
+async def test_discover_refs(tagged_repo: tuple[Path, str], *, protocol_v2: bool) -> None:
+    """Test that the default branch, branches and peeled tags are listed, and nothing else."""
+    repo, sha = tagged_repo
+    transport = httpx.MockTransport(_http_backend(repo.parent, protocol_v2=protocol_v2))
+
+    async with httpx.AsyncClient(transport=transport) as client:
+        refs = await discover_refs(client, BASE_URL)
+
+    assert refs["HEAD"] == refs["refs/heads/main"] == refs["refs/tags/v1.0^{}"] == sha
+    assert refs["refs/tags/v1.0"] != sha  # The tag object itself
+    assert set(refs) == {"HEAD", "refs/heads/main", "refs/tags/v1.0", "refs/tags/v1.0^{}"}
+
+
+@pytest.mark.asyncio
+async def test_fetch_remote_refs_over_http_skips_git(tagged_repo: tuple[Path, str], mocker: MockerFixture) -> None:
+    """Test that HTTP remotes are listed without spawning ``git``."""
+    repo, sha = tagged_repo
+    client = httpx.AsyncClient(transport=httpx.MockTransport(_http_backend(repo.parent, protocol_v2=True)))
+    mocker.patch("gitingest.utils.git_utils.get_http_client", return_value=client)
+    run_command_spy = mocker.spy(git_utils, "run_command")
+
+    refs = await fetch_remote_refs(BASE_URL)
+
+    assert refs["refs/heads/main"] == sha
+    run_command_spy.assert_not_called()
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_fetch_object_sizes(local_git_repo: Path) -> None:
+    """Test that object sizes are returned by protocol v2 servers serving ``object-info``, and refused otherwise."""
+    await git_async(local_git_repo, "config", "transfer.advertiseObjectInfo", "true")
+    oids = (await git_async(local_git_repo, "rev-parse", "HEAD:big.txt", "HEAD:README.md")).split()
+
+    v0_transport = httpx.MockTransport(_http_backend(local_git_repo.parent, protocol_v2=False))
+    async with httpx.AsyncClient(transport=v0_transport) as client:
+        with pytest.raises(ValueError, match="does not advertise the object-info command"):
+            await fetch_object_sizes(client, BASE_URL, oids)
+
+    v2_transport = httpx.MockTransport(_http_backend(local_git_repo.parent, protocol_v2=True))
+    async with httpx.AsyncClient(transport=v2_transport) as client:
+        sizes = await fetch_object_sizes(client, BASE_URL, oids)
+
+    assert sizes == {oids[0]: 4096, oids[1]: len("# Origin\n")}
+
+
+def test_parse_pkt_lines() -> None:
+    """Test that pkt-lines are split into payloads and that special and malformed packets are recognised."""
+    assert parse_pkt_lines(b"000aHello\n00000001000bWorld!\n") == [b"Hello\n", None, None, b"World!\n"]
+
+    with pytest.raises(ValueError, match="Truncated pkt-line"):
+        parse_pkt_lines(b"0010short")
+    with pytest.raises(ValueError, match="Invalid pkt-line length"):
+        parse_pkt_lines(b"zzzz")
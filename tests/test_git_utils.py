@@ -6,17 +6,39 @@ GitHub personal access tokens (PATs) are properly formatted.
 
 from __future__ import annotations
 
+import asyncio
 import base64
+import weakref
+from pathlib import Path
 from typing import TYPE_CHECKING
+from unittest.mock import AsyncMock
 
+import httpx
 import pytest
+from starlette.status import HTTP_200_OK, HTTP_404_NOT_FOUND
 
+from gitingest.query_parser import try_domains_for_user_and_repo
+from gitingest.utils import git_utils
 from gitingest.utils.exceptions import InvalidGitHubTokenError
-from gitingest.utils.git_utils import create_git_auth_header, create_git_command, is_github_host, validate_github_token
+from gitingest.utils.git_utils import (
+    check_repo_exists,
+    close_http_client,
+    create_git_auth_header,
+    create_git_command,
+    create_sparse_checkout_rules,
+    ensure_git_installed,
+    fetch_remote_branches_or_tags,
+    get_http_client,
+    is_github_host,
+    rebase_submodule_patterns,
+    resolve_commit,
+    run_command,
+    validate_github_token,
+)
+from gitingest.utils.query_parser_utils import KNOWN_GIT_HOSTS
+from tests.conftest import git_async
 
 if TYPE_CHECKING:
-    from pathlib import Path
-
     from pytest_mock import MockerFixture
 
 
@@ -276,4 +298,194 @@ def test_create_git_command_ignores_non_github_urls(
 
     # Should only have base command and -C option, no auth headers
     expected = [*base_cmd, "-C", local_path]
-    assert cmd == expected
\ No newline at end of file
+    assert cmd == expected
+
+
+@pytest.mark.parametrize(
+    ("kwargs", "expected"),
+    [
+        ({}, ["/*"]),
+        ({"subpath": "/src/docs"}, ["/src/docs"]),
+        ({"subpath": "/src", "include_patterns": {"*.py", "docs/"}}, ["/src/**/*.py", "/src/**/docs/"]),
+        ({"subpath": "/src/app", "include_patterns": {"src/*/main.py", "lib/*.py"}}, ["/src/app/main.py"]),
+        ({"subpath": "/src/app", "include_patterns": {"/src", "**/test_*.py"}}, ["/src/app"]),
+        ({"subpath": "/src/app", "include_patterns": {"lib/*.py"}}, ["/src/app"]),
+        ({"include_patterns": {"*.py"}}, ["*.py"]),
+        ({"ignore_patterns": {"*.log", "build/"}}, ["/*", "!*.log", "!build/"]),
+        ({"excluded_paths": ["data/big[1].bin", "#notes"]}, ["/*", "!/data/big\\[1\\].bin", "!/\\#notes"]),
+    ],
+)
+def test_create_sparse_checkout_rules(kwargs: dict, expected: list[str]) -> None:
+    """Test that ingestion filters are translated into ordered non-cone sparse-checkout rules."""
+    assert create_sparse_checkout_rules(**kwargs) == expected
+
+
+@pytest.mark.parametrize(
+    ("patterns", "expected"),
+    [
+        (None, None),
+        ({"*.md", "build/"}, {"*.md", "build/"}),
+        ({"vendor"}, {"/*"}),
+        ({"/vendor/lib/docs/", "/vendor/*/src/*.py", "/docs"}, {"/docs/", "/src/*.py"}),
+        ({"/vendor", "vendor/**"}, {"/*"}),
+        ({"/vendor/**/test_*.py"}, {"**/test_*.py"}),
+        ({"/src/*.py"}, set()),
+    ],
+)
+def test_rebase_submodule_patterns(patterns: set[str] | None, expected: set[str] | None) -> None:
+    """Test that the patterns of a parent repository are rebased onto its submodule at ``vendor/lib``."""
+    assert rebase_submodule_patterns(patterns, "vendor/lib") == expected
+
+
+@pytest.mark.asyncio
+async def test_resolve_commit(local_git_repo: Path) -> None:
+    """Test that branches, annotated tags and the default branch resolve to the commit SHA."""
+    await git_async(local_git_repo, "tag", "-a", "v1.0", "-m", "release")
+    sha = await git_async(local_git_repo, "rev-parse", "HEAD")
+    url = local_git_repo.as_uri()
+
+    assert await resolve_commit(url) == sha
+    assert await resolve_commit(url, branch="main") == sha
+    assert await resolve_commit(url, tag="v1.0") == sha
+    assert await resolve_commit(url, commit="c" * 40) == "c" * 40
+
+    with pytest.raises(ValueError, match="Could not resolve"):
+        await resolve_commit(url, branch="missing")
+
+
+@pytest.mark.asyncio
+async def test_check_repo_exists_caches_answers(mocker: MockerFixture) -> None:
+    """Test that existence checks reuse the pooled client and cache their answers per URL and token."""
+    expected_call_count = 2  # One per token
+    head = mocker.patch("httpx.AsyncClient.head", return_value=httpx.Response(status_code=HTTP_404_NOT_FOUND))
+
+    assert await check_repo_exists("https://gitlab.com/user/repo") is False
+    assert await check_repo_exists("https://gitlab.com/user/repo.git") is False
+    assert head.call_count == 1
+    assert get_http_client() is get_http_client()
+
+    head.return_value = httpx.Response(status_code=HTTP_200_OK)
+    assert await check_repo_exists("https://gitlab.com/user/repo", token="ghp_" + "A" * 36) is True
+    assert head.call_count == expected_call_count
+
+
+@pytest.mark.asyncio
+async def test_try_domains_prefers_known_hosts_in_order(mocker: MockerFixture) -> None:
+    """Test that known hosts are probed concurrently and the first host in order of priority that has the repo wins.
+
+    Given a repository on GitHub, which answers last, and on Codeberg:
+    When the host of ``user/repo`` is looked up,
+    Then GitHub is chosen, whichever host answers first, and the other hosts are probed meanwhile.
+    """
+    probed: list[str] = []
+
+    async def exists(url: str, token: str | None = None) -> bool:  # noqa: ARG001
+        probed.append(url)
+        if url.startswith("https://github.com/"):
+            await asyncio.sleep(0.1)
+        return url.startswith(("https://github.com/", "https://codeberg.org/"))
+
+    mocker.patch("gitingest.query_parser.check_repo_exists", side_effect=exists)
+
+    assert await try_domains_for_user_and_repo("user", "repo") == "github.com"
+    assert len(probed) == len(KNOWN_GIT_HOSTS)
+
+    mocker.patch(
+        "gitingest.query_parser.check_repo_exists",
+        side_effect=lambda url, token=None: url.startswith("https://codeberg.org/"),  # noqa: ARG005
+    )
+    assert await try_domains_for_user_and_repo("user", "repo") == "codeberg.org"
+
+    mocker.patch("gitingest.query_parser.check_repo_exists", return_value=False)
+    with pytest.raises(ValueError, match="Could not find a valid repository host"):
+        await try_domains_for_user_and_repo("user", "repo")
+
+
+@pytest.mark.asyncio
+async def test_close_http_client() -> None:
+    """Test that closing the client of the running loop closes it and that a new one is created afterwards."""
+    client = get_http_client()
+
+    await close_http_client()
+
+    assert client.is_closed
+    assert get_http_client() is not client
+    await close_http_client()
+
+
+@pytest.mark.asyncio
+async def test_remote_refs_are_listed_once(local_git_repo: Path, mocker: MockerFixture) -> None:
+    """Test that tag and branch discovery, ref resolution and the existence check share one ``git ls-remote``."""
+    await git_async(local_git_repo, "tag", "v1.0")
+    sha = await git_async(local_git_repo, "rev-parse", "HEAD")
+    url = local_git_repo.as_uri()
+    run_command_spy = mocker.spy(git_utils, "run_command")
+
+    assert await fetch_remote_branches_or_tags(url, ref_type="tags") == ["v1.0"]
+    assert await fetch_remote_branches_or_tags(url, ref_type="branches") == ["main"]
+    assert await resolve_commit(url, tag="v1.0") == sha
+    assert await check_repo_exists(url) is True
+
+    assert sum("ls-remote" in call.args for call in run_command_spy.call_args_list) == 1
+
+
+def _is_running(pid: int) -> bool:
+    """Return ``True`` if the process exists and is not a zombie."""
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except FileNotFoundError:
+        return False
+    return stat.rsplit(")", 1)[1].split()[0] != "Z"
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not Path("/proc/self/stat").exists(), reason="Needs procfs")
+async def test_run_command_kills_process_group_on_cancel(tmp_path: Path) -> None:
+    """Test that cancelling ``run_command`` terminates the command and the processes it started."""
+    pid_file = tmp_path / "child.pid"
+    task = asyncio.create_task(run_command("sh", "-c", f"sleep 60 & echo $! > {pid_file}; wait"))
+    for _ in range(200):
+        if pid_file.exists() and pid_file.read_text().strip():
+            break
+        await asyncio.sleep(0.01)
+    child_pid = int(pid_file.read_text())
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    for _ in range(200):
+        if not _is_running(child_pid):
+            break
+        await asyncio.sleep(0.01)
+    assert not _is_running(child_pid)
+
+
+@pytest.mark.asyncio
+async def test_run_command_limits_concurrency(mocker: MockerFixture) -> None:
+    """Test that no more than ``MAX_GIT_PROCESSES`` commands run at once."""
+    expected_duration = 0.4  # Both sleeps, one after the other
+    mocker.patch("gitingest.utils.git_utils.MAX_GIT_PROCESSES", 1)
+    mocker.patch.object(git_utils, "_process_semaphores", weakref.WeakKeyDictionary())
+    loop = asyncio.get_running_loop()
+
+    start = loop.time()
+    await asyncio.gather(run_command("sleep", "0.2"), run_command("sleep", "0.2"))
+
+    assert loop.time() - start >= expected_duration
+
+
+@pytest.mark.asyncio
+async def test_ensure_git_installed_is_memoised(mocker: MockerFixture) -> None:
+    """Test that ``git --version`` only runs until it first succeeds."""
+    expected_call_count = 2  # The failed check and the first successful one
+    mocker.patch.object(git_utils, "_git_installed", new=False)
+    run_command_mock = mocker.patch("gitingest.utils.git_utils.run_command", new_callable=AsyncMock)
+    run_command_mock.side_effect = [RuntimeError("git: not found"), (b"git version 2.39.5", b"")]
+
+    with pytest.raises(RuntimeError, match="Git is not installed"):
+        await ensure_git_installed()
+    await ensure_git_installed()
+    await ensure_git_installed()
+
+    assert run_command_mock.call_count == expected_call_count
@@ -0,0 +1,196 @@
+"""Tests for the asynchronous ingestion job API.
+
+These tests verify that jobs are queued and run in the background, that their status can be polled, and that the
+result endpoint reports unfinished, failed and completed jobs.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import TYPE_CHECKING, Callable, Generator
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from server import jobs
+from server.jobs import JobManager
+from server.main import app
+from server.models import IngestErrorResponse, IngestRequest, IngestSuccessResponse, JobStage, JobStatus
+from server.server_utils import limiter
+from server.worker_pool import QueueFullError
+
+if TYPE_CHECKING:
+    from pytest_mock import MockerFixture
+
+SUCCESS = IngestSuccessResponse(
+    repo_url="octocat/hello-world",
+    short_repo_url="octocat/hello-world",
+    summary="Repository: octocat/hello-world",
+    tree="Directory structure:",
+    content="README",
+    default_max_file_size=243,
+    pattern_type="exclude",
+    pattern="",
+    remove_comments=False,
+    comment_types=["all"],
+)
+
+
+@pytest.fixture
+def client(mocker: MockerFixture) -> Generator[TestClient, None, None]:
+    """Create a test client with a fresh job table and no rate limit."""
+    mocker.patch("server.routers.jobs.job_manager", JobManager(workers=1, max_pending=2))
+    mocker.patch.object(limiter, "enabled", new=False)
+    with TestClient(app) as test_client:
+        test_client.headers.update({"Host": "localhost"})
+        yield test_client
+
+
+def _wait_until_finished(client: TestClient, job_id: str) -> dict:
+    for _ in range(100):
+        response = client.get(f"/api/jobs/{job_id}")
+        if response.json()["status"] in {JobStatus.COMPLETED, JobStatus.FAILED}:
+            return response.json()
+        time.sleep(0.01)
+    pytest.fail("Job did not finish")
+
+
+def test_job_lifecycle(client: TestClient, mocker: MockerFixture) -> None:
+    """Test that a submitted job is queued, completes in the background and serves its result."""
+    release = asyncio.Event()
+
+    async def process(**_: object) -> IngestSuccessResponse:
+        await release.wait()
+        return SUCCESS
+
+    mocker.patch("server.jobs.process_query", side_effect=process)
+
+    response = client.post("/api/jobs", json={"input_text": "octocat/hello-world", "max_file_size": 243})
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    job_id = response.json()["job_id"]
+    assert response.headers["Location"] == f"/api/jobs/{job_id}"
+
+    response = client.get(f"/api/jobs/{job_id}/result")
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert response.json()["status"] in {JobStatus.QUEUED, JobStatus.RUNNING}
+
+    client.portal.call(release.set)
+    job = _wait_until_finished(client, job_id)
+    assert job["status"] == JobStatus.COMPLETED
+    assert job["finished_at"] >= job["started_at"] >= job["created_at"]
+
+    response = client.get(f"/api/jobs/{job_id}/result")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["content"] == SUCCESS.content
+
+
+def test_failed_job(client: TestClient, mocker: MockerFixture) -> None:
+    """Test that a failed ingestion is reported by the status and result endpoints."""
+    error = IngestErrorResponse(error="Repository not found", repo_url="octocat/missing")
+    mocker.patch("server.jobs.process_query", return_value=error)
+
+    response = client.post("/api/jobs", json={"input_text": "octocat/missing", "max_file_size": 243})
+    job = _wait_until_finished(client, response.json()["job_id"])
+
+    assert job["status"] == JobStatus.FAILED
+    assert job["error"] == error.error
+    response = client.get(f"/api/jobs/{job['job_id']}/result")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["error"] == error.error
+
+
+def test_unknown_job(client: TestClient) -> None:
+    """Test that unknown jobs are answered with ``404``."""
+    assert client.get("/api/jobs/unknown").status_code == status.HTTP_404_NOT_FOUND
+    assert client.get("/api/jobs/unknown/result").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_job_reports_stage_and_progress(client: TestClient, mocker: MockerFixture) -> None:
+    """Test that the status of a running job reports the step its ingestion has reached.
+
+    Given a job whose ingestion reports that it has reached the ingesting step:
+    When its status is polled while it runs and once it has finished,
+    Then the stage and progress of the running job are reported, and the finished job is complete.
+    """
+    reached = asyncio.Event()
+    release = asyncio.Event()
+
+    async def process(progress: Callable[[JobStage], None], **_: object) -> IngestSuccessResponse:
+        progress(JobStage.CLONING)
+        progress(JobStage.INGESTING)
+        reached.set()
+        await release.wait()
+        return SUCCESS
+
+    mocker.patch("server.jobs.process_query", side_effect=process)
+
+    response = client.post("/api/jobs", json={"input_text": "octocat/hello-world", "max_file_size": 243})
+    job_id = response.json()["job_id"]
+    client.portal.call(reached.wait)
+
+    job = client.get(f"/api/jobs/{job_id}").json()
+    expected_progress = 1 / len(JobStage)
+    assert job["status"] == JobStatus.RUNNING
+    assert job["stage"] == JobStage.INGESTING
+    assert job["progress"] == pytest.approx(expected_progress)
+
+    client.portal.call(release.set)
+    job = _wait_until_finished(client, job_id)
+    assert job["status"] == JobStatus.COMPLETED
+    assert job["stage"] is None
+    assert job["progress"] == 1
+
+
+def test_job_is_requeued_while_ingestion_pool_is_busy(client: TestClient, mocker: MockerFixture) -> None:
+    """Test that a job turned away by a busy ingestion pool is retried instead of failing.
+
+    Given an ingestion pool that is full on the first attempt:
+    When a job is submitted,
+    Then the job is run again and completes.
+    """
+    mocker.patch.object(jobs, "JOB_REQUEUE_DELAY", 0)
+    process = mocker.patch("server.jobs.process_query", side_effect=[QueueFullError("busy"), SUCCESS])
+
+    response = client.post("/api/jobs", json={"input_text": "octocat/hello-world", "max_file_size": 243})
+    job = _wait_until_finished(client, response.json()["job_id"])
+
+    expected_attempts = 2
+    assert job["status"] == JobStatus.COMPLETED
+    assert process.call_count == expected_attempts
+
+
+def test_job_manager_runs_jobs_in_successive_loops(mocker: MockerFixture) -> None:
+    """Test that a job manager created outside any loop runs contending jobs in each loop it is used from.
+
+    Given a job manager with a single worker, created before any event loop runs:
+    When two jobs contend for the worker in one loop, then in another,
+    Then every job should complete, its worker slot being taken in the loop it runs in.
+    """
+    manager = JobManager(workers=1)
+
+    async def process_query(**_: object) -> IngestSuccessResponse:
+        await asyncio.sleep(0.01)
+        return SUCCESS
+
+    mocker.patch("server.jobs.process_query", side_effect=process_query)
+    request = IngestRequest(input_text="octocat/hello-world", max_file_size=243)
+
+    async def run_jobs() -> list[JobStatus]:
+        submitted = [manager.submit(request) for _ in range(2)]
+        await asyncio.gather(*(job.task for job in submitted if job.task))
+        return [job.status for job in submitted]
+
+    assert asyncio.run(run_jobs()) == [JobStatus.COMPLETED] * 2
+    assert asyncio.run(run_jobs()) == [JobStatus.COMPLETED] * 2
+
+
+def test_lifespan_shuts_down_job_manager(mocker: MockerFixture) -> None:
+    """Test that stopping the app cancels the jobs that have not finished."""
+    shutdown = mocker.patch.object(jobs.job_manager, "shutdown")
+
+    with TestClient(app):
+        pass
+
+    shutdown.assert_awaited_once()
@@ -0,0 +1,142 @@
+"""Tests for the structure-only and plan modes.
+
+These tests preview local directories without reading their files, and remote repositories from clones holding
+only their commit and trees, with file sizes asked from the host or measured after a checkout.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+from unittest.mock import PropertyMock
+
+import pytest
+
+from gitingest.clone import clone_repo
+from gitingest.entrypoint import ingest_async
+from gitingest.listing import read_listing
+from gitingest.query_parser import IngestionQuery
+from gitingest.schemas import CloneConfig, FileSystemNode, FileSystemNodeType
+from tests.conftest import git, git_async
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+REMOTE_URL = "https://git.example.com/origin"
+
+
+async def _missing_objects(repo: Path) -> int:
+    """Return the number of objects of ``HEAD`` that the clone ``repo`` does not hold."""
+    return (await git_async(repo, "rev-list", "--objects", "--missing=print", "HEAD")).count("?")
+
+
+@pytest.fixture
+def tree_only_clone(local_git_repo: Path, tmp_path: Path) -> Path:
+    """Add a symlink to ``local_git_repo`` and clone it without blobs nor checkout."""
+    (local_git_repo / "docs" / "link.md").symlink_to("guide.md")
+    git(local_git_repo, "add", "-A")
+    git(local_git_repo, "commit", "-q", "-m", "link")
+    return tmp_path / "clone"
+
+
+@pytest.mark.asyncio
+async def test_structure_only_reads_no_file(temp_directory: Path, mocker: MockerFixture) -> None:
+    """Test that ``structure_only`` outputs the tree without reading any file."""
+    mocker.patch("gitingest.output_formatter._count_tokens", side_effect=lambda texts: [len(t) for t in texts])
+    mocker.patch.object(FileSystemNode, "content", new_callable=PropertyMock, side_effect=AssertionError)
+
+    summary, tree, content = await ingest_async(str(temp_directory), structure_only=True)
+
+    assert "Files analyzed: 8" in summary
+    assert f"Estimated tokens: {len(tree)}" in summary
+    assert "file_subdir.py" in tree
+    assert content == ""
+
+
+@pytest.mark.asyncio
+async def test_plan_reports_sizes_largest_first(temp_directory: Path, mocker: MockerFixture) -> None:
+    """Test that ``plan`` lists the size and estimated tokens of each file, largest first, from their sizes only."""
+    mocker.patch.object(FileSystemNode, "content", new_callable=PropertyMock, side_effect=AssertionError)
+    (temp_directory / "dir2" / "file_dir2.txt").write_text("x" * 4096)
+
+    summary, tree, content = await ingest_async(str(temp_directory), plan=True)
+
+    assert "Files analyzed: 8" in summary
+    assert "Total size: 4.1 kB" in summary
+    assert summary.endswith("Estimated tokens: 1.2k")  # 4,209 bytes of files and 400 of tree, 4 bytes per token
+    assert "dir2/" in tree
+    lines = content.splitlines()
+    assert lines[0] == "Estimated tokens per file:"
+    assert lines[1].split() == ["1.0k", "4.0", "kB", "dir2/file_dir2.txt"]
+    assert lines[-1].split() == ["3", "11", "B", "file1.txt"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("repo_exists_true")
+async def test_read_listing_asks_host_for_sizes(
+    local_git_repo: Path,
+    tree_only_clone: Path,
+    mocker: MockerFixture,
+) -> None:
+    """Test that a tree-only clone is listed with the sizes reported by the host, without downloading any file.
+
+    Given a repository cloned without blobs nor checkout:
+    When it is planned and the host reports the object sizes,
+    Then every file should be listed with its size, and only the blob of the symlink should have been fetched.
+    """
+
+    async def object_sizes(_client: object, url: str, oids: list[str], **_: object) -> dict[str, int]:
+        assert url == REMOTE_URL
+        return {oid: int(await git_async(local_git_repo, "cat-file", "-s", oid)) for oid in oids}
+
+    mocker.patch("gitingest.listing.fetch_object_sizes", side_effect=object_sizes)
+    await clone_repo(CloneConfig(url=local_git_repo.as_uri(), local_path=str(tree_only_clone), no_checkout=True))
+    files_without_link = 5
+    assert await _missing_objects(tree_only_clone) == files_without_link + 1
+    assert not (tree_only_clone / "README.md").exists()
+
+    query = IngestionQuery(
+        local_path=tree_only_clone,
+        url=REMOTE_URL,
+        slug="origin",
+        id="id",
+        structure_only=True,
+        plan=True,
+    )
+    root = await read_listing(query)
+
+    assert await _missing_objects(tree_only_clone) == files_without_link
+    expected_size = 9 + 4096 + 15 + 17 + 6  # README.md, big.txt, src/main.py, src/data.json and docs/guide.md
+    assert root.size == expected_size
+    docs = next(child for child in root.children if child.name == "docs")
+    link = next(child for child in docs.children if child.name == "link.md")
+    assert link.type == FileSystemNodeType.SYMLINK
+    assert link.link_target == "guide.md"
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("repo_exists_true")
+async def test_read_listing_checks_out_when_host_cannot_tell_sizes(
+    local_git_repo: Path,
+    tree_only_clone: Path,
+) -> None:
+    """Test that the files are checked out and measured when the host cannot report their sizes."""
+    commit = await git_async(local_git_repo, "rev-parse", "HEAD")
+    await clone_repo(
+        CloneConfig(url=local_git_repo.as_uri(), local_path=str(tree_only_clone), commit=commit, no_checkout=True),
+    )
+    query = IngestionQuery(
+        local_path=tree_only_clone,
+        url=local_git_repo.as_uri(),
+        slug="origin",
+        id="id",
+        subpath="/src",
+        structure_only=True,
+        plan=True,
+    )
+
+    root = await read_listing(query)
+
+    assert sorted((child.name, child.size) for child in root.children) == [("data.json", 17), ("main.py", 15)]
+    assert await _missing_objects(tree_only_clone) == 0
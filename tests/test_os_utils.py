@@ -0,0 +1,47 @@
+"""Tests for the ``os_utils`` module.
+
+These tests cover creating the private directories caches are kept in, and refusing directories other users could
+tamper with.
+"""
+
+from __future__ import annotations
+
+import os
+import stat
+from typing import TYPE_CHECKING
+
+import pytest
+
+from gitingest.utils.os_utils import ensure_private_directory
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="Permissions are only checked on POSIX systems")
+
+
+def test_private_directory_is_restricted_to_its_owner(tmp_path: Path) -> None:
+    """Test that new directories are created with mode 0700 and that existing ones are restricted to it."""
+    created = tmp_path / "cache" / "mirrors"
+    existing = tmp_path / "existing"
+    existing.mkdir(mode=0o755)
+
+    ensure_private_directory(created)
+    ensure_private_directory(existing)
+
+    expected_mode = 0o700
+    assert stat.S_IMODE(created.stat().st_mode) == expected_mode
+    assert stat.S_IMODE(existing.stat().st_mode) == expected_mode
+
+
+def test_private_directory_in_shared_parent_is_refused(tmp_path: Path) -> None:
+    """Test that a directory whose parent other users can write to is refused, unless the parent is sticky."""
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+
+    with pytest.raises(PermissionError):
+        ensure_private_directory(shared / "cache")
+
+    shared.chmod(0o777 | stat.S_ISVTX)
+    ensure_private_directory(shared / "cache")
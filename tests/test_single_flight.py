@@ -0,0 +1,84 @@
+"""Tests for the ``single_flight`` module.
+
+These tests verify that concurrent identical requests share one in-flight task and that the task is only cancelled
+once its last waiter has gone away.
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from server.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_task() -> None:
+    """Test that concurrent calls with the same key run the function once and all receive its result."""
+    expected_call_count = 2  # One per key
+    flight: SingleFlight[int] = SingleFlight()
+    calls = 0
+
+    async def work() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 42
+
+    results = await asyncio.gather(*(flight.do("key", work) for _ in range(5)), flight.do("other", work))
+
+    assert results == [42] * 6
+    assert calls == expected_call_count
+    assert flight.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_task() -> None:
+    """Test that a waiter going away leaves the task running for the remaining waiters."""
+    flight: SingleFlight[str] = SingleFlight()
+    release = asyncio.Event()
+
+    async def work() -> str:
+        await release.wait()
+        return "done"
+
+    first = asyncio.ensure_future(flight.do("key", work))
+    second = asyncio.ensure_future(flight.do("key", work))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await second == "done"
+    assert first.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_last_waiter_cancels_task() -> None:
+    """Test that the shared task is cancelled when its last waiter goes away, and that later calls start afresh."""
+    flight: SingleFlight[str] = SingleFlight()
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def work() -> str:
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return "unreachable"
+
+    waiter = asyncio.ensure_future(flight.do("key", work))
+    await started.wait()
+    waiter.cancel()
+
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+    assert flight.in_flight() == 0
+
+    async def quick() -> str:
+        return "fresh"
+
+    assert await flight.do("key", quick) == "fresh"
@@ -0,0 +1,97 @@
+"""Tests for the truncation of files above the maximum file size.
+
+These tests cover outputting the start and end of large files around a marker, keeping whole lines, and skipping
+such files unless truncation is requested.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING
+
+import pytest
+
+from gitingest.ingestion import ingest_query
+from gitingest.query_parser import IngestionQuery
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+MAX_FILE_SIZE = 1000
+
+
+def _query(local_path: Path, **kwargs: object) -> IngestionQuery:
+    return IngestionQuery(
+        local_path=local_path,
+        slug="logs",
+        id="id",
+        ignore_patterns=set(),
+        max_file_size=MAX_FILE_SIZE,
+        **kwargs,
+    )
+
+
+@pytest.fixture(autouse=True)
+def count_tokens(mocker: MockerFixture) -> None:
+    """Count one token per character, so that estimates do not depend on the tokenizer being available."""
+    mocker.patch("gitingest.output_formatter._count_tokens", side_effect=lambda texts: [len(t) for t in texts])
+
+
+@pytest.fixture
+def logs(tmp_path: Path) -> Path:
+    """Create a directory holding a log of 10,000 numbered lines and a small file."""
+    (tmp_path / "app.log").write_text("".join(f"line {i:05}\n" for i in range(10_000)))
+    (tmp_path / "notes.txt").write_text("Small file\n")
+    return tmp_path
+
+
+def test_large_files_are_truncated(logs: Path) -> None:
+    """Test that the start and end of a large file are output around a marker, cut at line boundaries.
+
+    Given a log larger than the maximum file size:
+    When it is ingested with ``truncate_large_files``,
+    Then its first and last lines should be output, whole, around a marker giving the size left out.
+    """
+    _, tree, content = ingest_query(_query(logs, truncate_large_files=True))
+
+    assert "app.log" in tree
+    section = content.split("FILE: app.log\n" + "=" * 48 + "\n", 1)[1].split("\n\n", 1)[0]
+    lines = section.splitlines()
+    line_size = len("line 00000\n")
+    kept = MAX_FILE_SIZE // 2 // line_size
+    assert lines[:kept] == [f"line {i:05}" for i in range(kept)]
+    assert lines[kept] == f"[... {(10_000 - 2 * kept) * line_size / 1024:.1f} kB omitted ...]"
+    assert lines[kept + 1 :] == [f"line {i:05}" for i in range(10_000 - kept, 10_000)]
+    assert "Small file" in content
+
+
+def test_large_notebooks_are_truncated_as_text(tmp_path: Path) -> None:
+    """Test that the start and end of a large notebook are output as JSON, rather than parsed as a notebook."""
+    cells = [{"cell_type": "code", "source": [f"x = {i}\n"], "metadata": {}, "outputs": []} for i in range(1_000)]
+    (tmp_path / "analysis.ipynb").write_text(json.dumps({"cells": cells}, indent=1))
+
+    _, _, content = ingest_query(_query(tmp_path, truncate_large_files=True))
+
+    assert "Error processing notebook" not in content
+    assert '"cells": [' in content
+    assert "omitted ...]" in content
+    assert '"x = 999\\n"' in content
+
+
+def test_large_files_are_skipped_by_default(logs: Path) -> None:
+    """Test that files above the maximum size are left out unless truncation is requested."""
+    _, tree, content = ingest_query(_query(logs))
+
+    assert "app.log" not in tree
+    assert "line 00000" not in content
+
+
+def test_clones_keep_large_files_to_truncate(tmp_path: Path) -> None:
+    """Test that the blobs of large files are cloned when they are to be truncated."""
+    query = _query(tmp_path, url="https://github.com/user/repo", truncate_large_files=True)
+
+    assert query.extract_clone_config().max_file_size is None
+    query.truncate_large_files = False
+    assert query.extract_clone_config().max_file_size == MAX_FILE_SIZE
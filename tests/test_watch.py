@@ -0,0 +1,135 @@
+"""Tests for the watch mode of the ``entrypoint`` module.
+
+These tests run ``watch_async`` on a temporary directory, change its files, and check that the digest is rewritten
+after each change, walking the directory again only when its structure changed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import warnings
+from typing import TYPE_CHECKING
+
+import pytest
+from watchfiles import Change
+
+from gitingest import entrypoint
+from gitingest.entrypoint import _watch_filter, watch_async
+from gitingest.query_parser import IngestionQuery
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+    from gitingest.schemas import FileSystemNode
+
+UPDATE_TIMEOUT = 10  # Seconds to wait for the watcher to pick up a change
+
+
+@pytest.mark.asyncio
+async def test_watch_async_rewrites_digest(temp_directory: Path, tmp_path: Path, mocker: MockerFixture) -> None:
+    """Test that the digest is rewritten after every change, and that modifications do not walk the tree again.
+
+    Given a watched directory:
+    When a file is modified, then another one is created,
+    Then the digest should be rewritten each time, walking the directory again only for the new file.
+    """
+    mocker.patch("gitingest.output_formatter._count_tokens", side_effect=lambda texts: [len(t) for t in texts])
+    build_spy = mocker.spy(entrypoint, "build_node")
+    output = tmp_path / "digest.txt"
+    summaries: asyncio.Queue[str] = asyncio.Queue()
+    stop_event = asyncio.Event()
+    watcher = asyncio.create_task(
+        watch_async(str(temp_directory), output=str(output), on_update=summaries.put_nowait, stop_event=stop_event),
+    )
+
+    try:
+        assert "Files analyzed: 8" in await asyncio.wait_for(summaries.get(), UPDATE_TIMEOUT)
+
+        (temp_directory / "file1.txt").write_text("Hello again")
+        await asyncio.wait_for(summaries.get(), UPDATE_TIMEOUT)
+        assert "Hello again" in output.read_text()
+        assert build_spy.call_count == 1
+
+        (temp_directory / "src" / "new.txt").write_text("Brand new")
+        assert "Files analyzed: 9" in await asyncio.wait_for(summaries.get(), UPDATE_TIMEOUT)
+        assert "Brand new" in output.read_text()
+        expected_walks = 2
+        assert build_spy.call_count == expected_walks
+    finally:
+        stop_event.set()
+        await asyncio.wait_for(watcher, UPDATE_TIMEOUT)
+
+
+@pytest.mark.asyncio
+async def test_watch_async_reloads_ignore_files_and_survives_failures(
+    temp_directory: Path,
+    tmp_path: Path,
+    mocker: MockerFixture,
+) -> None:
+    """Test that ignore file changes update the patterns, and that a failed update does not stop the watcher.
+
+    Given a watched directory whose next walk fails:
+    When a file is created, then a ``.gitignore`` excluding text files is written,
+    Then the failure should be reported as a warning, and the digest should then leave out the text files.
+    """
+    mocker.patch("gitingest.output_formatter._count_tokens", side_effect=lambda texts: [len(t) for t in texts])
+    build_node = entrypoint.build_node
+    failed = threading.Event()
+
+    def _build_node_failing_once(query: IngestionQuery) -> FileSystemNode:
+        if not failed.is_set():
+            failed.set()
+            msg = "Directory moved"
+            raise OSError(msg)
+        return build_node(query)
+
+    output = tmp_path / "digest.txt"
+    summaries: asyncio.Queue[str] = asyncio.Queue()
+    stop_event = asyncio.Event()
+    watcher = asyncio.create_task(
+        watch_async(str(temp_directory), output=str(output), on_update=summaries.put_nowait, stop_event=stop_event),
+    )
+
+    try:
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            await asyncio.wait_for(summaries.get(), UPDATE_TIMEOUT)
+            mocker.patch.object(entrypoint, "build_node", side_effect=_build_node_failing_once)
+
+            (temp_directory / "new.txt").write_text("Brand new")
+            assert await asyncio.get_running_loop().run_in_executor(None, failed.wait, UPDATE_TIMEOUT)
+            (temp_directory / ".gitignore").write_text("*.txt\n")
+            while "file1.txt" in output.read_text():
+                await asyncio.wait_for(summaries.get(), UPDATE_TIMEOUT)
+
+        assert any("Directory moved" in str(warning.message) for warning in caught)
+        digest = output.read_text()
+        assert "file2.py" in digest
+        assert "new.txt" not in digest
+    finally:
+        stop_event.set()
+        await asyncio.wait_for(watcher, UPDATE_TIMEOUT)
+
+
+def test_watch_filter_ignores_output_and_excluded_paths(temp_directory: Path) -> None:
+    """Test that changes to the output file and to excluded paths do not trigger an update."""
+    query = IngestionQuery(
+        local_path=temp_directory,
+        slug="test_repo",
+        id="id",
+        ignore_patterns={"*.py", ".git", ".gitignore"},
+    )
+    accept = _watch_filter(query, str(temp_directory / "digest.txt"))
+
+    assert accept(Change.modified, str(temp_directory / "file1.txt"))
+    assert not accept(Change.modified, str(temp_directory / "digest.txt"))
+    assert not accept(Change.modified, str(temp_directory / "file2.py"))
+    assert not accept(Change.added, str(temp_directory / ".git" / "index"))
+    assert not accept(Change.modified, str(temp_directory / "src" / ".gitignore"))
+
+    accept = _watch_filter(query, None, ignore_files=True)
+
+    assert accept(Change.modified, str(temp_directory / "src" / ".gitignore"))
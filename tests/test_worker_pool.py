@@ -0,0 +1,150 @@
+"""Tests for the ``worker_pool`` module.
+
+These tests verify that the ingestion pool runs work in worker processes, turns requests away once its admission
+queue is full, and that the ingest endpoint reports this as ``503 Service Unavailable``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from gitingest.schemas import FileSystemNode, FileSystemNodeType
+from gitingest.utils.digest_cache import DigestCache
+from server.main import app
+from server.query_processor import _write_built_digest, _write_cached_digest
+from server.server_config import INGEST_RETRY_AFTER, MAX_DISPLAY_SIZE
+from server.server_utils import limiter
+from server.worker_pool import IngestionPool, QueueFullError, report_progress
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+    from gitingest.query_parser import IngestionQuery
+
+_CONTENT = "x" * (MAX_DISPLAY_SIZE + 10)
+
+
+def _report_steps() -> str:
+    """Report two steps, then keep working long enough for them to be relayed."""
+    report_progress("first")
+    report_progress("second")
+    time.sleep(0.5)
+    return "done"
+
+
+@pytest.mark.asyncio
+async def test_run_executes_in_worker_process() -> None:
+    """Test that ``run`` executes the function outside of the current process."""
+    pool = IngestionPool(workers=1, queue_size=0)
+    try:
+        assert await pool.run(os.getpid) != os.getpid()
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_run_replaces_broken_pool() -> None:
+    """Test that a worker dying fails its job only, and that later jobs run in a new pool."""
+    pool = IngestionPool(workers=1, queue_size=0)
+    try:
+        with pytest.raises(BrokenProcessPool):
+            await pool.run(os._exit, 1)
+        assert await pool.run(os.getpid) != os.getpid()
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_run_relays_reported_progress() -> None:
+    """Test that the steps a job reports in its worker process are passed to its ``progress`` callback."""
+    pool = IngestionPool(workers=1, queue_size=0)
+    steps: list[object] = []
+    try:
+        assert await pool.run(_report_steps, progress=steps.append) == "done"
+    finally:
+        pool.shutdown()
+
+    assert steps == ["first", "second"]
+
+
+def test_built_digest_is_written_and_cropped(
+    tmp_path: Path,
+    sample_query: IngestionQuery,
+    mocker: MockerFixture,
+) -> None:
+    """Test that the worker function writes the full digest to disk and only returns its cropped content.
+
+    Given a digest whose content is larger than ``MAX_DISPLAY_SIZE``:
+    When it is built in the worker function, then served from the digest cache,
+    Then both should write the full digest to the downloadable file and return its content cropped.
+    """
+    root = FileSystemNode(name="repo", type=FileSystemNodeType.DIRECTORY, path_str=".", path=tmp_path)
+    mocker.patch("server.query_processor.build_node", return_value=root)
+
+    def write_node(_node: FileSystemNode, _query: IngestionQuery, path: Path) -> tuple[str, str]:
+        path.write_text(f"Tree\n{_CONTENT}", encoding="utf-8")
+        return "Summary", "Tree"
+
+    mocker.patch("server.query_processor.write_node", side_effect=write_node)
+    mocker.patch("server.query_processor.digest_cache", DigestCache(root=tmp_path / "digests"))
+    path = tmp_path / "repo.txt"
+    cached_path = tmp_path / "cached.txt"
+
+    built = _write_built_digest(path, "key", sample_query)
+    cached = _write_cached_digest(cached_path, "key")
+
+    summary, tree, content = built
+    assert (summary, tree) == ("Summary", "Tree")
+    assert content.startswith("(Files content cropped to")
+    assert content.endswith("\n" + _CONTENT[:MAX_DISPLAY_SIZE])
+    assert cached == built
+    assert path.read_text(encoding="utf-8") == f"Tree\n{_CONTENT}"
+    assert cached_path.read_bytes() == path.read_bytes()
+
+
+@pytest.mark.asyncio
+async def test_admit_rejects_requests_beyond_capacity() -> None:
+    """Test that requests beyond ``workers + queue_size`` are rejected and slots are released on exit."""
+    pool = IngestionPool(workers=1, queue_size=1)
+    release = asyncio.Event()
+
+    async def hold_slot() -> None:
+        async with pool.admit():
+            await release.wait()
+
+    holders = [asyncio.create_task(hold_slot()) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    with pytest.raises(QueueFullError):
+        async with pool.admit():
+            pass
+
+    release.set()
+    await asyncio.gather(*holders)
+
+    async with pool.admit():
+        pass
+
+
+def test_api_ingest_returns_503_when_queue_is_full(mocker: MockerFixture) -> None:
+    """Test that ``/api/ingest`` answers ``503`` with a ``Retry-After`` header when the pool is saturated."""
+    mocker.patch.object(limiter, "enabled", new=False)
+    mocker.patch("server.routers.ingest.process_query", side_effect=QueueFullError("busy"))
+    client = TestClient(app)
+    client.headers.update({"Host": "localhost"})
+
+    response = client.post("/api/ingest", data={"input_text": "octocat/hello-world", "max_file_size": "243"})
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["Retry-After"] == str(INGEST_RETRY_AFTER)
+    assert response.json()["error"] == "busy"